@@ -3,7 +3,13 @@ from __future__ import annotations
 import os
 from pathlib import Path
 
-from flask import Flask, jsonify
+from app.utils.startup import startup_profiler
+
+# Opt-in import-time breakdown of the boot; see /api/debug/startup.
+if os.getenv("STARTUP_PROFILE", "false").lower() in ("1", "true", "yes"):
+    startup_profiler.start()
+
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 
 from app.config import Config
@@ -13,7 +19,8 @@ from app.api.validation import validation_bp
 from app.api.bins import bins_bp
 from app.api.analytics import analytics_bp
 from app.api.reports import reports_bp
-from app.routes.ai_routes import ai_bp
+from app.api.telemetry import telemetry_bp
+from app.api.gis import gis_bp
 
 try:
     from dotenv import load_dotenv
@@ -22,6 +29,14 @@ except Exception:  # pragma: no cover - optional dependency
 
 
 def create_app() -> Flask:
+    try:
+        return _create_app()
+    finally:
+        # Also when the boot fails, so the import hook never outlives create_app.
+        startup_profiler.stop()
+
+
+def _create_app() -> Flask:
     if load_dotenv:
         base_dir = Path(__file__).resolve().parents[1]
         load_dotenv(dotenv_path=base_dir / ".env", override=False)
@@ -38,13 +53,70 @@ def create_app() -> Flask:
     sock.init_app(app)
 
     # ensure models are registered for migrations
-    from app.db_models import models  # noqa: F401
+    with startup_profiler.phase("models"):
+        from app.db_models import models  # noqa: F401
+        from app.services.response_cache import get_response_cache, register_cache_events
+        from app.services.rollups import register_rollup_events
+        from app.services.bin_activity import register_bin_activity_events
+        from app.services.spatial_index import get_spatial_index, register_spatial_index_events
+        from app.services import anomaly  # noqa: F401  (registers its write-behind op)
+        from app.services.write_behind import get_write_behind
+
+    register_rollup_events(db.session)
+    register_bin_activity_events(db.session)
+    register_cache_events(db.session)
+    register_spatial_index_events(db.session)
+    write_behind = get_write_behind()
+
+    if app.config.get("ENABLE_AI_ROUTES") and app.config.get("AUDIO_MODEL_WARMUP"):
+        with startup_profiler.phase("audio_warmup"):
+            from app.services.audio_service import warm_up_audio_model
+
+            try:
+                warm_up_audio_model()
+            except Exception:
+                app.logger.exception("Audio model warm-up failed")
 
     # health check
     @app.get("/api/health")
     def health():
         return jsonify({"status": "ok", "service": "smartbin-api"})
 
+    @app.get("/api/debug/startup")
+    def startup_report():
+        return jsonify(startup_profiler.report(limit=request.args.get("limit", 25, type=int)))
+
+    @app.get("/api/debug/response-cache")
+    def response_cache_stats():
+        return jsonify(get_response_cache().stats())
+
+    @app.get("/api/debug/image-store")
+    def image_store_stats():
+        from app.services.image_store import get_image_store
+
+        return jsonify(get_image_store().stats())
+
+    @app.get("/api/debug/write-behind")
+    def write_behind_stats():
+        return jsonify(get_write_behind().stats())
+
+    @app.get("/api/debug/spatial-index")
+    def spatial_index_stats():
+        return jsonify(get_spatial_index().stats())
+
+    @app.get("/api/debug/vector-tiles")
+    def vector_tile_stats():
+        from app.services.vector_tiles import get_tile_cache
+
+        return jsonify(get_tile_cache().stats())
+
+    @app.before_request
+    def start_write_behind():
+        # Started by the first request rather than here, so CLI commands (flask db
+        # upgrade, seed scripts) never replay queued writes. Replays leftover segments.
+        if not write_behind.running:
+            write_behind.start(app)
+
     @app.errorhandler(400)
     def bad_request(err):
         return jsonify({"error": "bad_request", "message": str(err)}), 400
@@ -58,11 +130,18 @@ def create_app() -> Flask:
         return jsonify({"error": "server_error", "message": str(err)}), 500
 
     # register blueprints
-    app.register_blueprint(ai_bp, url_prefix="/api")
+    if app.config.get("ENABLE_AI_ROUTES"):
+        # Dashboard-only workers (ENABLE_AI_ROUTES=false) never import the ML stack.
+        with startup_profiler.phase("ai_routes"):
+            from app.routes.ai_routes import ai_bp
+
+        app.register_blueprint(ai_bp, url_prefix="/api")
     app.register_blueprint(dashboard_bp, url_prefix="/api/dashboard")
     app.register_blueprint(validation_bp, url_prefix="/api/validation")
     app.register_blueprint(bins_bp, url_prefix="/api/bins")
     app.register_blueprint(analytics_bp, url_prefix="/api/analytics")
     app.register_blueprint(reports_bp, url_prefix="/api/reports")
+    app.register_blueprint(telemetry_bp, url_prefix="/api/telemetry")
+    app.register_blueprint(gis_bp, url_prefix="/api/gis")
 
     return app
@@ -1,11 +1,13 @@
 from flask import Blueprint, jsonify, request
 
 from app.services.genai_reports import get_carbon_trend, get_waste_composition
+from app.services.response_cache import cached_response
 
 analytics_bp = Blueprint("analytics", __name__)
 
 
 @analytics_bp.get("/carbon-trend")
+@cached_response
 def carbon_trend():
     days = int(request.args.get("days", 7))
     weeks = int(request.args.get("weeks", 4))
@@ -14,6 +16,7 @@ def carbon_trend():
 
 
 @analytics_bp.get("/waste-composition")
+@cached_response
 def waste_composition():
     days = int(request.args.get("days", 7))
     payload = get_waste_composition(days=days)
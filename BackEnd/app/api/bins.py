@@ -1,27 +1,15 @@
 from datetime import datetime
 
 from flask import Blueprint, jsonify
-from sqlalchemy import func
 
-from app.db_models.models import SmartBin, WasteLog
-from app.extensions import db
+from app.db_models.models import SmartBin
+from app.services.bin_activity import bin_status, utc_today
 
 bins_bp = Blueprint("bins", __name__)
 
-STATUS_THRESHOLDS = {
-    "full": 90,
-    "maintenance": 70,
-}
-
 
 def _derive_status(bin_item: SmartBin) -> str:
-    if not bin_item.is_active:
-        return "offline"
-    if bin_item.fill_level >= STATUS_THRESHOLDS["full"]:
-        return "full"
-    if bin_item.fill_level >= STATUS_THRESHOLDS["maintenance"]:
-        return "maintenance"
-    return "active"
+    return bin_status(bin_item.is_active, bin_item.fill_level)
 
 
 def _format_timestamp(value: datetime | None) -> str | None:
@@ -30,7 +18,7 @@ def _format_timestamp(value: datetime | None) -> str | None:
     return value.strftime("%Y-%m-%d %H:%M")
 
 
-def _serialize_bin(bin_item: SmartBin, last_seen: datetime | None = None) -> dict:
+def _serialize_bin(bin_item: SmartBin) -> dict:
     return {
         "id": bin_item.id,
         "name": bin_item.location_name or f"Smartbin {bin_item.id}",
@@ -40,29 +28,17 @@ def _serialize_bin(bin_item: SmartBin, last_seen: datetime | None = None) -> dic
         "is_active": bin_item.is_active,
         "fill_level": bin_item.fill_level,
         "status": _derive_status(bin_item),
-        "last_seen": _format_timestamp(last_seen),
+        "last_seen": _format_timestamp(bin_item.last_seen_at),
+        # The stored count is from the last day the bin logged anything.
+        "logs_today": bin_item.logs_today if bin_item.logs_today_date == utc_today() else 0,
     }
 
 
 @bins_bp.get("/")
 def list_bins():
-    last_seen_subquery = (
-        db.session.query(
-            WasteLog.bin_id.label("bin_id"),
-            func.max(WasteLog.timestamp).label("last_seen"),
-        )
-        .group_by(WasteLog.bin_id)
-        .subquery()
-    )
-
-    rows = (
-        db.session.query(SmartBin, last_seen_subquery.c.last_seen)
-        .outerjoin(last_seen_subquery, SmartBin.id == last_seen_subquery.c.bin_id)
-        .order_by(SmartBin.id.asc())
-        .all()
-    )
-
-    payload = [_serialize_bin(bin_item, last_seen) for bin_item, last_seen in rows]
+    # last_seen_at / logs_today are kept on the row (app.services.bin_activity),
+    # so this is a primary-key scan of smart_bins only.
+    payload = [_serialize_bin(bin_item) for bin_item in SmartBin.query.order_by(SmartBin.id.asc())]
     return jsonify({"count": len(payload), "data": payload})
 
 
@@ -72,11 +48,4 @@ def get_bin(bin_id: int):
     if not bin_item:
         return jsonify({"error": "not_found", "message": "Smartbin not found"}), 404
 
-    last_seen = (
-        WasteLog.query.filter_by(bin_id=bin_item.id)
-        .order_by(WasteLog.timestamp.desc())
-        .with_entities(WasteLog.timestamp)
-        .first()
-    )
-
-    return jsonify(_serialize_bin(bin_item, last_seen[0] if last_seen else None))
+    return jsonify(_serialize_bin(bin_item))
@@ -1,10 +1,9 @@
 from datetime import datetime
 
 from flask import Blueprint, jsonify
-from sqlalchemy import func
 
-from app.db_models.models import AnomalyData, CarbonMetric, SmartBin, WasteLog
-from app.extensions import db
+from app.services.dashboard_data import load_dashboard_data
+from app.services.response_cache import cached_response
 
 dashboard_bp = Blueprint("dashboard", __name__)
 
@@ -16,15 +15,6 @@ CATEGORY_COLORS = {
     "Residue": "#8B3A3A",
 }
 
-CATEGORY_WEIGHTS_KG = {
-    "Organic": 3.5,
-    "Plastic": 2.1,
-    "Paper": 1.8,
-    "Metal": 1.4,
-    "Residue": 1.1,
-}
-
-
 def _format_kg(value):
     return f"{value:,.0f} kg"
 
@@ -34,28 +24,23 @@ def _format_percent(value):
 
 
 @dashboard_bp.get("/")
+@cached_response
 def get_dashboard():
-    total_bins = SmartBin.query.count()
-    active_bins = SmartBin.query.filter_by(is_active=True).count()
+    data = load_dashboard_data()
+    total_bins = data.total_bins
+    active_bins = data.active_bins
     offline_bins = max(total_bins - active_bins, 0)
 
-    avg_confidence = db.session.query(func.avg(WasteLog.confidence_score)).scalar()
+    avg_confidence = data.avg_confidence
+    carbon_avoided = data.carbon_avoided
+    category_totals = data.category_totals
+    total_weight = data.total_weight
     if avg_confidence is None:
         sorting_accuracy = 0
     else:
         normalized_conf = avg_confidence * 100 if avg_confidence <= 1 else avg_confidence
         sorting_accuracy = min(max(normalized_conf, 0), 100)
 
-    carbon_avoided = db.session.query(func.sum(CarbonMetric.co2_reduction_value)).scalar() or 0
-
-    logs = WasteLog.query.order_by(WasteLog.timestamp.desc()).all()
-    category_totals = {}
-    total_weight = 0
-    for log in logs:
-        weight = CATEGORY_WEIGHTS_KG.get(log.category, 1)
-        category_totals[log.category] = category_totals.get(log.category, 0) + weight
-        total_weight += weight
-
     waste_legend = []
     for category, weight in category_totals.items():
         waste_legend.append(
@@ -90,9 +75,8 @@ def get_dashboard():
         },
     ]
 
-    live_logs = WasteLog.query.order_by(WasteLog.timestamp.desc()).limit(4).all()
     live_feed = []
-    for log in live_logs:
+    for log in data.live_logs:
         time_label = log.timestamp.strftime("%I:%M %p") if log.timestamp else "N/A"
         confidence = log.confidence_score * 100 if log.confidence_score <= 1 else log.confidence_score
         live_feed.append(
@@ -105,42 +89,34 @@ def get_dashboard():
         )
 
     alerts = []
-    full_bins = SmartBin.query.filter(SmartBin.fill_level >= 90).limit(2).all()
-    for bin_item in full_bins:
+    for bin_item in data.full_bins:
         alerts.append(
             {
                 "type": "Bin Full",
-                "location": bin_item.location_name,
-                "status": f"{bin_item.fill_level}% Full",
+                "location": bin_item["location_name"],
+                "status": f"{bin_item['fill_level']}% Full",
                 "tone": "full",
                 "time": "Just now",
             }
         )
 
-    offline_bins_list = SmartBin.query.filter_by(is_active=False).limit(1).all()
-    for bin_item in offline_bins_list:
+    for bin_item in data.offline_bins:
         alerts.append(
             {
                 "type": "Bin Offline",
-                "location": bin_item.location_name,
+                "location": bin_item["location_name"],
                 "status": "Disconnected",
                 "tone": "offline",
                 "time": "Just now",
             }
         )
 
-    anomalies = (
-        AnomalyData.query.filter_by(status_verified=False)
-        .order_by(AnomalyData.id.desc())
-        .limit(1)
-        .all()
-    )
-    for anomaly in anomalies:
+    for anomaly in data.anomalies:
         alerts.append(
             {
                 "type": "High Anomaly",
                 "location": "Inspection Queue",
-                "status": anomaly.user_label or "Mixed Waste",
+                "status": anomaly["user_label"] or "Mixed Waste",
                 "tone": "anomaly",
                 "time": "Just now",
             }
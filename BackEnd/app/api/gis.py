@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from typing import List, Optional, Tuple
+
+from flask import Blueprint, Response, jsonify, request
+
+from app.extensions import db
+from app.services.spatial_index import BBox, get_spatial_index
+from app.services.vector_tiles import MAX_ZOOM, MVT_MIMETYPE, get_tile_cache
+
+gis_bp = Blueprint("gis", __name__)
+
+MAX_BBOX_RESULTS = 5000
+MAX_NEAREST = 100
+
+
+class GisQueryError(ValueError):
+    pass
+
+
+def _bad_request(error: str, message: str):
+    return jsonify({"error": error, "message": message}), 400
+
+
+def _parse_bbox(raw: Optional[str]) -> List[BBox]:
+    """``minLon,minLat,maxLon,maxLat`` as one box, or two when it crosses the antimeridian."""
+    if not raw:
+        raise GisQueryError("bbox is required: minLon,minLat,maxLon,maxLat")
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in raw.split(","))
+    except ValueError:
+        raise GisQueryError("bbox must be four numbers: minLon,minLat,maxLon,maxLat") from None
+    if not (-90 <= min_lat <= max_lat <= 90):
+        raise GisQueryError("bbox latitudes must satisfy -90 <= minLat <= maxLat <= 90")
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise GisQueryError("bbox longitudes must be within -180..180")
+    if min_lon > max_lon:
+        return [(min_lon, min_lat, 180.0, max_lat), (-180.0, min_lat, max_lon, max_lat)]
+    return [(min_lon, min_lat, max_lon, max_lat)]
+
+
+def _parse_point() -> Tuple[float, float]:
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise GisQueryError("lat and lon are required and must be valid coordinates")
+    return lat, lon
+
+
+def _fresh_index():
+    index = get_spatial_index()
+    index.refresh(db.session)
+    return index
+
+
+@gis_bp.get("/bins")
+def bins_in_bbox():
+    try:
+        boxes = _parse_bbox(request.args.get("bbox"))
+    except GisQueryError as exc:
+        return _bad_request("invalid_bbox", str(exc))
+    limit = min(max(request.args.get("limit", MAX_BBOX_RESULTS, type=int), 1), MAX_BBOX_RESULTS)
+
+    index = _fresh_index()
+    points, truncated = [], False
+    for box in boxes:
+        found, cut = index.within(box, limit - len(points))
+        points.extend(found)
+        truncated = truncated or cut
+    payload = [point.to_dict() for point in points]
+    return jsonify({"count": len(payload), "truncated": truncated, "data": payload})
+
+
+@gis_bp.get("/nearest")
+def nearest_bins():
+    try:
+        lat, lon = _parse_point()
+    except GisQueryError as exc:
+        return _bad_request("invalid_point", str(exc))
+    k = min(max(request.args.get("k", 5, type=int), 1), MAX_NEAREST)
+    max_km = request.args.get("max_km", type=float)
+
+    payload = []
+    for distance, point in _fresh_index().nearest(lat, lon, k=k, max_km=max_km):
+        item = point.to_dict()
+        item["distance_km"] = round(distance, 3)
+        payload.append(item)
+    return jsonify({"count": len(payload), "data": payload})
+
+
+@gis_bp.get("/clusters")
+def bin_clusters():
+    try:
+        boxes = _parse_bbox(request.args.get("bbox"))
+    except GisQueryError as exc:
+        return _bad_request("invalid_bbox", str(exc))
+    zoom = request.args.get("zoom", type=int)
+    if zoom is None or not 0 <= zoom <= MAX_ZOOM:
+        return _bad_request("invalid_zoom", f"zoom is required and must be within 0..{MAX_ZOOM}")
+
+    index = _fresh_index()
+    payload = [cluster for box in boxes for cluster in index.clusters(box, zoom)]
+    return jsonify(
+        {
+            "zoom": zoom,
+            "count": len(payload),
+            "bins": sum(cluster["count"] for cluster in payload),
+            "data": payload,
+        }
+    )
+
+
+@gis_bp.get("/tiles/<int:z>/<int:x>/<int:y>.mvt")
+def bin_tile(z: int, x: int, y: int):
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2**z and 0 <= y < 2**z):
+        return jsonify({"error": "invalid_tile", "message": f"no tile {z}/{x}/{y}"}), 404
+
+    cache = get_tile_cache()
+    # Applies pending bin changes first, which drops the cached tiles they touch.
+    index = _fresh_index()
+    tile = cache.tile(index, z, x, y)
+    response = Response(tile.body, mimetype=MVT_MIMETYPE)
+    response.set_etag(tile.etag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.make_conditional(request)
+    if response.status_code == 304:
+        cache.record_not_modified()
+    return response
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from flask import Blueprint, jsonify, request
+
+from app.extensions import db
+from app.services.telemetry import (
+    PayloadTooLarge,
+    TelemetryError,
+    UnsupportedPayload,
+    decode_payload,
+    get_telemetry_settings,
+    parse_events,
+    write_batch,
+)
+
+telemetry_bp = Blueprint("telemetry", __name__)
+
+
+@telemetry_bp.post("/events")
+def ingest_events():
+    settings = get_telemetry_settings()
+    try:
+        batch = parse_events(decode_payload(request.get_data(cache=False), request.mimetype), settings)
+    except UnsupportedPayload as exc:
+        return jsonify({"error": "unsupported_media_type", "message": str(exc)}), 415
+    except PayloadTooLarge as exc:
+        return jsonify({"error": "too_many_events", "message": str(exc)}), 413
+    except TelemetryError as exc:
+        return jsonify({"error": "invalid_payload", "message": str(exc)}), 400
+
+    try:
+        result = write_batch(db.session, batch, settings)
+        db.session.commit()
+    except Exception as exc:
+        db.session.rollback()
+        return jsonify({"error": "telemetry_write_failed", "message": str(exc)}), 500
+
+    # Partial batches are accepted; only a batch with nothing usable is an error.
+    status = 400 if batch.rejected and not batch.accepted else 200
+    return jsonify(result), status
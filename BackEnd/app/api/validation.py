@@ -1,21 +1,32 @@
 from __future__ import annotations
 
 import base64
+import json
 import os
 from datetime import datetime
-from pathlib import Path
-from uuid import uuid4
 
-from flask import Blueprint, jsonify, request, send_from_directory
+from flask import Blueprint, Response, jsonify, request, send_file, stream_with_context
+from sqlalchemy import and_, func, not_, or_
 
 from app.db_models.models import AnomalyData, SmartBin, WasteLog
 from app.extensions import db
+from app.services.anomaly import anomaly_write_applied
+from app.services.image_store import get_image_store
+from app.services.response_cache import get_response_cache
+from app.services.write_behind import QueueFull, get_write_behind, new_write_key, write_behind_op
 
 validation_bp = Blueprint("validation", __name__)
 
-BASE_DIR = Path(__file__).resolve().parents[2]
-ANOMALY_DIR = BASE_DIR / "app" / "storage" / "anomaly_uploads"
-ANOMALY_DIR.mkdir(parents=True, exist_ok=True)
+QUEUE_STATUSES = ("pending", "confirmed", "rejected")
+QUEUE_PAGE_SIZE = 50
+QUEUE_MAX_PAGE_SIZE = 200
+EXPORT_BATCH_ROWS = 500
+# Stored names are content hashes (or one-off legacy uuids), so a URL never
+# changes content and browsers may keep it for good.
+IMAGE_MAX_AGE = 365 * 24 * 3600
+# A thumbnail URL answered with the original (thumbnail not built yet) must be
+# refetched soon, or browsers would keep the full-size image for a year.
+IMAGE_FALLBACK_MAX_AGE = 60
 
 
 def _ensure_bin(bin_id: int | None) -> SmartBin:
@@ -36,7 +47,8 @@ def _ensure_bin(bin_id: int | None) -> SmartBin:
         fill_level=0,
     )
     db.session.add(bin_item)
-    db.session.commit()
+    # Runs inside the write-behind flush; the batch commits.
+    db.session.flush()
     return bin_item
 
 
@@ -60,10 +72,7 @@ def _save_image(image_base64: str | None) -> str | None:
     elif "image/webp" in header:
         ext = "webp"
 
-    filename = f"crowd_{uuid4().hex}.{ext}"
-    file_path = ANOMALY_DIR / filename
-    file_path.write_bytes(data)
-    return filename
+    return get_image_store().save(data, ext)
 
 
 def _format_confidence(value: float | None) -> float | None:
@@ -75,7 +84,11 @@ def _format_confidence(value: float | None) -> float | None:
 def _item_status(anomaly: AnomalyData, ai_label: str | None) -> str:
     if not anomaly.status_verified:
         return "pending"
-    if anomaly.user_label and ai_label and anomaly.user_label != ai_label:
+    return _verified_status(anomaly.user_label, ai_label)
+
+
+def _verified_status(user_label: str | None, ai_label: str | None) -> str:
+    if user_label and ai_label and user_label != ai_label:
         return "rejected"
     return "confirmed"
 
@@ -100,21 +113,159 @@ def _serialize_item(anomaly: AnomalyData, log: WasteLog | None, bin_item: SmartB
         "location": bin_item.location_name if bin_item else "Unknown",
         "timestamp": (log.timestamp.isoformat() if log and log.timestamp else datetime.utcnow().isoformat()),
         "image_url": f"/api/validation/image/{filename}" if filename else None,
+        "thumbnail_url": f"/api/validation/image/{filename}?size=thumb" if filename else None,
+        "write_key": anomaly.write_key,
     }
 
 
-@validation_bp.get("/queue")
-def get_validation_queue():
-    rows = (
+def _status_filter(status: str):
+    label_differs = and_(
+        AnomalyData.user_label.isnot(None),
+        AnomalyData.user_label != "",
+        WasteLog.category.isnot(None),
+        WasteLog.category != "",
+        AnomalyData.user_label != WasteLog.category,
+    )
+    if status == "pending":
+        return or_(AnomalyData.status_verified == False, AnomalyData.status_verified.is_(None))  # noqa: E712
+    if status == "rejected":
+        return and_(AnomalyData.status_verified == True, label_differs)  # noqa: E712
+    return and_(AnomalyData.status_verified == True, not_(label_differs))  # noqa: E712
+
+
+def _queue_query(status: str | None):
+    query = (
         db.session.query(AnomalyData, WasteLog, SmartBin)
         .outerjoin(WasteLog, AnomalyData.waste_log_id == WasteLog.id)
         .outerjoin(SmartBin, WasteLog.bin_id == SmartBin.id)
-        .order_by(AnomalyData.id.desc())
-        .all()
     )
+    if status:
+        query = query.filter(_status_filter(status))
+    return query.order_by(AnomalyData.id.desc())
+
+
+def _queue_total(status: str | None) -> int:
+    def count() -> int:
+        query = db.session.query(func.count(AnomalyData.id))
+        if status:
+            query = query.outerjoin(WasteLog, AnomalyData.waste_log_id == WasteLog.id).filter(
+                _status_filter(status)
+            )
+        return int(query.scalar() or 0)
+
+    # Cleared with the rest of the response cache whenever anomalies are committed.
+    return get_response_cache().cached("validation.queue_total", ("validation_queue_total", status), count)
+
+
+def _queue_status_arg():
+    status = (request.args.get("status") or "").strip().lower() or None
+    if status and status not in QUEUE_STATUSES:
+        return None, (
+            jsonify(
+                {
+                    "error": "invalid_status",
+                    "message": f"status harus salah satu dari: {', '.join(QUEUE_STATUSES)}",
+                }
+            ),
+            400,
+        )
+    return status, None
 
+
+@validation_bp.get("/queue")
+def get_validation_queue():
+    status, error = _queue_status_arg()
+    if error:
+        return error
+    limit = request.args.get("limit", QUEUE_PAGE_SIZE, type=int)
+    limit = min(max(limit, 1), QUEUE_MAX_PAGE_SIZE)
+    after_id = request.args.get("after_id", type=int)
+
+    query = _queue_query(status)
+    if after_id:
+        query = query.filter(AnomalyData.id < after_id)
+    rows = query.limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
     items = [_serialize_item(anomaly, log, bin_item) for anomaly, log, bin_item in rows]
-    return jsonify({"items": items})
+    return jsonify(
+        {
+            "items": items,
+            "limit": limit,
+            "status": status,
+            "total": _queue_total(status),
+            "next_after_id": items[-1]["id"] if has_more else None,
+        }
+    )
+
+
+@validation_bp.get("/queue/export")
+def export_validation_queue():
+    status, error = _queue_status_arg()
+    if error:
+        return error
+
+    def generate():
+        yield '{"items":['
+        first = True
+        batch = []
+        for anomaly, log, bin_item in _queue_query(status).yield_per(EXPORT_BATCH_ROWS):
+            batch.append(json.dumps(_serialize_item(anomaly, log, bin_item), separators=(",", ":")))
+            if len(batch) >= EXPORT_BATCH_ROWS:
+                yield ("" if first else ",") + ",".join(batch)
+                first = False
+                batch = []
+        if batch:
+            yield ("" if first else ",") + ",".join(batch)
+        yield "]}"
+
+    response = Response(stream_with_context(generate()), mimetype="application/json")
+    response.headers["Content-Disposition"] = "attachment; filename=validation_queue.json"
+    return response
+
+
+@write_behind_op("validation.create")
+def _apply_create(session, payload: dict) -> None:
+    if anomaly_write_applied(session, payload.get("write_key")):
+        return
+    bin_item = _ensure_bin(payload.get("bin_id"))
+    log = WasteLog(
+        bin_id=bin_item.id,
+        category=payload["ai_label"],
+        confidence_score=payload["ai_confidence"],
+        timestamp=datetime.fromisoformat(payload["timestamp"]),
+        visual_conf=payload["ai_confidence"],
+        audio_conf=payload.get("audio_confidence"),
+        image_path=payload["image_path"],
+    )
+    session.add(log)
+    session.flush()
+    session.add(
+        AnomalyData(
+            waste_log_id=log.id,
+            image_path=payload["image_path"],
+            user_label=payload["crowd_label"],
+            status_verified=False,
+            write_key=payload.get("write_key"),
+        )
+    )
+
+
+@write_behind_op("validation.resolve")
+def _apply_resolve(session, payload: dict) -> None:
+    anomaly = session.get(AnomalyData, payload["anomaly_id"])
+    if anomaly is None:
+        return
+    if payload.get("user_label"):
+        anomaly.user_label = payload["user_label"]
+    anomaly.status_verified = True
+
+
+def _queue_full(exc: QueueFull):
+    response = jsonify({"error": "write_queue_full", "message": str(exc)})
+    response.headers["Retry-After"] = "1"
+    return response, 503
 
 
 @validation_bp.post("/queue")
@@ -126,34 +277,69 @@ def create_validation_queue_item():
     bin_id = payload.get("bin_id")
     audio_confidence = payload.get("audio_confidence")
 
-    bin_item = _ensure_bin(bin_id)
-    image_filename = _save_image(payload.get("image_base64"))
-
+    # The row is written later by the write-behind queue, so bad input is rejected here.
     try:
-        log = WasteLog(
-            bin_id=bin_item.id,
-            category=ai_label,
-            confidence_score=float(ai_confidence),
-            visual_conf=float(ai_confidence) if ai_confidence is not None else None,
-            audio_conf=float(audio_confidence) if audio_confidence is not None else None,
-            image_path=image_filename,
-        )
-        db.session.add(log)
-        db.session.flush()
+        ai_confidence = float(ai_confidence)
+        audio_confidence = float(audio_confidence) if audio_confidence is not None else None
+        bin_id = int(bin_id) if bin_id else None
+    except (TypeError, ValueError) as exc:
+        return jsonify({"error": "validation_create_failed", "message": str(exc)}), 400
 
-        anomaly = AnomalyData(
-            waste_log_id=log.id,
-            image_path=image_filename,
-            user_label=crowd_label,
-            status_verified=False,
+    image_filename = _save_image(payload.get("image_base64"))
+    if not image_filename:
+        # anomaly_data.image_path is NOT NULL; fail now rather than in the background flush.
+        return jsonify({"error": "validation_create_failed", "message": "A valid image_base64 is required"}), 400
+    timestamp = datetime.utcnow().isoformat()
+    write_key = new_write_key()
+    try:
+        queued = get_write_behind().submit(
+            "validation.create",
+            {
+                "bin_id": bin_id,
+                "ai_label": ai_label,
+                "ai_confidence": ai_confidence,
+                "audio_confidence": audio_confidence,
+                "crowd_label": crowd_label,
+                "image_path": image_filename,
+                "timestamp": timestamp,
+                "write_key": write_key,
+            },
         )
-        db.session.add(anomaly)
-        db.session.commit()
+    except QueueFull as exc:
+        return _queue_full(exc)
     except Exception as exc:
-        db.session.rollback()
         return jsonify({"error": "validation_create_failed", "message": str(exc)}), 400
 
-    return jsonify(_serialize_item(anomaly, log, bin_item)), 201
+    if not queued:
+        # Written inline (queue disabled or not started): answer with the stored row.
+        row = (
+            db.session.query(AnomalyData, WasteLog, SmartBin)
+            .outerjoin(WasteLog, WasteLog.id == AnomalyData.waste_log_id)
+            .outerjoin(SmartBin, SmartBin.id == WasteLog.bin_id)
+            .filter(AnomalyData.write_key == write_key)
+            .one()
+        )
+        return jsonify({**_serialize_item(*row), "queued": False}), 201
+
+    # The id is assigned when the write is flushed; write_key identifies the item until then.
+    bin_item = db.session.get(SmartBin, bin_id) if bin_id else None
+    return jsonify(
+        {
+            "id": None,
+            "queued": True,
+            "write_key": write_key,
+            "ai_label": ai_label,
+            "ai_confidence": ai_confidence,
+            "crowd_label": crowd_label,
+            "status": "pending",
+            "resolved_type": "",
+            "bin_name": bin_item.location_name if bin_item else "Unknown",
+            "location": bin_item.location_name if bin_item else "Unknown",
+            "timestamp": timestamp,
+            "image_url": f"/api/validation/image/{image_filename}",
+            "thumbnail_url": f"/api/validation/image/{image_filename}?size=thumb",
+        }
+    ), 202
 
 
 @validation_bp.patch("/queue/<int:anomaly_id>")
@@ -168,25 +354,49 @@ def resolve_validation_queue_item(anomaly_id: int):
 
     log = WasteLog.query.get(anomaly.waste_log_id) if anomaly.waste_log_id else None
     ai_label = log.category if log else None
+    bin_item = SmartBin.query.get(log.bin_id) if log else None
 
     if action == "confirm" and not resolved_type:
         resolved_type = ai_label or anomaly.user_label
 
-    if resolved_type:
-        anomaly.user_label = resolved_type
-
-    anomaly.status_verified = True
-
     try:
-        db.session.commit()
+        get_write_behind().submit("validation.resolve", {"anomaly_id": anomaly_id, "user_label": resolved_type})
+    except QueueFull as exc:
+        return _queue_full(exc)
     except Exception as exc:
-        db.session.rollback()
         return jsonify({"error": "validation_update_failed", "message": str(exc)}), 400
 
-    bin_item = SmartBin.query.get(log.bin_id) if log else None
-    return jsonify(_serialize_item(anomaly, log, bin_item))
+    # Answer with the state the queued write produces. The loaded row is left untouched so
+    # an autoflush cannot write it behind the queue's back.
+    item = _serialize_item(anomaly, log, bin_item)
+    crowd_label = resolved_type or anomaly.user_label
+    item.update(
+        crowd_label=crowd_label,
+        status=_verified_status(crowd_label, ai_label),
+        resolved_type=crowd_label,
+    )
+    return jsonify(item)
 
 
 @validation_bp.get("/image/<path:filename>")
 def get_validation_image(filename: str):
-    return send_from_directory(ANOMALY_DIR, filename, as_attachment=False)
+    size = request.args.get("size")
+    store = get_image_store()
+    if size and size not in store.sizes:
+        allowed = ", ".join(store.sizes)
+        return jsonify({"error": "invalid_size", "message": f"size must be one of: {allowed}"}), 400
+    if os.path.basename(filename) != filename or filename.startswith("."):
+        return jsonify({"error": "not_found", "message": "Image not found"}), 404
+
+    path = store.resolve(filename, size)
+    if path is None:
+        return jsonify({"error": "not_found", "message": "Image not found"}), 404
+
+    if size and path.name == filename:
+        response = send_file(path, max_age=IMAGE_FALLBACK_MAX_AGE, conditional=True, etag=True)
+        response.cache_control.public = True
+        return response
+    response = send_file(path, max_age=IMAGE_MAX_AGE, conditional=True, etag=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
@@ -11,6 +11,12 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Set to false on dashboard-only workers to skip the ML routes and their imports.
+    ENABLE_AI_ROUTES = os.getenv('ENABLE_AI_ROUTES', 'true').lower() in ('1', 'true', 'yes')
+    # Serve dashboard/analytics totals from daily_bin_category_rollup instead of scanning waste_logs.
+    ANALYTICS_USE_ROLLUP = os.getenv('ANALYTICS_USE_ROLLUP', 'true').lower() in ('1', 'true', 'yes')
+    # Load the audio model while the app boots instead of on the first request.
+    AUDIO_MODEL_WARMUP = os.getenv('AUDIO_MODEL_WARMUP', 'false').lower() in ('1', 'true', 'yes')
 
     if not SQLALCHEMY_DATABASE_URI:
         raise RuntimeError("DATABASE_URL or SUPABASE_DB_URL must be set")
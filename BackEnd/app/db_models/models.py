@@ -1,5 +1,6 @@
 from app.extensions import db
 from datetime import datetime
+from sqlalchemy import event, inspect, select, update
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -16,35 +17,145 @@ class SmartBin(db.Model):
     longitude = db.Column(db.Float, nullable=False)
     is_active = db.Column(db.Boolean, default=True)
     fill_level = db.Column(db.Integer, default=0)  
+    # Newest log or telemetry event, and logs written today (UTC); maintained on
+    # every log write by app.services.bin_activity, rebuilt by reconcile_bins.py
+    last_seen_at = db.Column(db.DateTime)
+    logs_today = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    logs_today_date = db.Column(db.Date)
     
     logs = db.relationship('WasteLog', backref='bin', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_smart_bins_fill_level', 'fill_level'),
+        db.Index('ix_smart_bins_is_active', 'is_active'),
+    )
+
 class WasteLog(db.Model):
     __tablename__ = 'waste_logs'
+    # On PostgreSQL the table is partitioned by month and its primary key is
+    # (id, timestamp) (migration b7e3a91c2d54); id alone stays the ORM identity,
+    # the sequence keeps it unique. Other databases keep the plain id key.
     id = db.Column(db.Integer, primary_key=True)
     bin_id = db.Column(db.Integer, db.ForeignKey('smart_bins.id'), nullable=False)
     category = db.Column(db.String(50), nullable=False)
     confidence_score = db.Column(db.Float, nullable=False) 
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Partition key on PostgreSQL (monthly ranges, see app.services.archive)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     # Detail tambahan untuk audit sistem (opsional tapi disarankan)
     visual_conf = db.Column(db.Float)
     audio_conf = db.Column(db.Float)
     image_path = db.Column(db.String(255))
 
-    carbon_metric = db.relationship('CarbonMetric', backref='log', uselist=False)
+    # Logical links: foreign keys cannot reference a partitioned table's id alone.
+    carbon_metric = db.relationship(
+        'CarbonMetric',
+        primaryjoin='WasteLog.id == foreign(CarbonMetric.log_id)',
+        backref='log',
+        uselist=False,
+    )
+
+    __table_args__ = (
+        # per-bin history, newest first (and the bin activity reconcile)
+        db.Index('ix_waste_logs_bin_id_timestamp', bin_id, timestamp.desc()),
+        # date-range filters and the live feed
+        db.Index('ix_waste_logs_timestamp', 'timestamp'),
+    )
 
 class CarbonMetric(db.Model):
     __tablename__ = 'carbon_metrics'
     id = db.Column(db.Integer, primary_key=True)
-    log_id = db.Column(db.Integer, db.ForeignKey('waste_logs.id'), unique=True)
+    log_id = db.Column(db.Integer)  # waste_logs.id, see WasteLog.carbon_metric
     co2_reduction_value = db.Column(db.Float, nullable=False) 
     methane_reduction = db.Column(db.Float, nullable=False)   
+    # Copy of waste_logs.timestamp so carbon rows share their log's monthly partition
+    log_timestamp = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        # Unique constraints on a partitioned table must include its range key.
+        db.UniqueConstraint('log_id', 'log_timestamp', name='carbon_metrics_log_id_log_timestamp_key'),
+        # Lets log -> carbon joins read the totals from the index alone.
+        db.Index('ix_carbon_metrics_log_id_totals', 'log_id', 'co2_reduction_value', 'methane_reduction'),
+    )
 
 class AnomalyData(db.Model):
     __tablename__ = 'anomaly_data'
     id = db.Column(db.Integer, primary_key=True)
-    waste_log_id = db.Column(db.Integer, db.ForeignKey('waste_logs.id'))
+    waste_log_id = db.Column(db.Integer)  # waste_logs.id, a logical link (see WasteLog)
     image_path = db.Column(db.String(255), nullable=False) 
     user_label = db.Column(db.String(50))  
-    status_verified = db.Column(db.Boolean, default=False) 
\ No newline at end of file
+    status_verified = db.Column(db.Boolean, default=False) 
+    # Idempotency key of the write-behind record that created the row (see write_behind.py).
+    write_key = db.Column(db.String(32))
+
+    __table_args__ = (
+        db.Index('ix_anomaly_data_write_key', 'write_key', unique=True),
+        # Only the (small) unverified queue is looked up by status.
+        db.Index(
+            'ix_anomaly_data_unverified',
+            'id',
+            postgresql_where=db.text('status_verified = false'),
+            sqlite_where=db.text('status_verified = 0'),
+        ),
+    )
+
+@event.listens_for(CarbonMetric, 'before_insert')
+def _fill_log_timestamp(mapper, connection, target):
+    if target.log_timestamp is not None:
+        return
+    log = target.__dict__.get('log')
+    if log is None and target.log_id is not None:
+        session = inspect(target).session
+        log = session.identity_map.get(session.identity_key(WasteLog, target.log_id)) if session else None
+    if log is not None and log.timestamp is not None:
+        target.log_timestamp = log.timestamp
+    elif target.log_id is not None:
+        target.log_timestamp = connection.execute(
+            select(WasteLog.timestamp).where(WasteLog.id == target.log_id)
+        ).scalar()
+    if target.log_timestamp is None:
+        target.log_timestamp = datetime.utcnow()
+
+
+@event.listens_for(WasteLog, 'after_update')
+def _follow_log_timestamp(mapper, connection, target):
+    if inspect(target).attrs.timestamp.history.has_changes():
+        connection.execute(
+            update(CarbonMetric.__table__)
+            .where(CarbonMetric.log_id == target.id)
+            .values(log_timestamp=target.timestamp)
+        )
+
+class DailyBinCategoryRollup(db.Model):
+    """Per bin, per day, per category totals kept in step with waste_logs.
+
+    Maintained incrementally by app.services.rollups on every flush, and
+    rebuilt from scratch by backfill_rollups.py.
+    """
+    __tablename__ = 'daily_bin_category_rollup'
+    bin_id = db.Column(db.Integer, db.ForeignKey('smart_bins.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    log_count = db.Column(db.Integer, nullable=False, default=0)
+    weight_kg = db.Column(db.Float, nullable=False, default=0)  # estimasi dari CATEGORY_WEIGHTS_KG
+    co2_kg = db.Column(db.Float, nullable=False, default=0)
+    methane_kg = db.Column(db.Float, nullable=False, default=0)
+    confidence_sum = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_daily_rollup_day', 'day'),
+    )
+
+class ArchivedPartition(db.Model):
+    """A month of waste_logs / carbon_metrics moved out to Parquet.
+
+    Written by app.services.archive; analytics read these months back from
+    the files when a requested range reaches past the hot tables.
+    """
+    __tablename__ = 'archived_partitions'
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    waste_logs_rows = db.Column(db.Integer, nullable=False, default=0)
+    carbon_metrics_rows = db.Column(db.Integer, nullable=False, default=0)
+    waste_logs_path = db.Column(db.String(255), nullable=False)
+    carbon_metrics_path = db.Column(db.String(255), nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
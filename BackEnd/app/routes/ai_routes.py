@@ -2,16 +2,49 @@ from __future__ import annotations
 
 import base64
 import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
 
 from flask import Blueprint, jsonify, request
 
 from app.extensions import sock
-from app.services.audio_service import AudioService
-from app.services.visual_service import VisualService
+from app.services.model_registry import get_model_registry
+from app.services.result_cache import get_result_cache
 
 
 ai_bp = Blueprint("ai", __name__)
 
+# Shared, bounded pool for the visual/audio branches of multimodal requests.
+MULTIMODAL_MAX_WORKERS = max(int(os.getenv("MULTIMODAL_MAX_WORKERS", "8")), 2)
+_BRANCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=MULTIMODAL_MAX_WORKERS,
+    thread_name_prefix="multimodal",
+)
+# A timed-out branch keeps its worker until the model call returns (cancel() cannot
+# stop a running future), so branches are counted until they finish and requests
+# that would queue behind a full pool get a 503 instead.
+_BRANCH_SLOTS = threading.BoundedSemaphore(MULTIMODAL_MAX_WORKERS)
+MULTIMODAL_VISUAL_TIMEOUT = float(os.getenv("MULTIMODAL_VISUAL_TIMEOUT", "10"))
+MULTIMODAL_AUDIO_TIMEOUT = float(os.getenv("MULTIMODAL_AUDIO_TIMEOUT", "10"))
+AUDIO_BATCH_MAX_CLIPS = int(os.getenv("AUDIO_BATCH_MAX_CLIPS", "64"))
+
+
+# The ML services pull in cv2, supervision, soundfile and friends. They are
+# imported on first use so workers that never hit these routes boot fast.
+def _audio_service():
+    from app.services.audio_service import AudioService
+
+    return AudioService()
+
+
+def _visual_service():
+    from app.services.visual_service import get_visual_service
+
+    return get_visual_service()
+
 
 def _get_base64_from_request() -> str:
     data = request.get_json(silent=True) or {}
@@ -19,15 +52,32 @@ def _get_base64_from_request() -> str:
     return b64
 
 
+def _get_raw_body(kind: str) -> bytes | None:
+    """Body of a raw upload (``application/octet-stream`` or ``<kind>/*``).
+
+    Read straight from the input stream: no form parsing, no base64, and
+    the bytes are handed to the decoder as is.
+    """
+    mimetype = request.mimetype
+    if mimetype == "application/octet-stream" or mimetype.startswith(f"{kind}/"):
+        return request.get_data(cache=False)
+    return None
+
+
 @ai_bp.post("/predict/visual")
 def predict_visual():
     try:
-        service = VisualService()
+        service = _visual_service()
+        raw_body = _get_raw_body("image")
 
         if "file" in request.files:
             file = request.files["file"]
             image_bytes = file.read()
             result = service.detect_from_file_bytes(image_bytes)
+        elif raw_body is not None:
+            if not raw_body:
+                return jsonify({"error": "No image provided"}), 400
+            result = service.detect_from_file_bytes(raw_body)
         else:
             b64 = _get_base64_from_request()
             if not b64:
@@ -44,12 +94,17 @@ def predict_visual():
 @ai_bp.post("/predict/audio")
 def predict_audio():
     try:
-        service = AudioService()
+        service = _audio_service()
+        raw_body = _get_raw_body("audio")
 
         if "file" in request.files:
             file = request.files["file"]
             audio_bytes = file.read()
             result = service.predict(audio_bytes)
+        elif raw_body is not None:
+            if not raw_body:
+                return jsonify({"error": "No audio provided"}), 400
+            result = service.predict(raw_body)
         else:
             b64 = _get_base64_from_request()
             if not b64:
@@ -67,6 +122,81 @@ def predict_audio():
         return jsonify({"error": str(exc)}), 400
 
 
+@ai_bp.post("/predict/audio/batch")
+def predict_audio_batch():
+    try:
+        clips = []
+        names = []
+        if request.files:
+            for file in request.files.getlist("files") or request.files.getlist("file"):
+                clips.append(file.read())
+                names.append(file.filename)
+        else:
+            data = request.get_json(silent=True) or {}
+            items = data.get("clips") or data.get("audio_base64") or []
+            if not isinstance(items, list):
+                return jsonify({"error": "Expected a list of base64 clips"}), 400
+            for index, b64 in enumerate(items):
+                if not isinstance(b64, str):
+                    return jsonify({"error": f"Clip {index} is not a base64 string"}), 400
+                if "," in b64:
+                    b64 = b64.split(",", 1)[1]
+                try:
+                    clips.append(base64.b64decode(b64, validate=True))
+                except Exception:
+                    return jsonify({"error": f"Invalid base64 audio at index {index}"}), 400
+                names.append(None)
+
+        if not clips:
+            return jsonify({"error": "No audio provided"}), 400
+        if len(clips) > AUDIO_BATCH_MAX_CLIPS:
+            return jsonify({"error": f"Too many clips (max {AUDIO_BATCH_MAX_CLIPS})"}), 400
+
+        results = _audio_service().predict_batch(clips)
+        for index, (name, result) in enumerate(zip(names, results)):
+            result["index"] = index
+            if name:
+                result["filename"] = name
+        return jsonify({"count": len(results), "results": results})
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 400
+
+
+def _run_visual_branch(image_bytes: bytes) -> dict:
+    visual_result = {
+        "label": None,
+        "confidence": 0.0,
+        "detections": [],
+        "annotated_image": None,
+    }
+    service = _visual_service()
+    visual_payload = service.detect_from_file_bytes(image_bytes)
+    detections = visual_payload.get("detections", [])
+    annotated_image = visual_payload.get("annotated_image")
+    visual_result["detections"] = detections
+    visual_result["annotated_image"] = annotated_image
+    if detections:
+        top = max(detections, key=lambda item: item.get("confidence", 0.0))
+        visual_result["label"] = top.get("label")
+        visual_result["confidence"] = float(top.get("confidence", 0.0))
+    return visual_result
+
+
+def _run_audio_branch(audio_bytes: bytes) -> dict:
+    audio_service = _audio_service()
+    audio_payload = audio_service.predict(audio_bytes)
+    return {
+        "label": audio_payload.get("label"),
+        "confidence": float(audio_payload.get("confidence", 0.0)),
+    }
+
+
+def _timed_branch(func, payload: bytes) -> tuple[dict, float]:
+    started = time.perf_counter()
+    result = func(payload)
+    return result, time.perf_counter() - started
+
+
 @ai_bp.post("/predict/multimodal")
 def predict_multimodal():
     visual_result = {
@@ -77,66 +207,161 @@ def predict_multimodal():
     }
     audio_result = {"label": None, "confidence": 0.0}
     errors: dict[str, str] = {}
+    timings: dict[str, float | None] = {}
+    debug = request.args.get("debug", "").lower() in ("1", "true", "yes")
+    started = time.perf_counter()
 
+    # Read both uploads first, then run the branches side by side so the
+    # response returns after the slower branch instead of after both.
+    branches = {}
     if "image" in request.files:
         image_bytes = request.files["image"].read()
         if image_bytes:
-            try:
-                service = VisualService()
-                visual_payload = service.detect_from_file_bytes(image_bytes)
-                detections = visual_payload.get("detections", [])
-                annotated_image = visual_payload.get("annotated_image")
-                visual_result["detections"] = detections
-                visual_result["annotated_image"] = annotated_image
-                if detections:
-                    top = max(detections, key=lambda item: item.get("confidence", 0.0))
-                    visual_result["label"] = top.get("label")
-                    visual_result["confidence"] = float(top.get("confidence", 0.0))
-            except Exception as exc:
-                errors["visual"] = str(exc)
-
+            branches["visual"] = (_run_visual_branch, image_bytes, MULTIMODAL_VISUAL_TIMEOUT)
     if "audio" in request.files:
         audio_bytes = request.files["audio"].read()
         if audio_bytes:
-            try:
-                audio_service = AudioService()
-                audio_payload = audio_service.predict(audio_bytes)
-                audio_result["label"] = audio_payload.get("label")
-                audio_result["confidence"] = float(audio_payload.get("confidence", 0.0))
-            except Exception as exc:
-                errors["audio"] = str(exc)
+            branches["audio"] = (_run_audio_branch, audio_bytes, MULTIMODAL_AUDIO_TIMEOUT)
+
+    acquired = 0
+    for _ in branches:
+        if not _BRANCH_SLOTS.acquire(blocking=False):
+            break
+        acquired += 1
+    if acquired < len(branches):
+        for _ in range(acquired):
+            _BRANCH_SLOTS.release()
+        response = jsonify(
+            {"error": "multimodal_busy", "message": "All multimodal inference workers are busy"}
+        )
+        response.headers["Retry-After"] = "1"
+        return response, 503
+
+    futures = {}
+    for name, (func, payload, _) in branches.items():
+        future = _BRANCH_EXECUTOR.submit(_timed_branch, func, payload)
+        future.add_done_callback(lambda _future: _BRANCH_SLOTS.release())
+        futures[name] = future
+    for name, future in futures.items():
+        deadline = branches[name][2]
+        remaining = max(deadline - (time.perf_counter() - started), 0.0)
+        try:
+            result, elapsed = future.result(timeout=remaining)
+            timings[f"{name}_ms"] = round(elapsed * 1000, 2)
+            if name == "visual":
+                visual_result = result
+            else:
+                audio_result = result
+        except FuturesTimeout:
+            future.cancel()
+            errors[name] = f"{name} inference timed out after {deadline:g}s"
+            timings[f"{name}_ms"] = None
+        except Exception as exc:
+            errors[name] = str(exc)
+            timings[f"{name}_ms"] = None
 
     final_label = visual_result["label"] or audio_result["label"]
     final_confidence = max(
         visual_result["confidence"] or 0.0, audio_result["confidence"] or 0.0
     )
 
-    return jsonify(
-        {
-            "visual": visual_result,
-            "audio": audio_result,
-            "final_decision": final_label,
-            "confidence_score": final_confidence,
-            "annotated_image": visual_result["annotated_image"],
-            "errors": errors or None,
-        }
-    )
+    payload = {
+        "visual": visual_result,
+        "audio": audio_result,
+        "final_decision": final_label,
+        "confidence_score": final_confidence,
+        "annotated_image": visual_result["annotated_image"],
+        "errors": errors or None,
+    }
+    if debug:
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        payload["timings"] = timings
+    return jsonify(payload)
+
+
+@ai_bp.get("/stats/models")
+def model_stats():
+    return jsonify(get_model_registry().stats())
+
+
+@ai_bp.get("/stats/upstreams")
+def upstream_stats():
+    from app.services.roboflow_client import get_client_pool
+
+    return jsonify(get_client_pool().stats())
+
+
+@ai_bp.get("/stats/cache")
+def cache_stats():
+    return jsonify(get_result_cache().stats())
+
+
+@ai_bp.get("/stats/batcher")
+def batcher_stats():
+    try:
+        return jsonify(_visual_service().batch_stats())
+    except Exception as exc:
+        return jsonify({"error": str(exc)}), 400
+
+
+@ai_bp.get("/stats/stream")
+def stream_stats():
+    from app.services.visual_stream import get_stream_metrics
+
+    return jsonify(get_stream_metrics().to_dict())
+
+
+def _detect_frame(payload, is_base64: bool, annotate: bool) -> dict:
+    service = _visual_service()
+    if is_base64:
+        return service.detect_from_base64(payload, annotate=annotate)
+    return service.detect_from_file_bytes(payload, annotate=annotate)
 
 
 @sock.route("/api/stream/visual")
 def stream_visual(ws):
-    service = VisualService()
-    while True:
-        message = ws.receive()
-        if message is None:
-            break
-        try:
-            payload = json.loads(message) if message else {}
+    """Pipelined detection stream.
+
+    Binary frames carry an encoded image; text frames are JSON, either
+    ``{"image_base64": ..., "seq": optional}`` or a ``{"type": "config",
+    "target_fps": ..., "max_in_flight": ..., "annotate": ...}`` message,
+    answered with the negotiated settings. Results come back as
+    ``{"type": "result", "seq", "detections", "annotated_image",
+    "latency_ms", "dropped"}``; frames that arrive faster than they can be
+    processed are dropped, newest kept.
+    """
+    from app.services.visual_stream import VisualStream, get_stream_executor, get_stream_metrics
+
+    stream = VisualStream(
+        _detect_frame,
+        send=ws.send,
+        executor=get_stream_executor(),
+        metrics=get_stream_metrics(),
+    )
+    try:
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            if isinstance(message, (bytes, bytearray)):
+                if not message:
+                    stream.send({"type": "error", "error": "No image provided"})
+                    continue
+                stream.push(message)
+                continue
+            try:
+                payload = json.loads(message) if message else {}
+            except ValueError:
+                stream.send({"type": "error", "error": "Invalid JSON message"})
+                continue
+            if payload.get("type") == "config":
+                stream.configure(payload)
+                continue
             b64 = payload.get("image_base64") or ""
             if not b64:
-                ws.send(json.dumps({"error": "No image provided"}))
+                stream.send({"type": "error", "error": "No image provided"})
                 continue
-            result = service.detect_from_base64(b64)
-            ws.send(json.dumps(result))
-        except Exception as exc:
-            ws.send(json.dumps({"error": str(exc)}))
+            seq = payload.get("seq")
+            stream.push(b64, is_base64=True, seq=seq if isinstance(seq, int) else None)
+    finally:
+        stream.close()
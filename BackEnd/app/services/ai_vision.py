@@ -1,35 +1,64 @@
 import os
-from inference import get_model
-from PIL import Image
 from pathlib import Path
 
+from app.services.local_detector import LocalDetector
+
 class VisionService:
     def __init__(self):
         # Gunakan Model ID dan API Key kamu
         self.model_id = "garbage-2mxmf-8awcq/2"
         self.api_key = os.getenv("ROBOFLOW_API_KEY") # Simpan di .env
-        
-        # Load model secara lokal menggunakan Inference SDK
-        # Ini akan mendownload model ke cache komputer kamu saat pertama kali dipanggil
-        self.model = get_model(model_id=self.model_id, api_key=self.api_key)
+
+        # Pakai weights ONNX lokal (ml_models/vision/) jika tersedia, tanpa akses jaringan
+        self.local_detector = LocalDetector(
+            base_dir=Path(os.getenv("VISION_MODEL_DIR")) if os.getenv("VISION_MODEL_DIR") else None
+        )
+        self.model = None
+        if not self.local_detector.paths.available():
+            # Load model secara lokal menggunakan Inference SDK
+            # Ini akan mendownload model ke cache komputer kamu saat pertama kali dipanggil
+            from inference import get_model
+
+            self.model = get_model(model_id=self.model_id, api_key=self.api_key)
 
     def predict_garbage(self, image_path: str):
         """Melakukan deteksi sampah menggunakan Local Inference SDK"""
+        if self.model is None:
+            return self._predict_local(image_path)
+
         # Melakukan prediksi (Berjalan di hardware lokal kamu)
         results = self.model.infer(image_path)[0]
-        
+
         # Cari prediksi dengan confidence tertinggi
         predictions = results.predictions
         if predictions:
             # Urutkan berdasarkan confidence tertinggi
             top_pred = max(predictions, key=lambda x: x.confidence)
-            
+
             return {
                 "label": top_pred.class_name,
                 "confidence": float(top_pred.confidence),
                 "status": "success"
             }
-            
+
+        return {"label": "none", "confidence": 0.0, "status": "no_detection"}
+
+    def _predict_local(self, image_path: str):
+        """Deteksi dengan engine ONNX lokal (CPU)"""
+        import cv2
+
+        image_bgr = cv2.imread(image_path)
+        if image_bgr is None:
+            raise FileNotFoundError(f"Image not found: {image_path}")
+        detections = self.local_detector.detect(cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB))
+        if detections:
+            top_pred = max(detections, key=lambda x: x["confidence"])
+            return {
+                "label": top_pred["label"],
+                "confidence": float(top_pred["confidence"]),
+                "status": "success"
+            }
+
         return {"label": "none", "confidence": 0.0, "status": "no_detection"}
 
 # Singleton instance untuk aplikasi Flask
@@ -39,4 +68,4 @@ def get_vision_service():
     global _VISION_SERVICE
     if _VISION_SERVICE is None:
         _VISION_SERVICE = VisionService()
-    return _VISION_SERVICE
\ No newline at end of file
+    return _VISION_SERVICE
@@ -4,6 +4,7 @@ from pathlib import Path
 from datetime import datetime
 from app.extensions import db
 from app.db_models.models import AnomalyData
+from app.services.write_behind import get_write_behind, write_behind_op
 
 # Tentukan path direktori
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -14,6 +15,31 @@ ANOMALY_DIR = STORAGE_DIR / "anomaly_uploads"
 if not ANOMALY_DIR.exists():
     ANOMALY_DIR.mkdir(parents=True, exist_ok=True)
 
+
+def anomaly_write_applied(session, write_key) -> bool:
+    """True if the write-behind record ``write_key`` already created its anomaly_data row.
+
+    A crash between the flush commit and the segment cleanup replays the
+    record with the same key; its handler then does nothing.
+    """
+    return bool(write_key) and session.query(AnomalyData.id).filter_by(write_key=write_key).first() is not None
+
+
+@write_behind_op("anomaly.flag")
+def _apply_flag(session, payload: dict) -> None:
+    if anomaly_write_applied(session, payload.get("write_key")):
+        return
+    session.add(
+        AnomalyData(
+            waste_log_id=payload["waste_log_id"],
+            image_path=payload["image_path"],
+            status_verified=False,
+            user_label=None,  # Belum ada input user saat sistem menandai otomatis
+            write_key=payload.get("write_key"),
+        )
+    )
+
+
 def flag_for_human_review(waste_log_id: int, image_path: str, confidence_score: float) -> str:
     """
     Menandai data sebagai anomali jika skor fusi < 60%.
@@ -45,17 +71,12 @@ def flag_for_human_review(waste_log_id: int, image_path: str, confidence_score:
         # Disini kita simpan path absolut atau relatif terhadap project root
         final_image_path = str(destination_path)
 
-        # 3. Simpan record ke Database
-        anomaly_entry = AnomalyData(
-            waste_log_id=waste_log_id,
-            image_path=final_image_path,
-            status_verified=False,
-            user_label=None # Belum ada input user saat sistem menandai otomatis
+        # 3. Simpan record ke Database lewat antrean write-behind (di-flush di background)
+        get_write_behind().submit(
+            "anomaly.flag",
+            {"waste_log_id": waste_log_id, "image_path": final_image_path},
         )
 
-        db.session.add(anomaly_entry)
-        db.session.commit()
-
         return f"Success: Flagged as anomaly. Image saved to {new_filename}"
 
     except Exception as e:
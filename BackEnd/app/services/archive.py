@@ -0,0 +1,427 @@
+from __future__ import annotations
+
+import os
+import re
+from collections import defaultdict
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.db_models.models import AnomalyData, ArchivedPartition, CarbonMetric, WasteLog
+from app.services.rollups import category_weight
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_ARCHIVE_DIR = BASE_DIR / "storage" / "archive"
+
+# Partitioned table -> its range key. carbon_metrics carries its log's
+# timestamp so both tables split on the same month boundaries.
+PARTITION_KEYS = {
+    WasteLog.__tablename__: "timestamp",
+    CarbonMetric.__tablename__: "log_timestamp",
+}
+
+# Resolved validation items of an archived month go to <archive>/anomaly_data/<YYYY-MM>.parquet.
+ANOMALY_TABLE = AnomalyData.__tablename__
+
+_PARTITION_NAME = re.compile(r"_y(\d{4})m(\d{2})$")
+_EXPORT_BATCH_ROWS = 50_000
+
+
+def archive_dir() -> Path:
+    configured = os.getenv("ARCHIVE_DIR", "").strip()
+    return Path(configured) if configured else DEFAULT_ARCHIVE_DIR
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month: date) -> Tuple[datetime, datetime]:
+    return datetime.combine(month, time.min), datetime.combine(add_months(month, 1), time.min)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(connection) -> bool:
+    """True when waste_logs is a native PostgreSQL partitioned table."""
+    if connection.dialect.name != "postgresql":
+        return False
+    return bool(
+        connection.execute(
+            text(
+                "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = :table"
+            ),
+            {"table": WasteLog.__tablename__},
+        ).scalar()
+    )
+
+
+def list_partitions(connection, table: str = WasteLog.__tablename__) -> List[Tuple[date, str]]:
+    """Attached monthly partitions of ``table`` as (month, name), oldest first."""
+    rows = connection.execute(
+        text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    )
+    partitions = []
+    for (name,) in rows:
+        match = _PARTITION_NAME.search(name)
+        if match:
+            partitions.append((date(int(match.group(1)), int(match.group(2)), 1), name))
+    return sorted(partitions)
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def default_partition_rows(connection) -> Dict[str, int]:
+    """Rows sitting in each table's default partition (logs outside every monthly range)."""
+    return {
+        table: connection.execute(text(f"SELECT count(*) FROM {default_partition_name(table)}")).scalar()
+        for table in PARTITION_KEYS
+    }
+
+
+def default_partition_months(connection, table: str = WasteLog.__tablename__) -> List[date]:
+    """Months that have rows in the default partition of ``table``."""
+    key = PARTITION_KEYS[table]
+    rows = connection.execute(
+        text(f"SELECT DISTINCT date_trunc('month', {key}) FROM {default_partition_name(table)}")
+    )
+    return sorted(value.date() for (value,) in rows)
+
+
+def _create_partition(connection, table: str, month: date) -> int:
+    """Attach the ``month`` partition of ``table``; returns the rows moved out of the default one.
+
+    PostgreSQL refuses a new partition while the default partition holds
+    rows in its range, so those are moved over with the default detached.
+    """
+    key = PARTITION_KEYS[table]
+    lower, upper = month_bounds(month)
+    name = partition_name(table, month)
+    default = default_partition_name(table)
+    bounds = f"FOR VALUES FROM ('{lower.isoformat(' ')}') TO ('{upper.isoformat(' ')}')"
+    in_month = f"{key} >= :lower AND {key} < :upper"
+    params = {"lower": lower, "upper": upper}
+    waiting = connection.execute(text(f"SELECT 1 FROM {default} WHERE {in_month} LIMIT 1"), params).first()
+    if waiting is None:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} {bounds}"))
+        return 0
+    connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    connection.execute(text(f"CREATE TABLE {name} PARTITION OF {table} {bounds}"))
+    moved = connection.execute(
+        text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_month}"), params
+    ).rowcount
+    connection.execute(text(f"DELETE FROM {default} WHERE {in_month}"), params)
+    connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    return moved
+
+
+def ensure_partitions(connection, months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+    """Create the monthly partitions from the current month to ``months_ahead`` ahead.
+
+    Months that only have rows in the default partition get theirs too,
+    and those rows are moved into it.
+    """
+    if not is_partitioned(connection):
+        return []
+    current = month_start(today or datetime.utcnow().date())
+    created = []
+    for table in PARTITION_KEYS:
+        existing = {month for month, _ in list_partitions(connection, table)}
+        wanted = {add_months(current, offset) for offset in range(max(months_ahead, 0) + 1)}
+        wanted.update(default_partition_months(connection, table))
+        for month in sorted(wanted - existing):
+            _create_partition(connection, table, month)
+            created.append(partition_name(table, month))
+    return created
+
+
+def _archivable_months(connection, cutoff: date) -> List[date]:
+    if is_partitioned(connection):
+        # Old rows left in the default partitions count too; they get a partition when archived.
+        months = {month for month, _ in list_partitions(connection)}
+        for table in PARTITION_KEYS:
+            months.update(default_partition_months(connection, table))
+        return sorted(month for month in months if month < cutoff)
+    # Unpartitioned (e.g. SQLite): every month with logs before the cutoff.
+    oldest = connection.execute(select(func.min(WasteLog.timestamp))).scalar()
+    if oldest is None:
+        return []
+    if isinstance(oldest, str):
+        oldest = datetime.fromisoformat(oldest)
+    months = []
+    month = month_start(oldest.date())
+    while month < cutoff:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError("Archiving needs pyarrow: pip install pyarrow") from exc
+    return pa, pq
+
+
+def _schemas(pa) -> Dict[str, Any]:
+    return {
+        WasteLog.__tablename__: pa.schema(
+            [
+                ("id", pa.int64()),
+                ("bin_id", pa.int64()),
+                ("category", pa.string()),
+                ("confidence_score", pa.float64()),
+                ("timestamp", pa.timestamp("us")),
+                ("visual_conf", pa.float64()),
+                ("audio_conf", pa.float64()),
+                ("image_path", pa.string()),
+            ]
+        ),
+        CarbonMetric.__tablename__: pa.schema(
+            [
+                ("id", pa.int64()),
+                ("log_id", pa.int64()),
+                ("co2_reduction_value", pa.float64()),
+                ("methane_reduction", pa.float64()),
+                ("log_timestamp", pa.timestamp("us")),
+            ]
+        ),
+        ANOMALY_TABLE: pa.schema(
+            [
+                ("id", pa.int64()),
+                ("waste_log_id", pa.int64()),
+                ("image_path", pa.string()),
+                ("user_label", pa.string()),
+                ("status_verified", pa.bool_()),
+                ("write_key", pa.string()),
+            ]
+        ),
+    }
+
+
+def _month_log_ids(month: date):
+    lower, upper = month_bounds(month)
+    return select(WasteLog.id).where(WasteLog.timestamp >= lower, WasteLog.timestamp < upper)
+
+
+def _month_anomalies(month: date):
+    """Condition for the anomaly_data rows whose waste log falls in ``month``."""
+    return AnomalyData.waste_log_id.in_(_month_log_ids(month))
+
+
+def first_month_with_open_anomalies(connection, months: Iterable[date]) -> Optional[date]:
+    """Oldest of ``months`` whose logs still have unverified validation items.
+
+    Archiving stops before it: the validation queue reads those logs.
+    """
+    for month in sorted(months):
+        open_item = connection.execute(
+            select(AnomalyData.id)
+            .where(_month_anomalies(month), AnomalyData.status_verified.isnot(True))
+            .limit(1)
+        ).first()
+        if open_item is not None:
+            return month
+    return None
+
+
+def _export(connection, table: str, month: date, path: Path) -> int:
+    """Stream one month of ``table`` into a zstd Parquet file; returns the row count."""
+    pa, pq = _pyarrow()
+    schema = _schemas(pa)[table]
+    if table == ANOMALY_TABLE:
+        columns = [getattr(AnomalyData, name) for name in schema.names]
+        stmt = select(*columns).where(_month_anomalies(month)).order_by(AnomalyData.id)
+    else:
+        model = WasteLog if table == WasteLog.__tablename__ else CarbonMetric
+        key = getattr(model, PARTITION_KEYS[table])
+        lower, upper = month_bounds(month)
+        columns = [getattr(model, name) for name in schema.names]
+        stmt = select(*columns).where(key >= lower, key < upper).order_by(key)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".parquet.partial")
+    rows = 0
+    # Per statement: Connection.execution_options() would switch the shared connection
+    # (and every later INSERT on it) to server-side cursors.
+    result = connection.execute(stmt.execution_options(stream_results=True))
+    with pq.ParquetWriter(partial, schema, compression="zstd") as writer:
+        while True:
+            batch = result.fetchmany(_EXPORT_BATCH_ROWS)
+            if not batch:
+                break
+            arrays = [
+                pa.array([row[index] for row in batch], type=field.type)
+                for index, field in enumerate(schema)
+            ]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            rows += len(batch)
+    if pq.ParquetFile(partial).metadata.num_rows != rows:
+        partial.unlink()
+        raise RuntimeError(f"Archive of {table} {month:%Y-%m} is incomplete")
+    partial.replace(path)
+    return rows
+
+
+def _remove_month(connection, month: date, partitioned: bool) -> None:
+    # No foreign key holds these (see WasteLog), so they go first, while their logs still exist.
+    connection.execute(delete(AnomalyData.__table__).where(_month_anomalies(month)))
+    if partitioned:
+        for table in PARTITION_KEYS:
+            name = partition_name(table, month)
+            connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+            connection.execute(text(f"DROP TABLE {name}"))
+        return
+    # Core deletes skip the ORM flush hooks, so the daily rollups keep these months.
+    lower, upper = month_bounds(month)
+    connection.execute(
+        delete(CarbonMetric.__table__).where(
+            CarbonMetric.log_timestamp >= lower, CarbonMetric.log_timestamp < upper
+        )
+    )
+    connection.execute(
+        delete(WasteLog.__table__).where(WasteLog.timestamp >= lower, WasteLog.timestamp < upper)
+    )
+
+
+def archivable_months(session: Session, keep_months: int, today: Optional[date] = None) -> List[date]:
+    """Months older than the last ``keep_months`` that are not archived yet."""
+    cutoff = add_months(month_start(today or datetime.utcnow().date()), -max(keep_months, 1) + 1)
+    done = {row.month for row in session.query(ArchivedPartition.month)}
+    return [month for month in _archivable_months(session.connection(), cutoff) if month not in done]
+
+
+def archive_old_months(
+    session: Session,
+    keep_months: int,
+    target_dir: Optional[Path] = None,
+    dry_run: bool = False,
+    today: Optional[date] = None,
+) -> List[date]:
+    """Move every month older than the last ``keep_months`` to Parquet.
+
+    Each month is exported, checked, recorded in archived_partitions and then
+    detached and dropped (or deleted, when the table is not partitioned), one
+    commit per month. Rows of the month still in a default partition are
+    first moved into a partition of their own. The month's resolved validation items are exported and
+    deleted with it; archiving stops at the first month that still has open
+    ones (see ``first_month_with_open_anomalies``). Returns the months
+    archived (or that would be).
+    """
+    target_dir = target_dir or archive_dir()
+    connection = session.connection()
+    partitioned = is_partitioned(connection)
+    months = archivable_months(session, keep_months, today)
+    blocked = first_month_with_open_anomalies(connection, months)
+    if blocked is not None:
+        # Archived months must stay contiguous (see hot_start), so later ones wait too.
+        months = [month for month in months if month < blocked]
+    if dry_run:
+        return months
+
+    for month in months:
+        connection = session.connection()
+        if partitioned:
+            for table in PARTITION_KEYS:
+                if month not in {attached for attached, _ in list_partitions(connection, table)}:
+                    _create_partition(connection, table, month)
+        record = ArchivedPartition(month=month)
+        for table in PARTITION_KEYS:
+            path = target_dir / table / f"{month:%Y-%m}.parquet"
+            setattr(record, f"{table}_rows", _export(connection, table, month, path))
+            setattr(record, f"{table}_path", str(path))
+        _export(connection, ANOMALY_TABLE, month, target_dir / ANOMALY_TABLE / f"{month:%Y-%m}.parquet")
+        session.add(record)
+        session.flush()
+        _remove_month(connection, month, partitioned)
+        session.commit()
+    return months
+
+
+def hot_start(session: Session) -> Optional[date]:
+    """First day still held in the database tables, if anything was archived."""
+    newest = session.query(func.max(ArchivedPartition.month)).scalar()
+    return add_months(newest, 1) if newest is not None else None
+
+
+def _archived_in_range(session: Session, start_dt: datetime, end_dt: datetime) -> List[ArchivedPartition]:
+    return (
+        session.query(ArchivedPartition)
+        .filter(
+            ArchivedPartition.month >= month_start(start_dt.date()),
+            ArchivedPartition.month < end_dt.date(),
+        )
+        .order_by(ArchivedPartition.month)
+        .all()
+    )
+
+
+def _read(path: str, key: str, columns: Iterable[str], start_dt: datetime, end_dt: datetime):
+    _, pq = _pyarrow()
+    return pq.read_table(
+        path,
+        columns=list(columns),
+        filters=[(key, ">=", start_dt), (key, "<", end_dt)],
+    ).to_pydict()
+
+
+def archived_category_weights(session: Session, start_dt: datetime, end_dt: datetime) -> Dict[str, float]:
+    totals: Dict[str, float] = defaultdict(float)
+    for record in _archived_in_range(session, start_dt, end_dt):
+        data = _read(record.waste_logs_path, "timestamp", ["category", "timestamp"], start_dt, end_dt)
+        for category in data["category"]:
+            totals[category] += category_weight(category)
+    return totals
+
+
+def archived_daily_carbon(session: Session, start_dt: datetime, end_dt: datetime) -> Dict[date, float]:
+    daily: Dict[date, float] = defaultdict(float)
+    for record in _archived_in_range(session, start_dt, end_dt):
+        data = _read(
+            record.carbon_metrics_path,
+            "log_timestamp",
+            ["co2_reduction_value", "log_timestamp"],
+            start_dt,
+            end_dt,
+        )
+        for value, ts in zip(data["co2_reduction_value"], data["log_timestamp"]):
+            daily[ts.date()] += float(value or 0)
+    return daily
+
+
+def archived_totals(session: Session, start_dt: datetime, end_dt: datetime) -> Tuple[int, float, float]:
+    """(log_count, co2, methane) for the archived part of [start_dt, end_dt)."""
+    logs, co2, methane = 0, 0.0, 0.0
+    for record in _archived_in_range(session, start_dt, end_dt):
+        logs += len(_read(record.waste_logs_path, "timestamp", ["timestamp"], start_dt, end_dt)["timestamp"])
+        data = _read(
+            record.carbon_metrics_path,
+            "log_timestamp",
+            ["co2_reduction_value", "methane_reduction", "log_timestamp"],
+            start_dt,
+            end_dt,
+        )
+        co2 += sum(float(value or 0) for value in data["co2_reduction_value"])
+        methane += sum(float(value or 0) for value in data["methane_reduction"])
+    return logs, co2, methane
@@ -2,17 +2,20 @@ from __future__ import annotations
 
 import io
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
 
-import joblib
-import librosa
 import numpy as np
-from tensorflow.keras.models import load_model
 
-
-AudioInput = Union[str, Path, bytes, io.BytesIO]
+from app.services.audio_features import AudioInput, get_mfcc_extractor, load_audio
+from app.services.model_registry import get_model_registry
+from app.services.numpy_runtime import ExportedLabels, NumpyDenseModel
+from app.services.result_cache import get_result_cache
 
 
 @dataclass
@@ -28,6 +31,19 @@ class AudioModelPaths:
                 return p
         return self.base_dir / "model.h5"  # default for clearer error message
 
+    @property
+    def numpy_model_path(self) -> Path:
+        """Dense weights exported by export_audio_model.py (no TensorFlow needed)."""
+        return self.base_dir / "model.npz"
+
+    @property
+    def runtime_path(self) -> Path:
+        """File actually served: model.npz when present, unless AUDIO_MODEL_RUNTIME=tensorflow."""
+        runtime = os.getenv("AUDIO_MODEL_RUNTIME", "auto").strip().lower()
+        if runtime == "numpy" or (runtime == "auto" and self.numpy_model_path.exists()):
+            return self.numpy_model_path
+        return self.model_path
+
     @property
     def encoder_path(self) -> Path:
         return self.base_dir / "label_encoder.pkl"
@@ -37,6 +53,43 @@ class AudioModelPaths:
         return self.base_dir / "metadata.json"
 
 
+@dataclass
+class AudioModelBundle:
+    model: Any
+    label_encoder: Any
+    metadata: Dict[str, Any]
+
+
+def _load_bundle(paths: AudioModelPaths) -> AudioModelBundle:
+    runtime_path = paths.runtime_path
+    if not runtime_path.exists():
+        raise FileNotFoundError(f"Audio model not found: {runtime_path}")
+
+    label_encoder = None
+    if runtime_path.suffix == ".npz":
+        model = NumpyDenseModel.load(runtime_path)
+        label_encoder = ExportedLabels.load(runtime_path)
+    else:
+        # TensorFlow is only imported when no NumPy export is available.
+        from tensorflow.keras.models import load_model
+
+        model = load_model(runtime_path)
+
+    if label_encoder is None:
+        if not paths.encoder_path.exists():
+            raise FileNotFoundError(f"Label encoder not found: {paths.encoder_path}")
+
+        import joblib
+
+        label_encoder = joblib.load(paths.encoder_path)
+
+    metadata: Dict[str, Any] = {}
+    if paths.metadata_path.exists():
+        metadata = json.loads(paths.metadata_path.read_text(encoding="ascii"))
+
+    return AudioModelBundle(model=model, label_encoder=label_encoder, metadata=metadata)
+
+
 class AudioService:
     def __init__(self, base_dir: Optional[Path] = None) -> None:
         self.base_dir = base_dir or (
@@ -47,92 +100,172 @@ class AudioService:
         self.label_encoder = None
         self.metadata: Dict[str, Any] = {}
 
-    def load(self) -> None:
-        if not self.paths.model_path.exists():
-            raise FileNotFoundError(f"Audio model not found: {self.paths.model_path}")
-
-        self.model = load_model(self.paths.model_path)
-
-        if not self.paths.encoder_path.exists():
-            raise FileNotFoundError(f"Label encoder not found: {self.paths.encoder_path}")
+    @contextmanager
+    def _acquire(self) -> Iterator[AudioModelBundle]:
+        # The shared registry loads each model directory once per process and
+        # swaps in a fresh copy when the model file changes on disk.
+        registry = get_model_registry()
+        with registry.acquire(
+            str(self.base_dir.resolve()),
+            self.paths.runtime_path,
+            lambda _path: _load_bundle(self.paths),
+        ) as bundle:
+            self.model = bundle.model
+            self.label_encoder = bundle.label_encoder
+            self.metadata = bundle.metadata
+            yield bundle
 
-        self.label_encoder = joblib.load(self.paths.encoder_path)
-
-        if self.paths.metadata_path.exists():
-            self.metadata = json.loads(self.paths.metadata_path.read_text(encoding="ascii"))
+    def load(self) -> None:
+        with self._acquire():
+            pass
 
     def _get_param(self, key: str, default: Any) -> Any:
         return self.metadata.get(key, default)
 
     def _load_audio(self, audio_input: AudioInput) -> Tuple[np.ndarray, int]:
-        if isinstance(audio_input, (str, Path)):
-            audio_path = Path(audio_input)
-            if not audio_path.exists():
-                raise FileNotFoundError(f"Audio not found: {audio_path}")
-            file_ext = audio_path.suffix.lower()
-            if file_ext not in {".wav", ".mp3"}:
-                raise ValueError("Invalid audio format. Use WAV or MP3.")
-            try:
-                y, sr = librosa.load(str(audio_path), sr=22050, mono=True)
-                return y, sr
-            except Exception as exc:
-                raise ValueError("Failed to load audio file") from exc
-
-        if isinstance(audio_input, bytes):
-            if not audio_input:
-                raise ValueError("Empty audio bytes")
-            audio_input = io.BytesIO(audio_input)
-
-        if isinstance(audio_input, io.BytesIO):
-            try:
-                y, sr = librosa.load(audio_input, sr=22050, mono=True)
-                return y, sr
-            except Exception as exc:
-                raise ValueError("Failed to load audio bytes") from exc
-
-        raise ValueError("Unsupported audio input type")
+        return load_audio(audio_input, sample_rate=get_mfcc_extractor().config.sample_rate)
 
     def extract_features(self, audio_input: AudioInput) -> np.ndarray:
-        y, sr = self._load_audio(audio_input)
-
-        n_mfcc = 40
-        n_fft = 2048
-        hop_length = 512
-
         # Match training pipeline: MFCC -> mean over time (1D vector)
-        mfcc = librosa.feature.mfcc(
-            y=y,
-            sr=sr,
-            n_mfcc=n_mfcc,
-            hop_length=hop_length,
-            n_fft=n_fft,
-        ).astype(np.float32)
-
-        features = np.mean(mfcc.T, axis=0)
-        return features
+        return get_mfcc_extractor().extract_features(audio_input)
 
-    def predict(self, audio_input: AudioInput) -> Dict[str, Any]:
-        if self.model is None or self.label_encoder is None:
-            self.load()
-
-        features = self.extract_features(audio_input)
-        batch = np.expand_dims(features, axis=0)
+    def extract_features_batch(self, audio_inputs: Sequence[AudioInput]) -> np.ndarray:
+        """Return one MFCC-mean row per clip as a ``(n_clips, 40)`` array."""
+        return get_mfcc_extractor().extract_features_batch(audio_inputs)
 
+    def model_version(self) -> str:
+        model_path = self.paths.runtime_path
         try:
-            preds = self.model.predict(batch)
-        except Exception as exc:
-            raise RuntimeError(f"Audio prediction failed: {exc}") from exc
+            mtime = int(model_path.stat().st_mtime)
+        except OSError:
+            mtime = 0
+        return f"{self.base_dir.name}/{model_path.name}:{mtime}"
 
-        probs = np.squeeze(preds)
-        if probs.ndim == 0:
-            probs = np.array([float(probs)])
+    def predict(self, audio_input: AudioInput) -> Dict[str, Any]:
+        if isinstance(audio_input, io.BytesIO):
+            audio_input = audio_input.getvalue()
+        if not isinstance(audio_input, (bytes, bytearray, memoryview)) or not audio_input:
+            return self._predict(audio_input)
+
+        # The frontend re-posts the same clip; skip inference for bytes we
+        # have already classified with this model file.
+        cache = get_result_cache()
+        model_id = self.model_version()
+        digest = cache.digest(audio_input)
+        cached = cache.get("audio", model_id, digest)
+        if cached is not None:
+            return cached
+
+        result = self._predict(audio_input)
+        cache.set("audio", model_id, digest, result)
+        return result
+
+    def predict_batch(self, audio_inputs: Sequence[AudioInput]) -> List[Dict[str, Any]]:
+        """Classify many clips with one forward pass.
+
+        Returns one result per input, in order. A clip that cannot be
+        decoded gets ``{"error": ...}`` instead of failing the whole batch.
+        """
+        inputs = [
+            item.getvalue() if isinstance(item, io.BytesIO) else item for item in audio_inputs
+        ]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(inputs)
+        if not inputs:
+            return []
+
+        cache = get_result_cache()
+        model_id = self.model_version()
+        digests: Dict[int, str] = {}
+        pending: List[int] = []
+        for index, item in enumerate(inputs):
+            if isinstance(item, bytes) and item:
+                digests[index] = cache.digest(item)
+                cached = cache.get("audio", model_id, digests[index])
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            pending.append(index)
+
+        extractor = get_mfcc_extractor()
+        decoded = list(
+            _get_decode_executor().map(
+                lambda i: _decode_or_error(inputs[i], extractor.config.sample_rate), pending
+            )
+        )
+        ready: List[int] = []
+        signals: List[np.ndarray] = []
+        for index, (signal, error) in zip(pending, decoded):
+            if signal is None:
+                results[index] = {"error": error}
+            else:
+                ready.append(index)
+                signals.append(signal)
+
+        if ready:
+            features = extractor.features_from_signals(signals)
+            for index, result in zip(ready, self._classify(features)):
+                results[index] = result
+                if index in digests:
+                    cache.set("audio", model_id, digests[index], result)
+
+        return [result or {"error": "Audio prediction failed"} for result in results]
+
+    def _predict(self, audio_input: AudioInput) -> Dict[str, Any]:
+        features = self.extract_features(audio_input)
+        return self._classify(np.expand_dims(features, axis=0))[0]
 
-        top_idx = int(np.argmax(probs))
-        confidence = float(np.max(probs))
+    def _classify(self, features: np.ndarray) -> List[Dict[str, Any]]:
+        with self._acquire() as bundle:
+            try:
+                preds = bundle.model.predict(features, verbose=0)
+            except Exception as exc:
+                raise RuntimeError(f"Audio prediction failed: {exc}") from exc
 
-        try:
-            label = self.label_encoder.inverse_transform([top_idx])[0]
-        except Exception:
-            label = str(top_idx)
+            probs = np.asarray(preds, dtype=np.float32).reshape(len(features), -1)
+            top_idx = np.argmax(probs, axis=1)
 
-        return {"label": label, "confidence": confidence, "probabilities": probs.tolist()}
+            try:
+                labels = bundle.label_encoder.inverse_transform(top_idx)
+            except Exception:
+                labels = [str(idx) for idx in top_idx]
+
+        return [
+            {
+                "label": str(label),
+                "confidence": float(row[idx]),
+                "probabilities": row.tolist(),
+            }
+            for label, idx, row in zip(labels, top_idx, probs)
+        ]
+
+
+def _decode_or_error(audio_input: AudioInput, sample_rate: int) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    try:
+        signal, _ = load_audio(audio_input, sample_rate=sample_rate)
+    except Exception as exc:
+        return None, str(exc)
+    return signal, None
+
+
+_DECODE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_DECODE_LOCK = threading.Lock()
+
+
+def _get_decode_executor() -> ThreadPoolExecutor:
+    # soundfile and soxr release the GIL, so decoding a batch of clips
+    # scales across cores.
+    global _DECODE_EXECUTOR
+    if _DECODE_EXECUTOR is None:
+        with _DECODE_LOCK:
+            if _DECODE_EXECUTOR is None:
+                _DECODE_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=max(int(os.getenv("AUDIO_DECODE_WORKERS", "4")), 1),
+                    thread_name_prefix="audio-decode",
+                )
+    return _DECODE_EXECUTOR
+
+
+def warm_up_audio_model(base_dir: Optional[Path] = None) -> Dict[str, Any]:
+    service = AudioService(base_dir=base_dir)
+    service.load()
+    return {"base_dir": str(service.base_dir), "model_path": str(service.paths.runtime_path)}
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, TypeVar
+
+from app.services.metrics import Histogram, LatencyStats
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+QUEUE_WAIT_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+
+@dataclass
+class _Pending(Generic[T]):
+    item: T
+    enqueued_at: float = field(default_factory=time.perf_counter)
+    future: Future = field(default_factory=Future)
+
+
+class MicroBatcher(Generic[T, R]):
+    """Collects items submitted from many threads and runs them in batches.
+
+    A batch is dispatched once ``max_batch_size`` items are waiting or
+    ``max_wait_ms`` has passed since the oldest item arrived, whichever
+    comes first. ``handler`` receives the list of items and must return one
+    result per item, in order.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], Sequence[R]],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        name: str = "batcher",
+    ) -> None:
+        self.handler = handler
+        self.max_batch_size = max(int(max_batch_size), 1)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.name = name
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.batch_latency = LatencyStats()
+        self._queue: "queue.Queue[_Pending[T]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name=f"{self.name}-worker", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, item: T) -> Future:
+        pending: _Pending[T] = _Pending(item)
+        self._ensure_worker()
+        self._queue.put(pending)
+        return pending.future
+
+    def run(self, item: T, timeout: Optional[float] = None) -> R:
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self) -> List[_Pending[T]]:
+        first = self._queue.get()
+        batch = [first]
+        deadline = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for pending in batch:
+                self.queue_wait_ms.observe((started - pending.enqueued_at) * 1000)
+            self.batch_sizes.observe(len(batch))
+
+            failed = False
+            try:
+                results = list(self.handler([pending.item for pending in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"Batch handler returned {len(results)} results for {len(batch)} items"
+                    )
+            except Exception as exc:
+                failed = True
+                for pending in batch:
+                    pending.future.set_exception(exc)
+            else:
+                for pending, result in zip(batch, results):
+                    pending.future.set_result(result)
+            finally:
+                self.batch_latency.record(time.perf_counter() - started, error=failed)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "queue_depth": self._queue.qsize(),
+            "batch_size": self.batch_sizes.to_dict(),
+            "queue_wait_ms": self.queue_wait_ms.to_dict(),
+            "batch_latency": self.batch_latency.to_dict(),
+        }
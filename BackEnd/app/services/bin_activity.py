@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import case, event, func, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.db_models.models import SmartBin, WasteLog
+from app.services.sql_dialect import dialect_name, greatest
+
+# smart_bins.last_seen_at / logs_today / logs_today_date are denormalized
+# from waste_logs so the bin list never aggregates the log table. Every log
+# write bumps them in the same transaction: ORM flushes through the hook
+# below, Core bulk writes (telemetry) through activity_values(). Log deletes
+# and edits are not tracked; reconcile_bin_activity() rebuilds the columns.
+
+# Fill levels (percent) at which the bins API, GIS and map tiles show a bin as full / due.
+STATUS_THRESHOLDS = {
+    "full": 90,
+    "maintenance": 70,
+}
+
+
+def utc_today() -> date:
+    return datetime.utcnow().date()
+
+
+def bin_status(is_active: Optional[bool], fill_level: Optional[int]) -> str:
+    if not is_active:
+        return "offline"
+    if (fill_level or 0) >= STATUS_THRESHOLDS["full"]:
+        return "full"
+    if (fill_level or 0) >= STATUS_THRESHOLDS["maintenance"]:
+        return "maintenance"
+    return "active"
+
+
+class BinActivity:
+    """Newest log time and today's log count per bin, for one write."""
+
+    def __init__(self, today: Optional[date] = None) -> None:
+        self.today = today or utc_today()
+        self.seen: Dict[int, datetime] = {}
+        self.today_counts: Dict[int, int] = defaultdict(int)
+
+    def add_log(self, bin_id: Any, timestamp: Optional[datetime]) -> None:
+        if bin_id is None or timestamp is None:
+            return
+        bin_id = int(bin_id)
+        if timestamp > self.seen.get(bin_id, datetime.min):
+            self.seen[bin_id] = timestamp
+        if timestamp.date() == self.today:
+            self.today_counts[bin_id] += 1
+
+
+def activity_values(
+    seen: Dict[int, datetime], today_counts: Dict[int, int], today: date, dialect: str
+) -> Dict[str, Any]:
+    """SET clause for an UPDATE of the bins in ``seen``.
+
+    ``last_seen_at`` only moves forward; ``logs_today`` restarts from the
+    new logs when the stored count belongs to an earlier day.
+    """
+    table = SmartBin.__table__
+    newest = case(seen, value=table.c.id)
+    added = case(today_counts, value=table.c.id, else_=0) if today_counts else literal(0)
+    return {
+        "last_seen_at": greatest(func.coalesce(table.c.last_seen_at, newest), newest, dialect),
+        "logs_today": case((table.c.logs_today_date == today, table.c.logs_today + added), else_=added),
+        "logs_today_date": today,
+    }
+
+
+def apply_activity(connection, activity: BinActivity) -> None:
+    if not activity.seen:
+        return
+    table = SmartBin.__table__
+    values = activity_values(activity.seen, activity.today_counts, activity.today, connection.dialect.name)
+    connection.execute(update(table).where(table.c.id.in_(list(activity.seen))).values(values))
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    activity = BinActivity()
+    for obj in session.new:
+        if isinstance(obj, WasteLog):
+            activity.add_log(obj.bin_id, obj.timestamp)
+    apply_activity(session.connection(), activity)
+    if activity.seen:
+        from app.services.spatial_index import mark_bins_changed
+
+        mark_bins_changed(session, activity.seen)
+
+
+def register_bin_activity_events(session) -> None:
+    """Keep smart_bins.last_seen_at / logs_today in step with logs added through ``session``."""
+    if not event.contains(session, "after_flush", _after_flush):
+        event.listen(session, "after_flush", _after_flush)
+
+
+def reconcile_bin_activity(session: Session, logs_only: bool = False, today: Optional[date] = None) -> int:
+    """Rebuild the activity columns of every bin from waste_logs in one UPDATE.
+
+    By default ``last_seen_at`` keeps a newer stored value, since heartbeats
+    and fill readings bump it without writing a log, and months archived to
+    Parquet are no longer in waste_logs. ``logs_only`` takes the log table
+    as the only source. Returns the number of bins updated.
+    """
+    today = today or utc_today()
+    day_start = datetime.combine(today, time.min)
+    table = SmartBin.__table__
+    newest_log = (
+        select(func.max(WasteLog.timestamp)).where(WasteLog.bin_id == table.c.id).scalar_subquery()
+    )
+    logs_today = (
+        select(func.count())
+        .select_from(WasteLog)
+        .where(
+            WasteLog.bin_id == table.c.id,
+            WasteLog.timestamp >= day_start,
+            WasteLog.timestamp < day_start + timedelta(days=1),
+        )
+        .scalar_subquery()
+    )
+    last_seen = newest_log
+    if not logs_only:
+        last_seen = greatest(
+            func.coalesce(table.c.last_seen_at, newest_log),
+            func.coalesce(newest_log, table.c.last_seen_at),
+            dialect_name(session),
+        )
+    result = session.execute(
+        update(table).values(last_seen_at=last_seen, logs_today=logs_today, logs_today_date=today)
+    )
+    from app.services.spatial_index import mark_bins_changed
+
+    mark_bins_changed(session)
+    return result.rowcount
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Float, Integer, String, cast, func, literal, null, select, union_all
+from sqlalchemy.orm import joinedload
+
+from app.db_models.models import AnomalyData, CarbonMetric, DailyBinCategoryRollup, SmartBin, WasteLog
+from app.extensions import db
+from app.services.rollups import rollups_enabled, weight_expression
+
+FULL_BIN_THRESHOLD = 90
+FULL_BIN_ALERTS = 2
+OFFLINE_BIN_ALERTS = 1
+ANOMALY_ALERTS = 1
+LIVE_FEED_SIZE = 4
+
+
+@dataclass
+class DashboardData:
+    total_bins: int = 0
+    active_bins: int = 0
+    avg_confidence: Optional[float] = None
+    carbon_avoided: float = 0.0
+    category_totals: Dict[str, float] = field(default_factory=dict)
+    live_logs: List[WasteLog] = field(default_factory=list)
+    full_bins: List[Dict[str, Any]] = field(default_factory=list)
+    offline_bins: List[Dict[str, Any]] = field(default_factory=list)
+    anomalies: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def total_weight(self) -> float:
+        return sum(self.category_totals.values())
+
+
+def _kpi_query():
+    """One row: total_bins, active_bins, avg_confidence, carbon_avoided."""
+    bins = select(
+        func.count(SmartBin.id).label("total_bins"),
+        func.count(SmartBin.id).filter(SmartBin.is_active.is_(True)).label("active_bins"),
+    ).subquery()
+
+    if rollups_enabled():
+        avg_confidence = select(
+            func.sum(DailyBinCategoryRollup.confidence_sum)
+            / func.nullif(func.sum(DailyBinCategoryRollup.log_count), 0)
+        ).scalar_subquery()
+        carbon_avoided = select(
+            func.coalesce(func.sum(DailyBinCategoryRollup.co2_kg), 0.0)
+        ).scalar_subquery()
+    else:
+        avg_confidence = select(func.avg(WasteLog.confidence_score)).scalar_subquery()
+        carbon_avoided = select(
+            func.coalesce(func.sum(CarbonMetric.co2_reduction_value), 0.0)
+        ).scalar_subquery()
+
+    return select(bins.c.total_bins, bins.c.active_bins, avg_confidence, carbon_avoided)
+
+
+def _list_row(kind: str, ref_id, label, amount):
+    return (
+        literal(kind, String).label("kind"),
+        cast(ref_id, Integer).label("ref_id"),
+        cast(label, String).label("label"),
+        cast(amount, Float).label("amount"),
+    )
+
+
+def _lists_query():
+    """Category totals and the three alert lists as one UNION ALL.
+
+    Each branch is wrapped in a subquery so it can keep its own ORDER BY /
+    LIMIT (SQLite rejects those on bare compound-select members).
+    """
+    if rollups_enabled():
+        weight = func.sum(DailyBinCategoryRollup.weight_kg)
+        categories = select(DailyBinCategoryRollup.category.label("category"), weight.label("weight")).group_by(
+            DailyBinCategoryRollup.category
+        )
+    else:
+        weight = func.sum(weight_expression(WasteLog.category))
+        categories = select(WasteLog.category.label("category"), weight.label("weight")).group_by(
+            WasteLog.category
+        )
+    categories = categories.subquery()
+
+    full_bins = (
+        select(SmartBin.id, SmartBin.location_name, SmartBin.fill_level)
+        .where(SmartBin.fill_level >= FULL_BIN_THRESHOLD)
+        .order_by(SmartBin.id)
+        .limit(FULL_BIN_ALERTS)
+        .subquery()
+    )
+    offline_bins = (
+        select(SmartBin.id, SmartBin.location_name)
+        .filter_by(is_active=False)
+        .order_by(SmartBin.id)
+        .limit(OFFLINE_BIN_ALERTS)
+        .subquery()
+    )
+    anomalies = (
+        select(AnomalyData.id, AnomalyData.user_label)
+        .filter_by(status_verified=False)
+        .order_by(AnomalyData.id.desc())
+        .limit(ANOMALY_ALERTS)
+        .subquery()
+    )
+
+    return union_all(
+        select(*_list_row("category", null(), categories.c.category, categories.c.weight)),
+        select(*_list_row("full", full_bins.c.id, full_bins.c.location_name, full_bins.c.fill_level)),
+        select(*_list_row("offline", offline_bins.c.id, offline_bins.c.location_name, null())),
+        select(*_list_row("anomaly", anomalies.c.id, anomalies.c.user_label, null())),
+    )
+
+
+def load_dashboard_data() -> DashboardData:
+    """Everything get_dashboard renders, in three round trips."""
+    data = DashboardData()
+
+    total_bins, active_bins, avg_confidence, carbon_avoided = db.session.execute(_kpi_query()).one()
+    data.total_bins = int(total_bins or 0)
+    data.active_bins = int(active_bins or 0)
+    data.avg_confidence = float(avg_confidence) if avg_confidence is not None else None
+    data.carbon_avoided = float(carbon_avoided or 0)
+
+    categories = []
+    for kind, ref_id, label, amount in db.session.execute(_lists_query()):
+        if kind == "category":
+            categories.append((label, float(amount or 0)))
+        elif kind == "full":
+            data.full_bins.append({"id": ref_id, "location_name": label, "fill_level": int(amount or 0)})
+        elif kind == "offline":
+            data.offline_bins.append({"id": ref_id, "location_name": label})
+        else:
+            data.anomalies.append({"id": ref_id, "user_label": label})
+    data.category_totals = dict(sorted(categories, key=lambda item: item[1], reverse=True))
+
+    data.live_logs = (
+        WasteLog.query.options(joinedload(WasteLog.bin))
+        .order_by(WasteLog.timestamp.desc())
+        .limit(LIVE_FEED_SIZE)
+        .all()
+    )
+    return data
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy as np
+
+from app.services.local_detector import LocalDetector
+from app.services.result_cache import BytesLike
+from app.services.roboflow_client import RoboflowHTTPClient
+
+
+Detection = Dict[str, Any]
+
+
+def normalize_predictions(preds: Iterable[Dict[str, Any]]) -> List[Detection]:
+    normalized = []
+    for pred in preds:
+        if not isinstance(pred, dict):
+            continue
+        label = pred.get("class") or pred.get("label") or "unknown"
+        confidence = float(pred.get("confidence", 0.0))
+        # Common Roboflow bbox format: center x/y with width/height
+        bbox = {
+            "x": float(pred.get("x", 0.0)),
+            "y": float(pred.get("y", 0.0)),
+            "width": float(pred.get("width", 0.0)),
+            "height": float(pred.get("height", 0.0)),
+        }
+        normalized.append(
+            {
+                "label": label,
+                "confidence": confidence,
+                "bbox": bbox,
+            }
+        )
+    return normalized
+
+
+class DetectionBackend:
+    """Runs object detection on RGB images and returns detection dicts.
+
+    Every backend returns ``{"label", "confidence", "bbox"}`` dicts with the
+    bbox in Roboflow's center x/y + width/height pixel format. Backends
+    with ``accepts_encoded`` set take the encoded upload bytes instead, so
+    the caller can skip decoding (and the backend re-encoding) the image.
+    """
+
+    name = "base"
+    accepts_encoded = False
+
+    @property
+    def model_id(self) -> str:
+        raise NotImplementedError
+
+    def detect(self, image_rgb: np.ndarray) -> List[Detection]:
+        raise NotImplementedError
+
+    def detect_batch(self, images_rgb: Sequence[np.ndarray]) -> List[List[Detection]]:
+        return [self.detect(image) for image in images_rgb]
+
+
+class RoboflowBackend(DetectionBackend):
+    name = "roboflow"
+    accepts_encoded = True
+
+    def __init__(self, client: RoboflowHTTPClient, model_id: str) -> None:
+        self.client = client
+        self._model_id = model_id
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def model_id(self) -> str:
+        return f"roboflow:{self._model_id}"
+
+    def detect(self, image: Union[np.ndarray, BytesLike]) -> List[Detection]:
+        result = self.client.infer(image, model_id=self._model_id)
+        return normalize_predictions(result.get("predictions", []))
+
+    def detect_batch(self, images: Sequence[Union[np.ndarray, BytesLike]]) -> List[List[Detection]]:
+        # The hosted API takes one image per call, so a batch is fanned out
+        # over the pooled keep-alive connections instead of run serially.
+        if len(images) <= 1:
+            return [self.detect(image) for image in images]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.client.settings.max_concurrency,
+                thread_name_prefix="roboflow-batch",
+            )
+        return list(self._executor.map(self.detect, images))
+
+
+class LocalBackend(DetectionBackend):
+    name = "local"
+
+    def __init__(self, detector: LocalDetector) -> None:
+        self.detector = detector
+
+    @property
+    def model_id(self) -> str:
+        return self.detector.model_version()
+
+    def detect(self, image_rgb: np.ndarray) -> List[Detection]:
+        return self.detector.detect(image_rgb)
+
+    def detect_batch(self, images_rgb: Sequence[np.ndarray]) -> List[List[Detection]]:
+        return self.detector.detect_batch(images_rgb)
+
+
+def resolve_backend_name(name: str, local_model_dir: Optional[Path] = None) -> str:
+    name = (name or "roboflow").strip().lower()
+    if name == "auto":
+        detector = LocalDetector(base_dir=local_model_dir)
+        return "local" if detector.paths.available() else "roboflow"
+    if name not in {"roboflow", "local"}:
+        raise ValueError(f"Unknown VISUAL_BACKEND: {name}")
+    return name
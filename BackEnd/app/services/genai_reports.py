@@ -5,10 +5,12 @@ from datetime import datetime, timedelta
 import os
 from typing import Any, Dict, List, Tuple
 
-import google.generativeai as genai
-
-from app.db_models.models import CarbonMetric, SmartBin, WasteLog
+from app.db_models.models import CarbonMetric, DailyBinCategoryRollup, SmartBin, WasteLog
 from app.extensions import db
+from app.services.archive import archived_category_weights, archived_daily_carbon, archived_totals
+from app.services.response_cache import get_response_cache
+from app.services.rollups import rollups_enabled, weight_expression
+from app.services.sql_dialect import day_bucket, dialect_name
 
 CATEGORY_COLORS = {
     "Organic": "#228B22",
@@ -18,13 +20,13 @@ CATEGORY_COLORS = {
     "Residue": "#8B3A3A",
 }
 
-CATEGORY_WEIGHTS_KG = {
-    "Organic": 3.5,
-    "Plastic": 2.1,
-    "Paper": 1.8,
-    "Metal": 1.4,
-    "Residue": 1.1,
-}
+
+def _genai():
+    # google.generativeai takes over a second to import; only the Gemini
+    # endpoints need it, so it is loaded on first use.
+    import google.generativeai as genai
+
+    return genai
 
 
 def _get_date_range(days: int) -> Tuple[datetime, datetime]:
@@ -50,20 +52,53 @@ def _normalize_confidence(value: float | None) -> float:
     return value * 100 if value <= 1 else value
 
 
-def get_carbon_trend(days: int = 7, weeks: int = 4) -> Dict[str, Any]:
-    start_dt, end_dt = _get_date_range(days)
-    records = (
-        db.session.query(WasteLog.timestamp, CarbonMetric.co2_reduction_value)
+def _rollup_range(start_dt: datetime, end_dt: datetime):
+    return (
+        DailyBinCategoryRollup.day >= start_dt.date(),
+        DailyBinCategoryRollup.day < end_dt.date(),
+    )
+
+
+def _log_range(start_dt: datetime, end_dt: datetime):
+    # Bounding both partition keys lets PostgreSQL prune waste_logs and carbon_metrics.
+    return (
+        WasteLog.timestamp >= start_dt,
+        WasteLog.timestamp < end_dt,
+        CarbonMetric.log_timestamp >= start_dt,
+        CarbonMetric.log_timestamp < end_dt,
+    )
+
+
+def _daily_carbon(start_dt: datetime, end_dt: datetime) -> Dict[datetime.date, float]:
+    """Sum avoided CO2 per day in SQL."""
+    if rollups_enabled():
+        # The rollup keeps archived months too.
+        day = DailyBinCategoryRollup.day
+        rows = (
+            db.session.query(day, db.func.sum(DailyBinCategoryRollup.co2_kg))
+            .filter(*_rollup_range(start_dt, end_dt))
+            .group_by(day)
+            .all()
+        )
+        return {day: float(value or 0) for day, value in rows}
+
+    day = day_bucket(WasteLog.timestamp, dialect_name(db.session))
+    rows = (
+        db.session.query(day, db.func.sum(CarbonMetric.co2_reduction_value))
         .join(CarbonMetric, CarbonMetric.log_id == WasteLog.id)
-        .filter(WasteLog.timestamp >= start_dt, WasteLog.timestamp < end_dt)
+        .filter(*_log_range(start_dt, end_dt))
+        .group_by(day)
         .all()
     )
+    daily_map: Dict[datetime.date, float] = defaultdict(float, archived_daily_carbon(db.session, start_dt, end_dt))
+    for day, value in rows:
+        daily_map[day] += float(value or 0)
+    return daily_map
+
 
-    daily_map: Dict[datetime.date, float] = defaultdict(float)
-    for ts, value in records:
-        if ts is None:
-            continue
-        daily_map[ts.date()] += float(value or 0)
+def get_carbon_trend(days: int = 7, weeks: int = 4) -> Dict[str, Any]:
+    start_dt, end_dt = _get_date_range(days)
+    daily_map = _daily_carbon(start_dt, end_dt)
 
     daily_labels = []
     daily_values = []
@@ -74,13 +109,10 @@ def get_carbon_trend(days: int = 7, weeks: int = 4) -> Dict[str, Any]:
         daily_values.append(round(daily_map.get(current_date, 0.0), 2))
         current_date += timedelta(days=1)
 
+    # Weeks are folded from the daily rows instead of scanning the logs twice.
     weekly_map: Dict[datetime.date, float] = defaultdict(float)
-    for ts, value in records:
-        if ts is None:
-            continue
-        day = ts.date()
-        week_start = day - timedelta(days=day.weekday())
-        weekly_map[week_start] += float(value or 0)
+    for day, value in daily_map.items():
+        weekly_map[day - timedelta(days=day.weekday())] += value
 
     week_starts = []
     end_week_start = end_date - timedelta(days=end_date.weekday())
@@ -110,20 +142,36 @@ def get_carbon_trend(days: int = 7, weeks: int = 4) -> Dict[str, Any]:
     }
 
 
-def get_waste_composition(days: int = 7) -> Dict[str, Any]:
-    start_dt, end_dt = _get_date_range(days)
-    logs = (
-        WasteLog.query.filter(WasteLog.timestamp >= start_dt, WasteLog.timestamp < end_dt)
-        .order_by(WasteLog.timestamp.desc())
+def _category_weights(start_dt: datetime, end_dt: datetime) -> Dict[str, float]:
+    category_totals: Dict[str, float] = defaultdict(float)
+    if rollups_enabled():
+        rows = (
+            db.session.query(DailyBinCategoryRollup.category, db.func.sum(DailyBinCategoryRollup.weight_kg))
+            .filter(*_rollup_range(start_dt, end_dt))
+            .group_by(DailyBinCategoryRollup.category)
+            .all()
+        )
+        for category, weight in rows:
+            category_totals[category] += float(weight or 0)
+        return category_totals
+
+    rows = (
+        db.session.query(WasteLog.category, db.func.sum(weight_expression(WasteLog.category)))
+        .filter(WasteLog.timestamp >= start_dt, WasteLog.timestamp < end_dt)
+        .group_by(WasteLog.category)
         .all()
     )
+    for category, weight in rows:
+        category_totals[category] += float(weight or 0)
+    for category, weight in archived_category_weights(db.session, start_dt, end_dt).items():
+        category_totals[category] += weight
+    return category_totals
 
-    category_totals: Dict[str, float] = defaultdict(float)
-    total_weight = 0.0
-    for log in logs:
-        weight = CATEGORY_WEIGHTS_KG.get(log.category, 1.0)
-        category_totals[log.category] += weight
-        total_weight += weight
+
+def get_waste_composition(days: int = 7) -> Dict[str, Any]:
+    start_dt, end_dt = _get_date_range(days)
+    category_totals = _category_weights(start_dt, end_dt)
+    total_weight = sum(category_totals.values())
 
     breakdown = []
     for category, weight in sorted(category_totals.items(), key=lambda item: item[1], reverse=True):
@@ -147,21 +195,48 @@ def get_waste_composition(days: int = 7) -> Dict[str, Any]:
 
 
 def get_reporting_summary(days: int = 7) -> Dict[str, Any]:
+    # Shared by the CSV/PDF export and the Gemini chat; cleared on commits like the API responses.
+    return get_response_cache().cached(
+        "reporting_summary", ("reporting_summary", days), lambda: _build_reporting_summary(days)
+    )
+
+
+def _build_reporting_summary(days: int) -> Dict[str, Any]:
     start_dt, end_dt = _get_date_range(days)
-    logs = WasteLog.query.filter(WasteLog.timestamp >= start_dt, WasteLog.timestamp < end_dt).all()
-    total_logs = len(logs)
     total_bins = SmartBin.query.count()
     active_bins = SmartBin.query.filter_by(is_active=True).count()
 
-    carbon_totals = (
-        db.session.query(
-            db.func.sum(CarbonMetric.co2_reduction_value),
-            db.func.sum(CarbonMetric.methane_reduction),
+    if rollups_enabled():
+        totals = (
+            db.session.query(
+                db.func.sum(DailyBinCategoryRollup.log_count),
+                db.func.sum(DailyBinCategoryRollup.co2_kg),
+                db.func.sum(DailyBinCategoryRollup.methane_kg),
+            )
+            .filter(*_rollup_range(start_dt, end_dt))
+            .first()
+        )
+        total_logs = int(totals[0] or 0)
+        carbon_totals = totals[1:]
+    else:
+        total_logs = WasteLog.query.filter(
+            WasteLog.timestamp >= start_dt, WasteLog.timestamp < end_dt
+        ).count()
+        carbon_totals = (
+            db.session.query(
+                db.func.sum(CarbonMetric.co2_reduction_value),
+                db.func.sum(CarbonMetric.methane_reduction),
+            )
+            .join(WasteLog, WasteLog.id == CarbonMetric.log_id)
+            .filter(*_log_range(start_dt, end_dt))
+            .first()
+        )
+        archived_logs, archived_co2, archived_methane = archived_totals(db.session, start_dt, end_dt)
+        total_logs += archived_logs
+        carbon_totals = (
+            float(carbon_totals[0] or 0) + archived_co2,
+            float(carbon_totals[1] or 0) + archived_methane,
         )
-        .join(WasteLog, WasteLog.id == CarbonMetric.log_id)
-        .filter(WasteLog.timestamp >= start_dt, WasteLog.timestamp < end_dt)
-        .first()
-    )
     carbon_avoided = float(carbon_totals[0] or 0)
     methane_avoided = float(carbon_totals[1] or 0)
 
@@ -191,6 +266,7 @@ def generate_gemini_insight(
     if not api_key:
         raise ValueError("GEMINI_API_KEY / GOOGLE_API_KEY belum dikonfigurasi.")
 
+    genai = _genai()
     genai.configure(api_key=api_key)
     model_name = os.getenv("GEMINI_MODEL", "models/gemini-flash-latest")
     model = genai.GenerativeModel(model_name)
@@ -250,17 +326,14 @@ Pertanyaan pengguna:
     return "Maaf, saya belum bisa menghasilkan analisis saat ini."
 
 import os
-import google.generativeai as genai
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
+# Gemini API key (the client is configured on first use)
 GENAI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GENAI_API_KEY:
-    genai.configure(api_key=GENAI_API_KEY)
-else:
+if not GENAI_API_KEY:
     # Handle missing key gracefully in production, though verification script might complain
     print("Warning: GEMINI_API_KEY not found in environment variables.")
 
@@ -286,6 +359,8 @@ def generate_esg_report(stats_summary: dict) -> str:
         return "Service Error: Gemini API Key is missing. Cannot generate report."
 
     try:
+        genai = _genai()
+        genai.configure(api_key=GENAI_API_KEY)
         model = genai.GenerativeModel('gemini-1.5-flash') # Using flash for speed/cost effectiveness
 
         # Construct the prompt
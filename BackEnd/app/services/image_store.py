@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Any, Dict, Optional
+from uuid import uuid4
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_IMAGE_DIR = BASE_DIR / "app" / "storage" / "anomaly_uploads"
+
+# Thumbnail name -> longest edge in pixels. "thumb" covers the queue cards
+# at 2x density; "medium" is for the detail / lightbox view.
+THUMBNAIL_SIZES = {"thumb": 320, "medium": 960}
+WEBP_QUALITY = 80
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    # Readers never see a half-written file: write aside, then rename over.
+    partial = path.with_name(f".{path.name}.{uuid4().hex}.partial")
+    partial.write_bytes(data)
+    os.replace(partial, path)
+
+
+class ImageStore:
+    """Content-addressed upload storage with background writes.
+
+    ``save`` hashes the bytes, returns the final filename straight away and
+    hands the write (plus WebP thumbnail generation) to a small thread pool.
+    Identical images map to the same file and are written once. At most
+    ``queue_size`` writes are pending; past that, ``save`` writes inline
+    so uploads are never dropped.
+    """
+
+    def __init__(
+        self,
+        root: Path = DEFAULT_IMAGE_DIR,
+        workers: int = 2,
+        queue_size: int = 32,
+        sizes: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.workers = max(int(workers), 1)
+        self.queue_size = max(int(queue_size), 1)
+        self.sizes = dict(sizes or THUMBNAIL_SIZES)
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[str, Future] = {}
+        self._counters = {
+            "stored": 0,
+            "deduplicated": 0,
+            "inline_writes": 0,
+            "failed": 0,
+            "thumbnails": 0,
+        }
+
+    @staticmethod
+    def filename_for(data: bytes, ext: str) -> str:
+        return f"{hashlib.blake2b(data, digest_size=16).hexdigest()}.{ext}"
+
+    def thumbnail_path(self, filename: str, size: str) -> Path:
+        return self.root / "thumbs" / size / f"{Path(filename).stem}.webp"
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="image-store"
+                    )
+        return self._executor
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def save(self, data: bytes, ext: str = "jpg") -> str:
+        filename = self.filename_for(data, ext)
+        with self._lock:
+            if filename in self._pending or (self.root / filename).exists():
+                self._counters["deduplicated"] += 1
+                return filename
+            queued = self._slots.acquire(blocking=False)
+            if queued:
+                future: Future = Future()
+                self._pending[filename] = future
+
+        if not queued:
+            self._count("inline_writes")
+            self._write(filename, data)
+            return filename
+
+        def run() -> None:
+            try:
+                self._write(filename, data)
+                future.set_result(filename)
+            except BaseException as exc:
+                future.set_exception(exc)
+            finally:
+                with self._lock:
+                    self._pending.pop(filename, None)
+                self._slots.release()
+
+        self._get_executor().submit(run)
+        return filename
+
+    def _write(self, filename: str, data: bytes) -> None:
+        try:
+            _atomic_write(self.root / filename, data)
+        except Exception:
+            self._count("failed")
+            logger.exception("Failed to store upload %s", filename)
+            raise
+        self._count("stored")
+        self._make_thumbnails(filename, data)
+
+    def _make_thumbnails(self, filename: str, data: bytes) -> bool:
+        try:
+            import cv2
+            import numpy as np
+
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if image is None:
+                return False
+            height, width = image.shape[:2]
+            for size, edge in self.sizes.items():
+                scale = min(edge / max(height, width), 1.0)
+                resized = image
+                if scale < 1.0:
+                    resized = cv2.resize(
+                        image,
+                        (max(round(width * scale), 1), max(round(height * scale), 1)),
+                        interpolation=cv2.INTER_AREA,
+                    )
+                ok, encoded = cv2.imencode(".webp", resized, [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY])
+                if not ok:
+                    return False
+                path = self.thumbnail_path(filename, size)
+                path.parent.mkdir(parents=True, exist_ok=True)
+                _atomic_write(path, encoded.tobytes())
+                self._count("thumbnails")
+        except Exception:
+            logger.exception("Failed to build thumbnails for %s", filename)
+            return False
+        return True
+
+    def wait(self, filename: str, timeout: Optional[float] = 5.0) -> None:
+        """Block until a pending background write of ``filename`` finishes."""
+        with self._lock:
+            future = self._pending.get(filename)
+        if future is None:
+            return
+        try:
+            future.result(timeout=timeout)
+        except (FutureTimeout, Exception):
+            pass
+
+    def resolve(self, filename: str, size: Optional[str] = None) -> Optional[Path]:
+        """Path to serve for ``filename`` (or its ``size`` thumbnail), if any.
+
+        Thumbnails missing on disk - uploads stored before thumbnails
+        existed, or a failed encode - are built on first request; if that
+        is not possible the original is served instead.
+        """
+        self.wait(filename)
+        original = self.root / filename
+        if not original.is_file():
+            return None
+        if not size:
+            return original
+        thumbnail = self.thumbnail_path(filename, size)
+        if thumbnail.is_file() or self._make_thumbnails(filename, original.read_bytes()):
+            return thumbnail
+        return original
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "pending": len(self._pending),
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "sizes": dict(self.sizes),
+            }
+
+
+_STORE: Optional[ImageStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_image_store() -> ImageStore:
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = ImageStore(
+                    workers=int(os.getenv("IMAGE_STORE_WORKERS", "2")),
+                    queue_size=int(os.getenv("IMAGE_STORE_QUEUE_SIZE", "32")),
+                )
+    return _STORE
@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.model_registry import get_model_registry
+
+try:
+    import onnxruntime as ort
+except Exception:  # pragma: no cover - optional dependency
+    ort = None
+
+
+DEFAULT_VISION_MODEL_DIR = (
+    Path(__file__).resolve().parents[2] / "ml_models" / "vision" / "garbage_detector_v1"
+)
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+@dataclass
+class VisionModelPaths:
+    base_dir: Path
+
+    @property
+    def model_path(self) -> Path:
+        return self.base_dir / "model.onnx"
+
+    @property
+    def labels_path(self) -> Path:
+        return self.base_dir / "labels.json"
+
+    @property
+    def metadata_path(self) -> Path:
+        return self.base_dir / "metadata.json"
+
+    def available(self) -> bool:
+        return self.model_path.exists()
+
+
+@dataclass
+class Letterbox:
+    scale: float
+    pad_x: float
+    pad_y: float
+    width: int
+    height: int
+
+
+def letterbox(image_rgb: np.ndarray, size: Tuple[int, int]) -> Tuple[np.ndarray, Letterbox]:
+    """Resize keeping aspect ratio and pad to ``size`` (height, width)."""
+    target_h, target_w = size
+    height, width = image_rgb.shape[:2]
+    scale = min(target_w / width, target_h / height)
+    new_w = max(int(round(width * scale)), 1)
+    new_h = max(int(round(height * scale)), 1)
+
+    resized = image_rgb
+    if (new_w, new_h) != (width, height):
+        resized = cv2.resize(image_rgb, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    pad_x = (target_w - new_w) / 2
+    pad_y = (target_h - new_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    padded = cv2.copyMakeBorder(
+        resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR
+    )
+    return padded, Letterbox(scale=scale, pad_x=left, pad_y=top, width=width, height=height)
+
+
+def nms(boxes_xyxy: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy non-maximum suppression with vectorized IoU; returns kept indices."""
+    if boxes_xyxy.size == 0:
+        return np.empty(0, dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes_xyxy.T
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(-scores, kind="stable")
+    keep: List[int] = []
+
+    while order.size:
+        current = order[0]
+        keep.append(int(current))
+        rest = order[1:]
+        xx1 = np.maximum(x1[current], x1[rest])
+        yy1 = np.maximum(y1[current], y1[rest])
+        xx2 = np.minimum(x2[current], x2[rest])
+        yy2 = np.minimum(y2[current], y2[rest])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / np.maximum(areas[current] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def batched_nms(
+    boxes_xyxy: np.ndarray,
+    scores: np.ndarray,
+    class_ids: np.ndarray,
+    iou_threshold: float,
+) -> np.ndarray:
+    """Class-aware NMS in one pass by offsetting each class into its own space."""
+    if boxes_xyxy.size == 0:
+        return np.empty(0, dtype=np.int64)
+    offset = float(boxes_xyxy.max()) + 1.0
+    shifted = boxes_xyxy + (class_ids.astype(np.float32) * offset)[:, None]
+    return nms(shifted, scores, iou_threshold)
+
+
+class _OnnxRuntimeSession:
+    def __init__(self, model_path: Path) -> None:
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_shape = list(model_input.shape)
+
+    def run(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class _OpenCvDnnSession:
+    def __init__(self, model_path: Path) -> None:
+        self.net = cv2.dnn.readNetFromONNX(str(model_path))
+        self.input_shape: List[Any] = []
+
+    def run(self, blob: np.ndarray) -> np.ndarray:
+        self.net.setInput(blob)
+        return self.net.forward()
+
+
+@dataclass
+class LocalDetectorBundle:
+    session: Any
+    labels: Dict[int, str]
+    metadata: Dict[str, Any]
+    input_size: Tuple[int, int]
+    supports_batch: bool
+
+
+def _load_local_bundle(paths: VisionModelPaths) -> LocalDetectorBundle:
+    if not paths.model_path.exists():
+        raise FileNotFoundError(f"Vision model not found: {paths.model_path}")
+
+    session = _OnnxRuntimeSession(paths.model_path) if ort is not None else _OpenCvDnnSession(paths.model_path)
+
+    labels: Dict[int, str] = {}
+    if paths.labels_path.exists():
+        raw_labels = json.loads(paths.labels_path.read_text(encoding="utf-8"))
+        if isinstance(raw_labels, list):
+            labels = {idx: str(name) for idx, name in enumerate(raw_labels)}
+        else:
+            labels = {int(idx): str(name) for idx, name in raw_labels.items()}
+
+    metadata: Dict[str, Any] = {}
+    if paths.metadata_path.exists():
+        metadata = json.loads(paths.metadata_path.read_text(encoding="utf-8"))
+
+    shape = session.input_shape
+    if len(shape) == 4 and isinstance(shape[2], int) and isinstance(shape[3], int):
+        input_size = (shape[2], shape[3])
+    else:
+        size = metadata.get("input_size", 640)
+        input_size = (int(size), int(size)) if isinstance(size, (int, float)) else (int(size[0]), int(size[1]))
+
+    supports_batch = bool(shape) and not (isinstance(shape[0], int) and shape[0] == 1)
+
+    return LocalDetectorBundle(
+        session=session,
+        labels=labels,
+        metadata=metadata,
+        input_size=input_size,
+        supports_batch=supports_batch,
+    )
+
+
+class LocalDetector:
+    """CPU object detector for YOLO-style ONNX exports under ``ml_models/vision``."""
+
+    def __init__(
+        self,
+        base_dir: Optional[Path] = None,
+        conf_threshold: float = 0.4,
+        iou_threshold: float = 0.5,
+        max_detections: int = 100,
+    ) -> None:
+        self.base_dir = base_dir or DEFAULT_VISION_MODEL_DIR
+        self.paths = VisionModelPaths(self.base_dir)
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.max_detections = max_detections
+
+    def _acquire(self):
+        return get_model_registry().acquire(
+            str(self.base_dir.resolve()),
+            self.paths.model_path,
+            lambda _path: _load_local_bundle(self.paths),
+        )
+
+    def load(self) -> None:
+        with self._acquire():
+            pass
+
+    def model_version(self) -> str:
+        try:
+            mtime = int(self.paths.model_path.stat().st_mtime)
+        except OSError:
+            mtime = 0
+        return f"local:{self.base_dir.name}:{mtime}"
+
+    def detect(self, image_rgb: np.ndarray) -> List[Dict[str, Any]]:
+        return self.detect_batch([image_rgb])[0]
+
+    def detect_batch(self, images_rgb: Sequence[np.ndarray]) -> List[List[Dict[str, Any]]]:
+        if not images_rgb:
+            return []
+
+        with self._acquire() as bundle:
+            prepared = [letterbox(image, bundle.input_size) for image in images_rgb]
+            blob = np.stack([padded for padded, _ in prepared]).astype(np.float32)
+            blob = np.ascontiguousarray(blob.transpose(0, 3, 1, 2)) / 255.0
+
+            if bundle.supports_batch or len(prepared) == 1:
+                outputs = bundle.session.run(blob)
+            else:
+                outputs = np.concatenate([bundle.session.run(blob[idx : idx + 1]) for idx in range(len(prepared))])
+
+            layout = bundle.metadata.get("format")
+            return [
+                self._postprocess(outputs[idx], box, bundle.labels, layout)
+                for idx, (_, box) in enumerate(prepared)
+            ]
+
+    def _postprocess(
+        self,
+        output: np.ndarray,
+        box: Letterbox,
+        labels: Dict[int, str],
+        layout: Optional[str],
+    ) -> List[Dict[str, Any]]:
+        preds = np.asarray(output, dtype=np.float32)
+        if preds.ndim == 3:
+            preds = preds[0]
+
+        # YOLOv8 exports are (4 + classes, anchors); YOLOv5 are (anchors, 5 + classes).
+        if layout == "yolov8" or (layout is None and preds.shape[0] < preds.shape[1]):
+            preds = preds.T
+            boxes_cxcywh = preds[:, :4]
+            class_scores = preds[:, 4:]
+        else:
+            boxes_cxcywh = preds[:, :4]
+            class_scores = preds[:, 5:] * preds[:, 4:5]
+
+        if class_scores.shape[1] == 0:
+            return []
+
+        class_ids = np.argmax(class_scores, axis=1)
+        scores = class_scores[np.arange(class_scores.shape[0]), class_ids]
+        mask = scores >= self.conf_threshold
+        if not np.any(mask):
+            return []
+
+        boxes_cxcywh = boxes_cxcywh[mask]
+        scores = scores[mask]
+        class_ids = class_ids[mask]
+
+        # Undo the letterbox and clip to the original image.
+        cx = (boxes_cxcywh[:, 0] - box.pad_x) / box.scale
+        cy = (boxes_cxcywh[:, 1] - box.pad_y) / box.scale
+        half_w = boxes_cxcywh[:, 2] / box.scale / 2
+        half_h = boxes_cxcywh[:, 3] / box.scale / 2
+        xyxy = np.stack(
+            [
+                np.clip(cx - half_w, 0, box.width),
+                np.clip(cy - half_h, 0, box.height),
+                np.clip(cx + half_w, 0, box.width),
+                np.clip(cy + half_h, 0, box.height),
+            ],
+            axis=1,
+        )
+
+        keep = batched_nms(xyxy, scores, class_ids, self.iou_threshold)[: self.max_detections]
+        detections: List[Dict[str, Any]] = []
+        for idx in keep:
+            x1, y1, x2, y2 = (float(value) for value in xyxy[idx])
+            class_id = int(class_ids[idx])
+            detections.append(
+                {
+                    "label": labels.get(class_id, str(class_id)),
+                    "confidence": float(scores[idx]),
+                    "bbox": {
+                        "x": (x1 + x2) / 2,
+                        "y": (y1 + y2) / 2,
+                        "width": x2 - x1,
+                        "height": y2 - y1,
+                    },
+                }
+            )
+        return detections
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+
+class LatencyStats:
+    """Thread-safe call counter with latency totals in seconds (and retries, for HTTP calls)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds: Optional[float] = None
+
+    def record(self, seconds: float, error: bool = False, retries: int = 0) -> None:
+        with self._lock:
+            self.count += 1
+            if error:
+                self.errors += 1
+            self.retries += retries
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            self.last_seconds = seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            avg = self.total_seconds / self.count if self.count else 0.0
+            return {
+                "count": self.count,
+                "errors": self.errors,
+                "retries": self.retries,
+                "avg_ms": round(avg * 1000, 2),
+                "max_ms": round(self.max_seconds * 1000, 2),
+                "last_ms": round(self.last_seconds * 1000, 2) if self.last_seconds is not None else None,
+            }
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``buckets`` are inclusive upper bounds."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self._lock = threading.Lock()
+        self.buckets = sorted(float(bound) for bound in buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{bound:g}" for bound in self.buckets] + ["inf"]
+            return {
+                "count": self.count,
+                "avg": round(self.total / self.count, 3) if self.count else 0.0,
+                "buckets": dict(zip(labels, self.counts)),
+            }
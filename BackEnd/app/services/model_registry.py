@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+Loader = Callable[[Path], Any]
+
+
+def _file_mtime(path: Path) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+@dataclass
+class ModelEntry:
+    key: str
+    source_path: Path
+    source_mtime: Optional[float]
+    bundle: Any
+    load_seconds: float
+    loaded_at: datetime
+    checked_at: float
+    hits: int = 0
+    refs: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "source_path": str(self.source_path),
+            "source_mtime": self.source_mtime,
+            "load_seconds": round(self.load_seconds, 4),
+            "loaded_at": self.loaded_at.isoformat(),
+            "hits": self.hits,
+            "in_use": self.refs,
+        }
+
+
+class ModelRegistry:
+    """Thread-safe cache of loaded models keyed by model directory.
+
+    Entries are reloaded when their source file changes on disk. A replaced
+    entry stays tracked until every in-flight caller has released it.
+    """
+
+    def __init__(self, check_interval: Optional[float] = None) -> None:
+        if check_interval is None:
+            check_interval = float(os.getenv("MODEL_RELOAD_CHECK_SECONDS", "2"))
+        self.check_interval = max(check_interval, 0.0)
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, ModelEntry] = {}
+        self._retired: List[ModelEntry] = []
+        self._reloads: Dict[str, int] = {}
+
+    def _is_fresh(self, entry: Optional[ModelEntry], source_path: Path) -> bool:
+        if entry is None or entry.source_path != source_path:
+            return False
+        now = time.monotonic()
+        if now - entry.checked_at < self.check_interval:
+            return True
+        entry.checked_at = now
+        return _file_mtime(source_path) == entry.source_mtime
+
+    def _checkout(self, key: str, source_path: Path, loader: Loader) -> ModelEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if self._is_fresh(entry, source_path):
+                entry.hits += 1
+                entry.refs += 1
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another thread may have finished the reload while we waited.
+            with self._lock:
+                entry = self._entries.get(key)
+                if self._is_fresh(entry, source_path):
+                    entry.hits += 1
+                    entry.refs += 1
+                    return entry
+
+            mtime = _file_mtime(source_path)
+            started = time.perf_counter()
+            bundle = loader(source_path)
+            elapsed = time.perf_counter() - started
+
+            new_entry = ModelEntry(
+                key=key,
+                source_path=source_path,
+                source_mtime=mtime,
+                bundle=bundle,
+                load_seconds=elapsed,
+                loaded_at=datetime.utcnow(),
+                checked_at=time.monotonic(),
+                hits=1,
+                refs=1,
+            )
+            with self._lock:
+                old_entry = self._entries.get(key)
+                self._entries[key] = new_entry
+                if old_entry is not None:
+                    self._reloads[key] = self._reloads.get(key, 0) + 1
+                    if old_entry.refs > 0:
+                        self._retired.append(old_entry)
+            return new_entry
+
+    def _release(self, entry: ModelEntry) -> None:
+        with self._lock:
+            entry.refs = max(entry.refs - 1, 0)
+            if entry.refs == 0 and entry in self._retired:
+                self._retired.remove(entry)
+
+    @contextmanager
+    def acquire(self, key: str, source_path: Path, loader: Loader) -> Iterator[Any]:
+        entry = self._checkout(key, source_path, loader)
+        try:
+            yield entry.bundle
+        finally:
+            self._release(entry)
+
+    def evict(self, key: str) -> bool:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry.refs > 0:
+                self._retired.append(entry)
+            return entry is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "check_interval": self.check_interval,
+                "entries": [
+                    {**entry.to_dict(), "reloads": self._reloads.get(key, 0)}
+                    for key, entry in self._entries.items()
+                ],
+                "retired_in_use": len(self._retired),
+            }
+
+
+_REGISTRY: Optional[ModelRegistry] = None
+_REGISTRY_LOCK = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    global _REGISTRY
+    if _REGISTRY is None:
+        with _REGISTRY_LOCK:
+            if _REGISTRY is None:
+                _REGISTRY = ModelRegistry()
+    return _REGISTRY
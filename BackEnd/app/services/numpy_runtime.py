@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0.0, out=x)
+
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    x = x - np.max(x, axis=-1, keepdims=True)
+    np.exp(x, out=x)
+    x /= np.sum(x, axis=-1, keepdims=True)
+    return x
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "linear": lambda x: x,
+    "relu": _relu,
+    "softmax": _softmax,
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+}
+
+
+class NumpyDenseModel:
+    """Inference-only stack of Dense layers exported from Keras.
+
+    Loads the ``model.npz`` written by ``export_audio_model.py`` and mirrors
+    ``keras.Model.predict`` for the audio MFCC classifier (Dropout is a no-op
+    at inference, so only Dense kernels, biases and activations are kept).
+    """
+
+    def __init__(self, layers: Sequence[Tuple[np.ndarray, np.ndarray, str]]) -> None:
+        for _, _, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation in exported model: {activation}")
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), activation)
+            for kernel, bias, activation in layers
+        ]
+        self.input_dim = self.layers[0][0].shape[0] if self.layers else 0
+
+    @classmethod
+    def load(cls, path: Path) -> NumpyDenseModel:
+        with np.load(path, allow_pickle=False) as data:
+            activations = [str(name) for name in data["activations"]]
+            layers = [
+                (data[f"kernel_{index}"], data[f"bias_{index}"], activation)
+                for index, activation in enumerate(activations)
+            ]
+        return cls(layers)
+
+    def predict(self, x: np.ndarray, verbose: int = 0) -> np.ndarray:
+        out = np.asarray(x, dtype=np.float32).reshape(-1, self.input_dim)
+        for kernel, bias, activation in self.layers:
+            out = out @ kernel
+            out += bias
+            out = ACTIVATIONS[activation](out)
+        return out
+
+
+class ExportedLabels:
+    """Minimal stand-in for sklearn's LabelEncoder read from ``model.npz``."""
+
+    def __init__(self, classes: Sequence[str]) -> None:
+        self.classes_ = np.asarray(classes)
+
+    def inverse_transform(self, indices: Sequence[int]) -> List[str]:
+        return [str(self.classes_[int(index)]) for index in indices]
+
+    @classmethod
+    def load(cls, path: Path) -> Optional[ExportedLabels]:
+        with np.load(path, allow_pickle=False) as data:
+            if "classes" not in data.files:
+                return None
+            return cls([str(name) for name in data["classes"]])
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from flask import Response, current_app, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.db_models.models import AnomalyData, CarbonMetric, SmartBin, WasteLog
+
+# Writes to these models change what the dashboard / analytics endpoints return.
+WATCHED_MODELS = (WasteLog, CarbonMetric, AnomalyData, SmartBin)
+
+_DIRTY_FLAG = "response_cache_dirty"
+
+
+@dataclass
+class _Entry:
+    body: bytes
+    mimetype: str
+    etag: str
+    expires_at: float
+
+
+class ResponseCache:
+    """Short-lived cache of rendered dashboard / analytics payloads.
+
+    Entries are keyed by (route, sorted query args) and expire after
+    ``ttl_seconds``. Commits that touch a watched model clear the cache
+    (see ``register_cache_events``); that only covers writes made by this
+    process, so the TTL bounds staleness for writes from other workers.
+    """
+
+    def __init__(self, ttl_seconds: float = 15.0, max_entries: int = 256) -> None:
+        self.ttl_seconds = max(float(ttl_seconds), 0.0)
+        self.max_entries = max(int(max_entries), 1)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self.generation = 0
+        self._counters = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0, "evictions": 0}
+        self._routes: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def _count(self, route: str, name: str) -> None:
+        self._counters[name] += 1
+        per_route = self._routes.setdefault(route, {"hits": 0, "misses": 0})
+        per_route[name] += 1
+
+    def get(self, route: str, key: Hashable) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at >= time.time():
+                self._entries.move_to_end(key)
+                self._count(route, "hits")
+                return entry
+            if entry is not None:
+                del self._entries[key]
+            self._count(route, "misses")
+            return None
+
+    def set(self, key: Hashable, body: bytes, mimetype: str, generation: int) -> _Entry:
+        entry = _Entry(
+            body=body,
+            mimetype=mimetype,
+            etag=hashlib.blake2b(body, digest_size=16).hexdigest(),
+            expires_at=time.time() + self.ttl_seconds,
+        )
+        with self._lock:
+            # A commit landed while this payload was being built; it may be stale.
+            if generation != self.generation:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+        return entry
+
+    def cached(self, route: str, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return ``compute()``'s JSON-serialisable result, cached under ``key``."""
+        if not self.enabled:
+            return compute()
+        entry = self.get(route, key)
+        if entry is not None:
+            return json.loads(entry.body)
+        generation = self.generation
+        value = compute()
+        self.set(key, json.dumps(value, separators=(",", ":")).encode("utf-8"), "application/json", generation)
+        return value
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self._counters["not_modified"] += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "generation": self.generation,
+                "routes": {route: dict(counts) for route, counts in self._routes.items()},
+            }
+
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = ResponseCache(
+                    ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "15")),
+                    max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256")),
+                )
+    return _CACHE
+
+
+def _request_key() -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    return request.path, tuple(sorted(request.args.items(multi=True)))
+
+
+def cached_response(view: Callable) -> Callable:
+    """Serve a GET view from the response cache, with ETag / If-None-Match."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_response_cache()
+        if not cache.enabled:
+            return view(*args, **kwargs)
+
+        route = request.endpoint or request.path
+        key = _request_key()
+        entry = cache.get(route, key)
+        if entry is None:
+            generation = cache.generation
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            entry = cache.set(key, response.get_data(), response.mimetype, generation)
+
+        response = Response(entry.body, mimetype=entry.mimetype)
+        response.set_etag(entry.etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.make_conditional(request)
+        if response.status_code == 304:
+            cache.record_not_modified()
+        return response
+
+    return wrapper
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, WATCHED_MODELS):
+            session.info[_DIRTY_FLAG] = True
+            return
+
+
+def mark_dirty(session: Session) -> None:
+    """Flag a Core-level write (no ORM flush) so the next commit clears the cache."""
+    session.info[_DIRTY_FLAG] = True
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_DIRTY_FLAG, False):
+        get_response_cache().invalidate()
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_DIRTY_FLAG, None)
+
+
+def register_cache_events(session) -> None:
+    """Clear the response cache whenever ``session`` commits a watched model."""
+    for name, listener in (
+        ("after_flush", _after_flush),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(session, name, listener):
+            event.listen(session, name, listener)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+@dataclass
+class _Entry:
+    payload: str
+    size: int
+    expires_at: float
+
+
+class ResultCache:
+    """LRU + TTL cache of prediction results keyed by input content.
+
+    Keys combine a namespace (``visual`` / ``audio``), the model id and a
+    BLAKE2 digest of the decoded input bytes. When a namespace sees a new
+    model id, entries for the old model are dropped. Results are stored as
+    JSON so every hit returns a fresh copy.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 300.0,
+        spill_path: Optional[Path] = None,
+    ) -> None:
+        self.max_bytes = max(int(max_bytes), 0)
+        self.ttl_seconds = max(float(ttl_seconds), 0.0)
+        self.spill_path = spill_path
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str, str], _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._model_ids: Dict[str, str] = {}
+        self._counters = {"hits": 0, "misses": 0, "spill_hits": 0, "evictions": 0, "invalidations": 0}
+        self._spill: Optional[sqlite3.Connection] = None
+        if spill_path is not None:
+            self._spill = self._open_spill(spill_path)
+
+    @staticmethod
+    def _open_spill(path: Path) -> sqlite3.Connection:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "namespace TEXT NOT NULL, model_id TEXT NOT NULL, digest TEXT NOT NULL, "
+            "payload TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (namespace, model_id, digest))"
+        )
+        conn.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+        return conn
+
+    @staticmethod
+    def digest(data: BytesLike) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def _check_model(self, namespace: str, model_id: str) -> None:
+        current = self._model_ids.get(namespace)
+        if current == model_id:
+            return
+        self._model_ids[namespace] = model_id
+        if current is None and self._spill is None:
+            return
+        stale = [key for key in self._entries if key[0] == namespace and key[1] != model_id]
+        for key in stale:
+            self._bytes -= self._entries.pop(key).size
+        if stale:
+            self._counters["invalidations"] += len(stale)
+        if self._spill is not None:
+            self._spill.execute(
+                "DELETE FROM results WHERE namespace = ? AND model_id != ?", (namespace, model_id)
+            )
+
+    def get(self, namespace: str, model_id: str, digest: str) -> Optional[Dict[str, Any]]:
+        key = (namespace, model_id, digest)
+        now = time.time()
+        with self._lock:
+            self._check_model(namespace, model_id)
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at >= now:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return json.loads(entry.payload)
+            if entry is not None:
+                self._bytes -= self._entries.pop(key).size
+
+            if self._spill is not None:
+                row = self._spill.execute(
+                    "SELECT payload, expires_at FROM results "
+                    "WHERE namespace = ? AND model_id = ? AND digest = ?",
+                    key,
+                ).fetchone()
+                if row is not None and row[1] >= now:
+                    self._store(key, row[0], row[1])
+                    self._counters["hits"] += 1
+                    self._counters["spill_hits"] += 1
+                    return json.loads(row[0])
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, namespace: str, model_id: str, digest: str, value: Dict[str, Any]) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        payload = json.dumps(value, separators=(",", ":"))
+        expires_at = time.time() + self.ttl_seconds
+        key = (namespace, model_id, digest)
+        with self._lock:
+            self._check_model(namespace, model_id)
+            self._store(key, payload, expires_at)
+            if self._spill is not None:
+                self._spill.execute(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (*key, payload, expires_at),
+                )
+
+    def _store(self, key: Tuple[str, str, str], payload: str, expires_at: float) -> None:
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= previous.size
+        self._entries[key] = _Entry(payload=payload, size=size, expires_at=expires_at)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._spill is not None:
+                self._spill.execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "spill_path": str(self.spill_path) if self.spill_path else None,
+                "model_ids": dict(self._model_ids),
+            }
+
+
+_CACHE: Optional[ResultCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_result_cache() -> ResultCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                spill = os.getenv("RESULT_CACHE_SPILL_PATH", "").strip()
+                _CACHE = ResultCache(
+                    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+                    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300")),
+                    spill_path=Path(spill) if spill else None,
+                )
+    return _CACHE
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import base64
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from app.services.metrics import LatencyStats
+
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+@dataclass(frozen=True)
+class ClientSettings:
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    max_retries: int = 2
+    retry_backoff: float = 0.5
+    max_concurrency: int = 8
+
+    @classmethod
+    def from_env(cls) -> "ClientSettings":
+        return cls(
+            connect_timeout=float(os.getenv("ROBOFLOW_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("ROBOFLOW_TIMEOUT", "30")),
+            max_retries=int(os.getenv("ROBOFLOW_MAX_RETRIES", "2")),
+            retry_backoff=float(os.getenv("ROBOFLOW_RETRY_BACKOFF", "0.5")),
+            max_concurrency=max(int(os.getenv("ROBOFLOW_MAX_CONCURRENCY", "8")), 1),
+        )
+
+
+class RoboflowHTTPClient:
+    """Long-lived HTTP client for one Roboflow upstream.
+
+    Mirrors the ``infer`` (API v0) / ``run_workflow`` calls of
+    ``InferenceHTTPClient`` but keeps a single keep-alive session, bounds
+    concurrent calls and retries transient failures with exponential backoff.
+    The SDK's own workflow call cannot reuse a session, so requests are built
+    here; tests/test_roboflow_client.py checks they match the SDK's.
+    """
+
+    def __init__(self, api_url: str, api_key: str, settings: ClientSettings) -> None:
+        self.api_url = api_url.rstrip("/")
+        self.api_key = api_key
+        self.settings = settings
+        self.stats = LatencyStats()
+        self._slots = threading.BoundedSemaphore(settings.max_concurrency)
+
+        retry = Retry(
+            total=settings.max_retries,
+            connect=settings.max_retries,
+            read=settings.max_retries,
+            status=settings.max_retries,
+            backoff_factor=settings.retry_backoff,
+            status_forcelist=RETRYABLE_STATUS_CODES,
+            allowed_methods=frozenset({"POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.max_concurrency,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @property
+    def _timeout(self) -> Tuple[float, float]:
+        return (self.settings.connect_timeout, self.settings.read_timeout)
+
+    def _post(self, url: str, **kwargs: Any) -> requests.Response:
+        if not self._slots.acquire(timeout=self.settings.read_timeout):
+            raise RuntimeError(f"Too many concurrent requests to {self.api_url}")
+        started = time.perf_counter()
+        failed = True
+        retries = 0
+        try:
+            response = self.session.post(url, timeout=self._timeout, **kwargs)
+            history = getattr(getattr(response.raw, "retries", None), "history", None)
+            retries = len(history) if history else 0
+            response.raise_for_status()
+            failed = False
+            return response
+        finally:
+            self._slots.release()
+            self.stats.record(time.perf_counter() - started, error=failed, retries=retries)
+
+    @staticmethod
+    def _encode_image(image_input: Any) -> bytes:
+        """Base64 of ``image_input`` as ASCII bytes, ready to go on the wire."""
+        if isinstance(image_input, np.ndarray):
+            success, buffer = cv2.imencode(".jpg", image_input)
+            if not success:
+                raise ValueError("Failed to encode image")
+            return base64.b64encode(buffer)
+        if isinstance(image_input, (bytes, bytearray, memoryview)):
+            return base64.b64encode(image_input)
+        if isinstance(image_input, str):
+            return image_input.encode("ascii")
+        raise ValueError("Unsupported image input type")
+
+    def _model_url(self, model_id: str) -> str:
+        return f"{self.api_url}/{model_id.strip('/')}"
+
+    def infer(self, image_input: Any, model_id: str) -> Dict[str, Any]:
+        response = self._post(
+            self._model_url(model_id),
+            params={
+                "api_key": self.api_key,
+                "allow_reduced_mask_resolution": False,
+                "disable_active_learning": False,
+            },
+            data=self._encode_image(image_input),
+            headers={"Content-Type": "application/json"},
+        )
+        return response.json()
+
+    def _workflow_body(self, images: Dict[str, Any]) -> bytes:
+        # The base64 alphabet never needs JSON escaping, so each image is
+        # spliced into the body as bytes instead of going through str and
+        # json.dumps (two more full-size copies per image).
+        parts = [
+            json.dumps({"api_key": self.api_key, "use_cache": True, "enable_profiling": False})[:-1].encode(),
+            b', "inputs": {',
+        ]
+        for index, (name, image) in enumerate(images.items()):
+            if index:
+                parts.append(b", ")
+            parts += [
+                json.dumps(name).encode(),
+                b': {"type": "base64", "value": "',
+                self._encode_image(image),
+                b'"}',
+            ]
+        parts.append(b"}}")
+        return b"".join(parts)
+
+    def run_workflow(
+        self,
+        workspace_name: str,
+        workflow_id: str,
+        images: Dict[str, Any],
+    ) -> List[Dict[str, Any]]:
+        response = self._post(
+            f"{self.api_url}/{workspace_name}/workflows/{workflow_id}",
+            data=self._workflow_body(images),
+            headers={"Content-Type": "application/json"},
+        )
+        return response.json().get("outputs", [])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "api_url": self.api_url,
+            "max_concurrency": self.settings.max_concurrency,
+            **self.stats.to_dict(),
+        }
+
+
+class RoboflowClientPool:
+    """Process-wide set of clients, one per (api_url, api_key) upstream."""
+
+    def __init__(self, settings: Optional[ClientSettings] = None) -> None:
+        self.settings = settings or ClientSettings.from_env()
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str], RoboflowHTTPClient] = {}
+
+    def get(self, api_url: str, api_key: str) -> RoboflowHTTPClient:
+        key = (api_url.rstrip("/"), api_key)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = RoboflowHTTPClient(api_url, api_key, self.settings)
+                self._clients[key] = client
+            return client
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            clients = list(self._clients.values())
+        return {"upstreams": [client.to_dict() for client in clients]}
+
+
+_POOL: Optional[RoboflowClientPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_client_pool() -> RoboflowClientPool:
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = RoboflowClientPool()
+    return _POOL
@@ -0,0 +1,318 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import and_, case, delete, event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app.db_models.models import CarbonMetric, DailyBinCategoryRollup, WasteLog
+from app.services.sql_dialect import day_bucket
+
+# Estimated weight of one logged item per category; baked into weight_kg.
+CATEGORY_WEIGHTS_KG = {
+    "Organic": 3.5,
+    "Plastic": 2.1,
+    "Paper": 1.8,
+    "Metal": 1.4,
+    "Residue": 1.1,
+}
+
+RollupKey = Tuple[int, date, str]
+
+# Order of the delta vectors kept per rollup key
+DELTA_COLUMNS = ("log_count", "weight_kg", "co2_kg", "methane_kg", "confidence_sum")
+
+
+def rollups_enabled() -> bool:
+    return bool(current_app.config.get("ANALYTICS_USE_ROLLUP", False))
+
+
+def category_weight(category: Optional[str]) -> float:
+    return CATEGORY_WEIGHTS_KG.get(category, 1.0)
+
+
+def weight_expression(category_column):
+    """SQL CASE equivalent of category_weight()."""
+    return case(CATEGORY_WEIGHTS_KG, value=category_column, else_=1.0)
+
+
+def _rollup_key(bin_id: Any, timestamp: Any, category: Any) -> Optional[RollupKey]:
+    if bin_id is None or timestamp is None or category is None:
+        return None
+    day = timestamp.date() if isinstance(timestamp, datetime) else timestamp
+    return int(bin_id), day, str(category)
+
+
+def _previous(obj: Any, attr: str) -> Any:
+    history = inspect(obj).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(obj, attr)
+
+
+def _changed(obj: Any, attrs: Iterable[str]) -> bool:
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+class RollupDeltas:
+    """Accumulates signed changes per (bin, day, category) for one flush."""
+
+    def __init__(self) -> None:
+        self.values: Dict[RollupKey, List[float]] = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0.0])
+
+    def add_log(self, key: Optional[RollupKey], confidence: Any, sign: int = 1) -> None:
+        if key is None:
+            return
+        row = self.values[key]
+        row[0] += sign
+        row[1] += sign * category_weight(key[2])
+        row[4] += sign * float(confidence or 0)
+
+    def add_carbon(self, key: Optional[RollupKey], co2: Any, methane: Any, sign: int = 1) -> None:
+        if key is None:
+            return
+        row = self.values[key]
+        row[2] += sign * float(co2 or 0)
+        row[3] += sign * float(methane or 0)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for (bin_id, day, category), values in self.values.items():
+            if not any(values):
+                continue
+            row = {"bin_id": bin_id, "day": day, "category": category}
+            row.update(zip(DELTA_COLUMNS, values))
+            rows.append(row)
+        return rows
+
+
+def _collect_log_changes(session: Session, deltas: RollupDeltas) -> None:
+    for obj in session.new:
+        if isinstance(obj, WasteLog):
+            deltas.add_log(_rollup_key(obj.bin_id, obj.timestamp, obj.category), obj.confidence_score)
+
+    for obj in session.deleted:
+        if isinstance(obj, WasteLog):
+            key = _rollup_key(
+                _previous(obj, "bin_id"), _previous(obj, "timestamp"), _previous(obj, "category")
+            )
+            deltas.add_log(key, _previous(obj, "confidence_score"), sign=-1)
+
+    tracked = ("bin_id", "timestamp", "category", "confidence_score")
+    moved: Dict[int, Tuple[Optional[RollupKey], Optional[RollupKey]]] = {}
+    for obj in session.dirty:
+        if isinstance(obj, WasteLog) and _changed(obj, tracked):
+            old_key = _rollup_key(
+                _previous(obj, "bin_id"), _previous(obj, "timestamp"), _previous(obj, "category")
+            )
+            new_key = _rollup_key(obj.bin_id, obj.timestamp, obj.category)
+            deltas.add_log(old_key, _previous(obj, "confidence_score"), sign=-1)
+            deltas.add_log(new_key, obj.confidence_score)
+            if old_key != new_key:
+                moved[obj.id] = (old_key, new_key)
+
+    if moved:
+        _move_carbon(session, moved, deltas)
+
+
+def _move_carbon(
+    session: Session,
+    moved: Dict[int, Tuple[Optional[RollupKey], Optional[RollupKey]]],
+    deltas: RollupDeltas,
+) -> None:
+    """Carry a re-keyed log's carbon totals (as they were before this flush) to its new key."""
+    pending = {}
+    for obj in list(session.dirty) + list(session.deleted) + list(session.new):
+        if isinstance(obj, CarbonMetric) and _previous(obj, "log_id") in moved:
+            # New rows had no carbon before the flush; changed rows use their old values.
+            pending[_previous(obj, "log_id")] = (
+                (0.0, 0.0)
+                if obj in session.new
+                else (_previous(obj, "co2_reduction_value"), _previous(obj, "methane_reduction"))
+            )
+
+    remaining = [log_id for log_id in moved if log_id not in pending]
+    if remaining:
+        result = session.connection().execute(
+            select(
+                CarbonMetric.log_id, CarbonMetric.co2_reduction_value, CarbonMetric.methane_reduction
+            ).where(CarbonMetric.log_id.in_(remaining))
+        )
+        for log_id, co2, methane in result:
+            pending[log_id] = (co2, methane)
+
+    for log_id, (co2, methane) in pending.items():
+        old_key, new_key = moved[log_id]
+        deltas.add_carbon(old_key, co2, methane, sign=-1)
+        deltas.add_carbon(new_key, co2, methane)
+
+
+def _log_keys(session: Session, log_ids: Iterable[int]) -> Dict[int, Optional[RollupKey]]:
+    """Resolve rollup keys for logs, from the identity map first, then one query."""
+    keys: Dict[int, Optional[RollupKey]] = {}
+    missing = []
+    for log_id in set(log_ids):
+        log = session.identity_map.get(session.identity_key(WasteLog, log_id))
+        if log is not None:
+            keys[log_id] = _rollup_key(log.bin_id, log.timestamp, log.category)
+        else:
+            missing.append(log_id)
+
+    if missing:
+        result = session.connection().execute(
+            select(WasteLog.id, WasteLog.bin_id, WasteLog.timestamp, WasteLog.category).where(
+                WasteLog.id.in_(missing)
+            )
+        )
+        for log_id, bin_id, timestamp, category in result:
+            keys[log_id] = _rollup_key(bin_id, timestamp, category)
+    return keys
+
+
+def _collect_carbon_changes(session: Session, deltas: RollupDeltas) -> None:
+    # (log_id, co2, methane, sign)
+    changes: List[Tuple[Any, Any, Any, int]] = []
+    for obj in session.new:
+        if isinstance(obj, CarbonMetric):
+            changes.append((obj.log_id, obj.co2_reduction_value, obj.methane_reduction, 1))
+    for obj in session.deleted:
+        if isinstance(obj, CarbonMetric):
+            changes.append(
+                (
+                    _previous(obj, "log_id"),
+                    _previous(obj, "co2_reduction_value"),
+                    _previous(obj, "methane_reduction"),
+                    -1,
+                )
+            )
+    tracked = ("log_id", "co2_reduction_value", "methane_reduction")
+    for obj in session.dirty:
+        if isinstance(obj, CarbonMetric) and _changed(obj, tracked):
+            changes.append(
+                (
+                    _previous(obj, "log_id"),
+                    _previous(obj, "co2_reduction_value"),
+                    _previous(obj, "methane_reduction"),
+                    -1,
+                )
+            )
+            changes.append((obj.log_id, obj.co2_reduction_value, obj.methane_reduction, 1))
+
+    changes = [change for change in changes if change[0] is not None]
+    if not changes:
+        return
+    keys = _log_keys(session, (change[0] for change in changes))
+    for log_id, co2, methane, sign in changes:
+        deltas.add_carbon(keys.get(log_id), co2, methane, sign)
+
+
+def apply_deltas(connection, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    table = DailyBinCategoryRollup.__table__
+    dialect = connection.dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.bin_id, table.c.day, table.c.category],
+            set_={name: table.c[name] + stmt.excluded[name] for name in DELTA_COLUMNS},
+        )
+        connection.execute(stmt, rows)
+        return
+
+    # Generic fallback: update in place, insert the keys that did not exist yet.
+    for row in rows:
+        match = and_(
+            table.c.bin_id == row["bin_id"],
+            table.c.day == row["day"],
+            table.c.category == row["category"],
+        )
+        result = connection.execute(
+            update(table)
+            .where(match)
+            .values({name: table.c[name] + row[name] for name in DELTA_COLUMNS})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def apply_log_inserts(connection, rows: Iterable[Dict[str, Any]]) -> None:
+    """Roll up waste_logs rows written with Core inserts, which bypass the flush hook."""
+    deltas = RollupDeltas()
+    for row in rows:
+        deltas.add_log(_rollup_key(row["bin_id"], row["timestamp"], row["category"]), row["confidence_score"])
+    apply_deltas(connection, deltas.rows())
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    deltas = RollupDeltas()
+    with session.no_autoflush:
+        _collect_log_changes(session, deltas)
+        _collect_carbon_changes(session, deltas)
+    apply_deltas(session.connection(), deltas.rows())
+
+
+def register_rollup_events(session) -> None:
+    """Keep daily_bin_category_rollup in step with every flush of ``session``."""
+    if not event.contains(session, "after_flush", _after_flush):
+        event.listen(session, "after_flush", _after_flush)
+
+
+def rebuild_rollups(session: Session, start_day: Optional[date] = None, end_day: Optional[date] = None) -> int:
+    """Recompute rollup rows from waste_logs for [start_day, end_day] (all days if omitted).
+
+    Runs as one DELETE plus one INSERT ... SELECT, so it is safe to re-run.
+    Months already archived to Parquet are left untouched. Returns the
+    number of rollup rows written.
+    """
+    from app.services.archive import hot_start
+
+    first_hot_day = hot_start(session)
+    if first_hot_day is not None and (start_day is None or start_day < first_hot_day):
+        start_day = first_hot_day
+
+    table = DailyBinCategoryRollup.__table__
+    connection = session.connection()
+    day = day_bucket(WasteLog.timestamp, connection.dialect.name)
+    weight = weight_expression(WasteLog.category)
+
+    filters = [WasteLog.timestamp.isnot(None)]
+    clear = delete(table)
+    if start_day is not None:
+        filters.append(WasteLog.timestamp >= datetime.combine(start_day, time.min))
+        clear = clear.where(table.c.day >= start_day)
+    if end_day is not None:
+        filters.append(WasteLog.timestamp < datetime.combine(end_day + timedelta(days=1), time.min))
+        clear = clear.where(table.c.day <= end_day)
+
+    source = (
+        select(
+            WasteLog.bin_id,
+            day,
+            WasteLog.category,
+            func.count(WasteLog.id),
+            func.sum(weight),
+            func.coalesce(func.sum(CarbonMetric.co2_reduction_value), 0.0),
+            func.coalesce(func.sum(CarbonMetric.methane_reduction), 0.0),
+            func.coalesce(func.sum(WasteLog.confidence_score), 0.0),
+        )
+        .select_from(WasteLog.__table__.outerjoin(CarbonMetric.__table__, CarbonMetric.log_id == WasteLog.id))
+        .where(*filters)
+        .group_by(WasteLog.bin_id, day, WasteLog.category)
+    )
+
+    connection.execute(clear)
+    result = connection.execute(
+        table.insert().from_select(["bin_id", "day", "category", *DELTA_COLUMNS], source)
+    )
+    return result.rowcount if result.rowcount is not None else 0
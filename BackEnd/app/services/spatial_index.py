@@ -0,0 +1,560 @@
+from __future__ import annotations
+
+import heapq
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app.db_models.models import SmartBin
+from app.services.bin_activity import bin_status
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Server-side clusters are 1/CLUSTER_CELLS_PER_TILE of a web map tile wide (64 px at 256 px tiles).
+CLUSTER_CELLS_PER_TILE = 4
+# Besides the base grid, coarser grids 4x, 16x and 64x as wide keep the same sums for low zooms.
+GRID_LEVELS = 4
+GRID_LEVEL_FACTOR = 4
+# Ring search for nearest bins gives way to a scan of occupied cells past this many rings.
+MAX_RINGS = 32
+
+CellKey = Tuple[int, int]
+BBox = Tuple[float, float, float, float]
+
+_CHANGED = "spatial_index_changed"
+_ALL = "all"
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class BinPoint:
+    """What the map needs of one bin, with status and last-seen text worked out once."""
+
+    __slots__ = ("id", "name", "lat", "lon", "is_active", "fill_level", "status", "last_seen")
+
+    def __init__(
+        self,
+        bin_id: int,
+        name: Optional[str],
+        lat: float,
+        lon: float,
+        is_active: Optional[bool],
+        fill_level: Optional[int],
+        last_seen_at: Optional[datetime],
+    ) -> None:
+        self.id = bin_id
+        self.name = name
+        self.lat = lat
+        self.lon = lon
+        self.is_active = bool(is_active)
+        self.fill_level = fill_level or 0
+        self.status = bin_status(is_active, fill_level)
+        # Same format as /api/bins/
+        self.last_seen = last_seen_at.strftime("%Y-%m-%d %H:%M") if last_seen_at else None
+
+    def map_fields(self) -> Tuple[Any, ...]:
+        """What map tiles draw of this bin; name and last_seen are left to the detail endpoint."""
+        return (self.lat, self.lon, self.is_active, self.fill_level, self.status)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name or f"Smartbin {self.id}",
+            "location_name": self.name,
+            "latitude": self.lat,
+            "longitude": self.lon,
+            "is_active": self.is_active,
+            "fill_level": self.fill_level,
+            "status": self.status,
+            "last_seen": self.last_seen,
+        }
+
+
+class _Cell:
+    """Grid cell: its bins plus running sums so clustering never touches the bins."""
+
+    __slots__ = ("points", "sum_lat", "sum_lon", "statuses")
+
+    def __init__(self) -> None:
+        self.points: Dict[int, BinPoint] = {}
+        self.sum_lat = 0.0
+        self.sum_lon = 0.0
+        self.statuses: Dict[str, int] = {}
+
+    def add(self, point: BinPoint) -> None:
+        self.points[point.id] = point
+        self.sum_lat += point.lat
+        self.sum_lon += point.lon
+        self.statuses[point.status] = self.statuses.get(point.status, 0) + 1
+
+    def discard(self, point: BinPoint) -> None:
+        self.points.pop(point.id, None)
+        self.sum_lat -= point.lat
+        self.sum_lon -= point.lon
+        self.statuses[point.status] -= 1
+        if not self.statuses[point.status]:
+            del self.statuses[point.status]
+
+
+def load_bin_points(session: Session, ids: Optional[Iterable[int]] = None) -> List[BinPoint]:
+    table = SmartBin.__table__
+    stmt = select(
+        table.c.id,
+        table.c.location_name,
+        table.c.latitude,
+        table.c.longitude,
+        table.c.is_active,
+        table.c.fill_level,
+        table.c.last_seen_at,
+    )
+    if ids is not None:
+        stmt = stmt.where(table.c.id.in_(list(ids)))
+    return [BinPoint(*row) for row in session.execute(stmt) if row[2] is not None and row[3] is not None]
+
+
+class SpatialIndex:
+    """In-memory grid index of bin locations for the GIS API.
+
+    Bins are bucketed into square lon/lat cells of ``cell_degrees`` (0.01
+    degrees, about 1.1 km, by default). A bounding box visits only the
+    cells it overlaps and nearest-bin search walks rings of cells outwards
+    from the query point. Clustering at map zooms coarser than a cell
+    merges per-cell sums instead of individual bins, taken from the
+    coarsest of the ``GRID_LEVELS`` grids that still fits a cluster, so a
+    zoomed-out map reads a few hundred cells rather than every bin.
+
+    The index is loaded from smart_bins on first use. Committed changes
+    mark the touched bins stale (see ``register_spatial_index_events``) and
+    they are re-read, a handful of rows, on the next query. Writes made
+    by other worker processes are picked up by a full reload every
+    ``max_age`` seconds. Listeners (see ``add_listener``) are told which
+    bins moved or changed how they are drawn on the map.
+    """
+
+    def __init__(self, cell_degrees: float = 0.01, max_age: float = 60.0) -> None:
+        self.cell_degrees = float(cell_degrees)
+        self.max_age = float(max_age)
+        self._lock = threading.RLock()
+        # Serializes partial reloads so an older read is never applied over a newer one.
+        self._reload_lock = threading.Lock()
+        self._grids: List[Tuple[float, Dict[CellKey, _Cell]]] = self._build(())[0]
+        self._cells: Dict[CellKey, _Cell] = self._grids[0][1]
+        self._points: Dict[int, BinPoint] = {}
+        self._bounds: Optional[List[int]] = None
+        self._loaded_at: Optional[float] = None
+        self._stale: Set[int] = set()
+        self._stale_all = False
+        self._loading = False
+        # Bumped whenever the grids are swapped for a full load.
+        self._generation = 0
+        self._listeners: List[Callable[[List[BinPoint]], None]] = []
+        self._counters = {"full_loads": 0, "partial_loads": 0, "reloaded_bins": 0}
+        self._last_load_ms: Optional[float] = None
+
+    def _key(self, lon: float, lat: float, degrees: Optional[float] = None) -> CellKey:
+        degrees = degrees or self.cell_degrees
+        return math.floor(lon / degrees), math.floor(lat / degrees)
+
+    # --- maintenance -----------------------------------------------------
+
+    def add_listener(self, callback: Callable[[List[BinPoint]], None]) -> None:
+        """Call ``callback`` with the old and new versions of bins whose map_fields() changed."""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def _notify(self, changed: List[BinPoint]) -> None:
+        if changed:
+            for callback in self._listeners:
+                callback(changed)
+
+    def invalidate(self, ids: Optional[Iterable[int]] = None) -> None:
+        """Mark bins (all bins when ``ids`` is None) to be re-read on the next query."""
+        with self._lock:
+            if ids is None:
+                self._stale_all = True
+            else:
+                self._stale.update(ids)
+
+    def refresh(self, session: Session) -> None:
+        """Bring the index up to date before a query.
+
+        Stale bins are re-read outside the lock and applied in place. A
+        periodic full reload is built outside the lock too, while other
+        requests keep using the current grids; only the very first load
+        makes requests wait.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                self._stale = set()
+                self._stale_all = False
+                self._full_load(session)
+                return
+            due = self._stale_all or time.monotonic() - self._loaded_at > self.max_age
+            if not due:
+                # Left for after the swap while a reload is building: it may predate these changes.
+                if not self._stale or self._loading:
+                    return
+            elif self._loading:
+                return
+            else:
+                self._loading = True
+                self._stale = set()
+                self._stale_all = False
+        if not due:
+            self._reload_stale(session)
+            return
+        try:
+            self._full_load(session)
+        except Exception:
+            with self._lock:
+                self._stale_all = True
+            raise
+        finally:
+            self._loading = False
+
+    def _full_load(self, session: Session) -> None:
+        started = time.perf_counter()
+        grids, points, bounds = self._build(load_bin_points(session))
+        with self._lock:
+            previous = self._points
+            self._grids, self._cells = grids, grids[0][1]
+            self._points, self._bounds = points, bounds
+            self._generation += 1
+            if previous and self._listeners:
+                changed = [old for bin_id, old in previous.items() if bin_id not in points]
+                for bin_id, new in points.items():
+                    old = previous.get(bin_id)
+                    if old is None or old.map_fields() != new.map_fields():
+                        changed.append(new)
+                        if old is not None:
+                            changed.append(old)
+                self._notify(changed)
+            self._loaded_at = time.monotonic()
+            self._counters["full_loads"] += 1
+            self._last_load_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def _reload_stale(self, session: Session) -> None:
+        """Re-read the stale bins; the lock is held only to take the ids and apply the rows."""
+        with self._reload_lock:
+            with self._lock:
+                if self._loading:
+                    return
+                ids, self._stale = self._stale, set()
+                generation = self._generation
+            if not ids:
+                return
+            try:
+                fresh = {point.id: point for point in load_bin_points(session, ids)}
+            except Exception:
+                with self._lock:
+                    self._stale.update(ids)
+                raise
+            with self._lock:
+                # A full load swapped in meanwhile; it read these bins after they were marked.
+                if generation != self._generation:
+                    return
+                changed = []
+                for bin_id in ids:
+                    old, new = self._points.get(bin_id), fresh.get(bin_id)
+                    if old is None or new is None or old.map_fields() != new.map_fields():
+                        changed.extend(point for point in (old, new) if point is not None)
+                    self.remove(bin_id)
+                for point in fresh.values():
+                    self.upsert(point)
+                self._notify(changed)
+                self._counters["partial_loads"] += 1
+                self._counters["reloaded_bins"] += len(ids)
+
+    def _build(self, points: Iterable[BinPoint]):
+        grids = [(self.cell_degrees * GRID_LEVEL_FACTOR**level, {}) for level in range(GRID_LEVELS)]
+        by_id: Dict[int, BinPoint] = {}
+        for point in points:
+            by_id[point.id] = point
+            for degrees, cells in grids:
+                key = (math.floor(point.lon / degrees), math.floor(point.lat / degrees))
+                cell = cells.get(key)
+                if cell is None:
+                    cell = cells[key] = _Cell()
+                cell.add(point)
+        keys = list(grids[0][1])
+        bounds = None
+        if keys:
+            xs = [key[0] for key in keys]
+            ys = [key[1] for key in keys]
+            bounds = [min(xs), min(ys), max(xs), max(ys)]
+        return grids, by_id, bounds
+
+    def rebuild(self, points: Iterable[BinPoint]) -> None:
+        grids, by_id, bounds = self._build(points)
+        with self._lock:
+            self._grids, self._cells = grids, grids[0][1]
+            self._points, self._bounds = by_id, bounds
+            self._generation += 1
+            self._loaded_at = time.monotonic()
+            self._stale = set()
+            self._stale_all = False
+
+    def upsert(self, point: BinPoint) -> None:
+        with self._lock:
+            self.remove(point.id)
+            for degrees, cells in self._grids:
+                key = self._key(point.lon, point.lat, degrees)
+                cell = cells.get(key)
+                if cell is None:
+                    cell = cells[key] = _Cell()
+                cell.add(point)
+            self._points[point.id] = point
+            key = self._key(point.lon, point.lat)
+            # Occupied extent; only grows, which just makes the ring search stop a little later.
+            if self._bounds is None:
+                self._bounds = [key[0], key[1], key[0], key[1]]
+            else:
+                bounds = self._bounds
+                bounds[0], bounds[1] = min(bounds[0], key[0]), min(bounds[1], key[1])
+                bounds[2], bounds[3] = max(bounds[2], key[0]), max(bounds[3], key[1])
+
+    def remove(self, bin_id: int) -> None:
+        with self._lock:
+            point = self._points.pop(bin_id, None)
+            if point is None:
+                return
+            for degrees, cells in self._grids:
+                key = self._key(point.lon, point.lat, degrees)
+                cell = cells[key]
+                cell.discard(point)
+                if not cell.points:
+                    del cells[key]
+
+    # --- queries ---------------------------------------------------------
+
+    def _cells_in(self, bbox: BBox, level: int = 0) -> Iterator[Tuple[CellKey, _Cell]]:
+        degrees, cells = self._grids[level]
+        min_x, min_y = self._key(bbox[0], bbox[1], degrees)
+        max_x, max_y = self._key(bbox[2], bbox[3], degrees)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) > len(cells):
+            # Box wider than the occupied grid: filter occupied cells instead.
+            for key, cell in cells.items():
+                if min_x <= key[0] <= max_x and min_y <= key[1] <= max_y:
+                    yield key, cell
+            return
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                cell = cells.get((x, y))
+                if cell is not None:
+                    yield (x, y), cell
+
+    def within(self, bbox: BBox, limit: Optional[int] = None) -> Tuple[List[BinPoint], bool]:
+        """Bins inside ``bbox`` (min_lon, min_lat, max_lon, max_lat); True if cut at ``limit``."""
+        min_lon, min_lat, max_lon, max_lat = bbox
+        found: List[BinPoint] = []
+        with self._lock:
+            for _, cell in self._cells_in(bbox):
+                for point in cell.points.values():
+                    if min_lon <= point.lon <= max_lon and min_lat <= point.lat <= max_lat:
+                        if limit is not None and len(found) >= limit:
+                            return found, True
+                        found.append(point)
+        return found, False
+
+    def nearest(
+        self, lat: float, lon: float, k: int = 5, max_km: Optional[float] = None
+    ) -> List[Tuple[float, BinPoint]]:
+        """The ``k`` bins closest to (lat, lon) by great-circle distance, nearest first."""
+        best: List[Tuple[float, int, BinPoint]] = []  # max-heap on -distance
+
+        def consider(cell: _Cell) -> None:
+            for point in cell.points.values():
+                distance = haversine_km(lat, lon, point.lat, point.lon)
+                if max_km is not None and distance > max_km:
+                    continue
+                entry = (-distance, point.id, point)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, entry)
+
+        def done(bound_km: float) -> bool:
+            if max_km is not None and bound_km > max_km:
+                return True
+            return len(best) >= k and bound_km > -best[0][0]
+
+        with self._lock:
+            if not self._cells or k <= 0:
+                return []
+            cx, cy = self._key(lon, lat)
+            bounds = self._bounds
+            reach = max(cx - bounds[0], bounds[2] - cx, cy - bounds[1], bounds[3] - cy, 0)
+            visited: Set[CellKey] = set()
+            finished = False
+            for ring in range(min(reach, MAX_RINGS) + 1):
+                # Anything outside ring r - 1 is at least (r - 1) cells away; longitude cells
+                # narrow with latitude, so measure at the highest latitude the ring reaches.
+                widest_lat = min(abs(lat) + ring * self.cell_degrees, 89.0)
+                cell_km = self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(widest_lat))
+                if done(max(ring - 1, 0) * cell_km):
+                    finished = True
+                    break
+                for x in range(cx - ring, cx + ring + 1):
+                    for y in (cy - ring, cy + ring) if abs(x - cx) != ring else range(cy - ring, cy + ring + 1):
+                        cell = self._cells.get((x, y))
+                        if cell is not None:
+                            visited.add((x, y))
+                            consider(cell)
+            else:
+                finished = reach <= MAX_RINGS
+            if not finished:
+                # Sparse data far from the query point: visit the remaining occupied cells by
+                # a lower bound on their distance (centre distance minus half the diagonal).
+                half_diagonal = self.cell_degrees * KM_PER_DEGREE * math.sqrt(2) / 2
+                remaining = []
+                for key, cell in self._cells.items():
+                    if key in visited:
+                        continue
+                    centre_lon = (key[0] + 0.5) * self.cell_degrees
+                    centre_lat = (key[1] + 0.5) * self.cell_degrees
+                    remaining.append((haversine_km(lat, lon, centre_lat, centre_lon) - half_diagonal, key, cell))
+                remaining.sort(key=lambda item: item[0])
+                for bound_km, _, cell in remaining:
+                    if done(bound_km):
+                        break
+                    consider(cell)
+        return [(-distance, point) for distance, _, point in sorted(best, reverse=True)]
+
+    def clusters(self, bbox: BBox, zoom: int) -> List[Dict[str, Any]]:
+        """Group the bins in ``bbox`` for a map at ``zoom`` (web map tile zoom levels).
+
+        Groups are square cells 1/CLUSTER_CELLS_PER_TILE of a tile wide. When a
+        group is at least one index cell wide, whole cells of the coarsest grid
+        that fits are merged by their centroid (bins near the box edge may be
+        counted with their cell); at finer zooms the bins themselves are
+        grouped. A group of one bin carries the bin itself.
+        """
+        size = 360.0 / (2 ** max(zoom, 0)) / CLUSTER_CELLS_PER_TILE
+        groups: Dict[CellKey, List[Any]] = {}
+
+        def add(lon: float, lat: float, count: int, sum_lon: float, sum_lat: float, statuses, point):
+            key = (math.floor(lon / size), math.floor(lat / size))
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [count, sum_lon, sum_lat, dict(statuses), point]
+                return
+            group[0] += count
+            group[1] += sum_lon
+            group[2] += sum_lat
+            merged = group[3]
+            for status, status_count in statuses.items():
+                merged[status] = merged.get(status, 0) + status_count
+            group[4] = None
+
+        with self._lock:
+            if size >= self.cell_degrees:
+                level = max(i for i, (degrees, _) in enumerate(self._grids) if degrees <= size)
+                for _, cell in self._cells_in(bbox, level):
+                    count = len(cell.points)
+                    single = next(iter(cell.points.values())) if count == 1 else None
+                    add(cell.sum_lon / count, cell.sum_lat / count, count, cell.sum_lon, cell.sum_lat, cell.statuses, single)
+            else:
+                for point in self.within(bbox)[0]:
+                    add(point.lon, point.lat, 1, point.lon, point.lat, {point.status: 1}, point)
+
+        result = []
+        for count, sum_lon, sum_lat, statuses, point in groups.values():
+            item = {
+                "latitude": round(sum_lat / count, 6),
+                "longitude": round(sum_lon / count, 6),
+                "count": count,
+                "statuses": statuses,
+            }
+            if count == 1 and point is not None:
+                item["bin"] = point.to_dict()
+            result.append(item)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                "bins": len(self._points),
+                "cells": len(self._cells),
+                "grid_cells": [len(cells) for _, cells in self._grids],
+                "cell_degrees": self.cell_degrees,
+                "max_age_seconds": self.max_age,
+                "stale": len(self._stale) if not self._stale_all else "all",
+                "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+                "last_full_load_ms": self._last_load_ms,
+            }
+
+
+_INDEX: Optional[SpatialIndex] = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_spatial_index() -> SpatialIndex:
+    global _INDEX
+    if _INDEX is None:
+        with _INDEX_LOCK:
+            if _INDEX is None:
+                _INDEX = SpatialIndex(
+                    cell_degrees=float(os.getenv("SPATIAL_INDEX_CELL_DEGREES", "0.01")),
+                    max_age=float(os.getenv("SPATIAL_INDEX_MAX_AGE_SECONDS", "60")),
+                )
+    return _INDEX
+
+
+# --- change tracking ---------------------------------------------------------
+
+
+def mark_bins_changed(session: Session, ids: Optional[Iterable[int]] = None) -> None:
+    """Re-read these bins (all bins when ``ids`` is None) once ``session`` commits.
+
+    ORM changes to SmartBin are tracked automatically; Core UPDATEs of
+    smart_bins call this.
+    """
+    if ids is None:
+        session.info[_CHANGED] = _ALL
+        return
+    changed = session.info.setdefault(_CHANGED, set())
+    if changed is not _ALL:
+        changed.update(ids)
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    ids = [
+        obj.id
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, SmartBin) and obj.id is not None
+    ]
+    if ids:
+        mark_bins_changed(session, ids)
+
+
+def _after_commit(session: Session) -> None:
+    changed = session.info.pop(_CHANGED, None)
+    if changed:
+        get_spatial_index().invalidate(None if changed is _ALL else changed)
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_CHANGED, None)
+
+
+def register_spatial_index_events(session) -> None:
+    for name, listener in (
+        ("after_flush", _after_flush),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(session, name, listener):
+            event.listen(session, name, listener)
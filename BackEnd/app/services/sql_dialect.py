@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from sqlalchemy import Date, cast, func, type_coerce
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import ColumnElement
+
+# Date bucketing for the analytics queries. Production runs on PostgreSQL;
+# SQLite (local runs, benchmarks) has no DATE type or date_trunc, so the
+# same buckets are built from its date() function and returned as dates.
+
+
+def dialect_name(session: Session) -> str:
+    return session.get_bind().dialect.name
+
+
+def day_bucket(column, dialect: str) -> ColumnElement:
+    if dialect == "sqlite":
+        return type_coerce(func.date(column), Date)
+    return cast(column, Date)
+
+
+def greatest(left, right, dialect: str) -> ColumnElement:
+    # SQLite spells GREATEST as the two-argument scalar max().
+    if dialect == "sqlite":
+        return func.max(left, right)
+    return func.greatest(left, right)
@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import math
+import os
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, case, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.db_models.models import SmartBin, WasteLog
+from app.services.bin_activity import BinActivity, activity_values
+from app.services.response_cache import mark_dirty
+from app.services.rollups import apply_log_inserts
+from app.services.spatial_index import mark_bins_changed
+
+EVENT_TYPES = ("classification", "fill_level", "heartbeat")
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+MAX_CATEGORY_LENGTH = 50
+# Device clocks may run a little ahead of the server.
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+MAX_REPORTED_ERRORS = 50
+
+# Column order of the waste_logs rows built from classification events (and of the COPY input).
+LOG_COLUMNS = ("bin_id", "category", "confidence_score", "timestamp", "visual_conf", "audio_conf")
+
+
+class TelemetryError(ValueError):
+    """A telemetry payload or event that cannot be ingested."""
+
+
+class UnsupportedPayload(TelemetryError):
+    pass
+
+
+class PayloadTooLarge(TelemetryError):
+    pass
+
+
+@dataclass(frozen=True)
+class TelemetrySettings:
+    max_events: int = 10000
+    # Older events would land in months that may already be archived.
+    max_event_age: timedelta = timedelta(hours=72)
+    # Batches with at least this many logs use COPY on PostgreSQL (psycopg2).
+    copy_min_rows: int = 1000
+
+    @classmethod
+    def from_env(cls) -> "TelemetrySettings":
+        return cls(
+            max_events=max(int(os.getenv("TELEMETRY_MAX_EVENTS", "10000")), 1),
+            max_event_age=timedelta(hours=max(float(os.getenv("TELEMETRY_MAX_EVENT_AGE_HOURS", "72")), 0.0)),
+            copy_min_rows=max(int(os.getenv("TELEMETRY_COPY_MIN_ROWS", "1000")), 1),
+        )
+
+
+_SETTINGS: Optional[TelemetrySettings] = None
+
+
+def get_telemetry_settings() -> TelemetrySettings:
+    global _SETTINGS
+    if _SETTINGS is None:
+        _SETTINGS = TelemetrySettings.from_env()
+    return _SETTINGS
+
+
+# --- decoding ---------------------------------------------------------------
+
+
+def decode_payload(body: bytes, mimetype: str) -> Iterator[Any]:
+    """Yield the raw events of an NDJSON or msgpack body.
+
+    NDJSON lines that are not valid JSON are yielded as ``TelemetryError``
+    so they are reported per event instead of failing the whole batch. A
+    msgpack body is a stream of event maps, or arrays of them.
+    """
+    if mimetype in NDJSON_TYPES:
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield TelemetryError("invalid JSON")
+        return
+
+    if mimetype in MSGPACK_TYPES:
+        try:
+            import msgpack
+        except ImportError as exc:  # pragma: no cover - optional dependency
+            raise UnsupportedPayload("msgpack payloads need the msgpack package") from exc
+        unpacker = msgpack.Unpacker(raw=False, max_buffer_size=len(body) or 1)
+        unpacker.feed(body)
+        try:
+            for item in unpacker:
+                if isinstance(item, list):
+                    yield from item
+                else:
+                    yield item
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise TelemetryError(f"invalid msgpack: {exc or type(exc).__name__}") from exc
+        return
+
+    raise UnsupportedPayload(
+        f"Unsupported content type {mimetype or '(none)'}; send {NDJSON_TYPES[0]} or {MSGPACK_TYPES[0]}"
+    )
+
+
+# --- validation -------------------------------------------------------------
+
+
+def _number(event: Dict[str, Any], name: str, low: float, high: float, required: bool = True) -> Optional[float]:
+    value = event.get(name)
+    if value is None:
+        if required:
+            raise TelemetryError(f"{name} is required")
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise TelemetryError(f"{name} must be a number")
+    if not low <= value <= high:
+        raise TelemetryError(f"{name} must be between {low:g} and {high:g}")
+    return float(value)
+
+
+def _timestamp(value: Any, now: datetime, oldest: datetime) -> datetime:
+    # Naive UTC, like every other timestamp column.
+    if value is None:
+        return now
+    if isinstance(value, bool):
+        raise TelemetryError("ts must be epoch seconds or an ISO 8601 string")
+    if isinstance(value, (int, float)):
+        try:
+            ts = datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+        except (OverflowError, OSError, ValueError) as exc:
+            raise TelemetryError("ts is out of range") from exc
+    elif isinstance(value, str):
+        try:
+            ts = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+        except ValueError as exc:
+            raise TelemetryError("ts must be epoch seconds or an ISO 8601 string") from exc
+        if ts.tzinfo is not None:
+            ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    else:
+        raise TelemetryError("ts must be epoch seconds or an ISO 8601 string")
+    if ts > now + MAX_CLOCK_SKEW:
+        raise TelemetryError("ts is in the future")
+    if ts < oldest:
+        raise TelemetryError("ts is too old")
+    return ts
+
+
+class EventBatch:
+    """Validated events of one request, reduced to what gets written.
+
+    Classification events become ``waste_logs`` rows; every event bumps
+    its bin's last-seen time, and the newest ``fill_level`` reading per
+    bin is kept for the ``smart_bins`` update.
+    """
+
+    def __init__(self) -> None:
+        self.logs: List[Dict[str, Any]] = []
+        self.seen: Dict[int, datetime] = {}
+        self.fill: Dict[int, Tuple[datetime, int]] = {}
+        self.counts: Counter = Counter()
+        self.errors: List[Dict[str, Any]] = []
+        self.rejected = 0
+        self._log_bins: List[int] = []
+        self._event_indexes: Dict[int, List[int]] = defaultdict(list)
+        self._bin_counts: Dict[int, Counter] = defaultdict(Counter)
+
+    @property
+    def accepted(self) -> int:
+        return sum(self.counts.values())
+
+    def reject(self, index: int, message: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"index": index, "error": message})
+
+    def add(self, index: int, event: Any, now: datetime, oldest: datetime) -> None:
+        if isinstance(event, TelemetryError):
+            raise event
+        if not isinstance(event, dict):
+            raise TelemetryError("event must be an object")
+
+        kind = event.get("type")
+        if kind not in EVENT_TYPES:
+            raise TelemetryError(f"type must be one of {', '.join(EVENT_TYPES)}")
+        bin_id = event.get("bin_id")
+        if isinstance(bin_id, bool) or not isinstance(bin_id, int) or bin_id <= 0:
+            raise TelemetryError("bin_id must be a positive integer")
+        ts = _timestamp(event.get("ts"), now, oldest)
+
+        if kind == "classification":
+            category = event.get("category")
+            if not isinstance(category, str) or not category.strip():
+                raise TelemetryError("category is required")
+            category = category.strip()
+            if len(category) > MAX_CATEGORY_LENGTH:
+                raise TelemetryError(f"category is longer than {MAX_CATEGORY_LENGTH} characters")
+            self.logs.append(
+                {
+                    "bin_id": bin_id,
+                    "category": category,
+                    "confidence_score": _number(event, "confidence", 0.0, 1.0),
+                    "timestamp": ts,
+                    "visual_conf": _number(event, "visual_conf", 0.0, 1.0, required=False),
+                    "audio_conf": _number(event, "audio_conf", 0.0, 1.0, required=False),
+                }
+            )
+            self._log_bins.append(bin_id)
+        elif kind == "fill_level":
+            level = int(round(_number(event, "fill_level", 0, 100)))
+            current = self.fill.get(bin_id)
+            if current is None or ts >= current[0]:
+                self.fill[bin_id] = (ts, level)
+
+        if ts > self.seen.get(bin_id, datetime.min):
+            self.seen[bin_id] = ts
+        self.counts[kind] += 1
+        self._bin_counts[bin_id][kind] += 1
+        self._event_indexes[bin_id].append(index)
+
+    def drop_bins(self, unknown: Iterable[int]) -> None:
+        """Reject every event of bins that do not exist."""
+        unknown = set(unknown)
+        if not unknown:
+            return
+        dropped = sorted(index for bin_id in unknown for index in self._event_indexes.pop(bin_id, ()))
+        for index in dropped:
+            self.reject(index, "unknown bin_id")
+        for bin_id in unknown:
+            self.seen.pop(bin_id, None)
+            self.fill.pop(bin_id, None)
+            self.counts -= self._bin_counts.pop(bin_id, Counter())
+        kept = [(row, bin_id) for row, bin_id in zip(self.logs, self._log_bins) if bin_id not in unknown]
+        self.logs = [row for row, _ in kept]
+        self._log_bins = [bin_id for _, bin_id in kept]
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "logs": len(self.logs),
+            "bins": len(self.seen),
+            "counts": dict(self.counts),
+            "errors": self.errors,
+        }
+
+
+def parse_events(
+    events: Iterable[Any],
+    settings: Optional[TelemetrySettings] = None,
+    now: Optional[datetime] = None,
+) -> EventBatch:
+    settings = settings or get_telemetry_settings()
+    now = now or datetime.utcnow()
+    oldest = now - settings.max_event_age
+    batch = EventBatch()
+    for index, event in enumerate(events):
+        if index >= settings.max_events:
+            raise PayloadTooLarge(f"At most {settings.max_events} events per request")
+        try:
+            batch.add(index, event, now, oldest)
+        except TelemetryError as exc:
+            batch.reject(index, str(exc))
+    return batch
+
+
+# --- writing ----------------------------------------------------------------
+
+
+def _copy_logs(connection, rows: List[Dict[str, Any]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # None is written as an unquoted empty field, which COPY reads as NULL.
+    writer.writerows([row[name] for name in LOG_COLUMNS] for row in rows)
+    buffer.seek(0)
+    cursor = connection.connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {WasteLog.__tablename__} ({', '.join(LOG_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_logs(connection, rows: List[Dict[str, Any]], settings: TelemetrySettings) -> str:
+    dialect = connection.dialect
+    if dialect.name == "postgresql" and dialect.driver == "psycopg2" and len(rows) >= settings.copy_min_rows:
+        _copy_logs(connection, rows)
+        return "copy"
+    # executemany; SQLAlchemy batches it into multi-row INSERT ... VALUES.
+    connection.execute(insert(WasteLog.__table__), rows)
+    return "insert"
+
+
+def _update_bins(connection, batch: EventBatch) -> None:
+    """One UPDATE for every bin in the batch: activity columns and newest fill level."""
+    table = SmartBin.__table__
+    activity = BinActivity()
+    for row in batch.logs:
+        activity.add_log(row["bin_id"], row["timestamp"])
+    values = activity_values(batch.seen, activity.today_counts, activity.today, connection.dialect.name)
+    if batch.fill:
+        reading_at = case({bin_id: ts for bin_id, (ts, _) in batch.fill.items()}, value=table.c.id)
+        level = case({bin_id: value for bin_id, (_, value) in batch.fill.items()}, value=table.c.id)
+        # A late reading never overwrites one from an event seen after it.
+        fresh = and_(
+            table.c.id.in_(list(batch.fill)),
+            or_(table.c.last_seen_at.is_(None), table.c.last_seen_at <= reading_at),
+        )
+        values["fill_level"] = case((fresh, level), else_=table.c.fill_level)
+    connection.execute(update(table).where(table.c.id.in_(list(batch.seen))).values(values))
+
+
+def write_batch(session: Session, batch: EventBatch, settings: Optional[TelemetrySettings] = None) -> Dict[str, Any]:
+    """Write ``batch`` in the session's transaction; the caller commits.
+
+    Unknown bins are rejected with one lookup. Logs go in as one bulk
+    insert (COPY for large batches on PostgreSQL) with their rollup deltas,
+    and ``smart_bins`` gets a single UPDATE.
+    """
+    settings = settings or get_telemetry_settings()
+    connection = session.connection()
+    method = None
+    if batch.seen:
+        known = set(connection.execute(select(SmartBin.id).where(SmartBin.id.in_(list(batch.seen)))).scalars())
+        batch.drop_bins(set(batch.seen) - known)
+    if batch.logs:
+        method = _insert_logs(connection, batch.logs, settings)
+        apply_log_inserts(connection, batch.logs)
+    if batch.seen:
+        _update_bins(connection, batch)
+        mark_dirty(session)
+        mark_bins_changed(session, batch.seen)
+    return {**batch.summary(), "write": method}
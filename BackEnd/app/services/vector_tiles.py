@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.services.spatial_index import (
+    CLUSTER_CELLS_PER_TILE,
+    BinPoint,
+    SpatialIndex,
+    get_spatial_index,
+)
+
+# Mapbox Vector Tile 2.1 (https://github.com/mapbox/vector-tile-spec), encoded by hand: the
+# format is a handful of protobuf messages and point layers need nothing else.
+MVT_MIMETYPE = "application/vnd.mapbox-vector-tile"
+EXTENT = 4096
+# Bins this close to a tile edge (in tile units) are drawn in the neighbouring tile too,
+# so symbols are not clipped at tile seams.
+BUFFER = 64
+MAX_ZOOM = 22
+MAX_LATITUDE = 85.0511287798
+STATUSES = ("active", "maintenance", "full", "offline")
+# Past this many changed bins in one refresh the whole tile cache is dropped.
+MAX_TRACKED_CHANGES = 1000
+
+TileKey = Tuple[int, int, int]
+
+# protobuf wire types
+_VARINT = 0
+_BYTES = 2
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _field(number: int, wire_type: int) -> bytes:
+    return _varint((number << 3) | wire_type)
+
+
+def _message(number: int, payload: bytes) -> bytes:
+    return _field(number, _BYTES) + _varint(len(payload)) + payload
+
+
+def _packed(number: int, values: Iterable[int]) -> bytes:
+    return _message(number, b"".join(_varint(value) for value in values))
+
+
+def _value(value: Any) -> bytes:
+    """One Tile.Value message."""
+    if isinstance(value, bool):
+        return _field(7, _VARINT) + _varint(int(value))
+    if isinstance(value, int):
+        if value >= 0:
+            return _field(5, _VARINT) + _varint(value)
+        return _field(6, _VARINT) + _varint(_zigzag(value))
+    if isinstance(value, float):
+        return _field(3, 1) + struct.pack("<d", value)
+    return _message(1, str(value).encode("utf-8"))
+
+
+class _Layer:
+    """Collects point features for one MVT layer, deduplicating keys and values."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.features: List[bytes] = []
+        self._keys: Dict[str, int] = {}
+        self._values: Dict[Tuple[type, Any], int] = {}
+
+    def _index(self, table: Dict, item) -> int:
+        index = table.get(item)
+        if index is None:
+            index = table[item] = len(table)
+        return index
+
+    def add_point(self, x: int, y: int, properties: Dict[str, Any], feature_id: Optional[int] = None) -> None:
+        tags: List[int] = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            tags.append(self._index(self._keys, key))
+            # Keyed by type too, so True and 1 stay distinct values.
+            tags.append(self._index(self._values, (type(value), value)))
+        feature = b""
+        if feature_id is not None:
+            feature += _field(1, _VARINT) + _varint(feature_id)
+        feature += _packed(2, tags)
+        feature += _field(3, _VARINT) + _varint(1)  # GeomType.POINT
+        # MoveTo(count=1) then the zigzag-encoded position.
+        feature += _packed(4, (9, _zigzag(x), _zigzag(y)))
+        self.features.append(feature)
+
+    def encode(self) -> bytes:
+        body = _field(15, _VARINT) + _varint(2)
+        body += _message(1, self.name.encode("utf-8"))
+        body += b"".join(_message(2, feature) for feature in self.features)
+        body += b"".join(_message(3, key.encode("utf-8")) for key in self._keys)
+        body += b"".join(_message(4, _value(value)) for _, value in self._values)
+        body += _field(5, _VARINT) + _varint(EXTENT)
+        return _message(3, body)
+
+
+# --- tile geometry -----------------------------------------------------------
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of a web mercator (XYZ) tile, in degrees."""
+    n = 2**z
+
+    def lat(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def _world_xy(lon: float, lat: float, z: int) -> Tuple[float, float]:
+    """Position in tiles at zoom ``z`` (tile (x, y) covers [x, x + 1) x [y, y + 1))."""
+    n = 2**z
+    lat = max(min(lat, MAX_LATITUDE), -MAX_LATITUDE)
+    phi = math.radians(lat)
+    return (lon + 180.0) / 360.0 * n, (1 - math.log(math.tan(phi) + 1 / math.cos(phi)) / math.pi) / 2 * n
+
+
+def tiles_around(lon: float, lat: float, z: int) -> Iterable[TileKey]:
+    """Tiles at ``z`` whose content can depend on a bin at (lon, lat).
+
+    A cluster's centroid lies within two cluster widths of any bin in it,
+    which also covers the bins layer's edge buffer.
+    """
+    n = 2**z
+    reach = 2 * 360.0 / n / CLUSTER_CELLS_PER_TILE
+    west, north = _world_xy(lon - reach, lat + reach, z)
+    east, south = _world_xy(lon + reach, lat - reach, z)
+    for x in range(math.floor(west), math.floor(east) + 1):
+        for y in range(max(math.floor(north), 0), min(math.floor(south), n - 1) + 1):
+            yield z, x % n, y
+
+
+def _tile_position(lon: float, lat: float, z: int, x: int, y: int) -> Tuple[int, int]:
+    wx, wy = _world_xy(lon, lat, z)
+    return int(round((wx - x) * EXTENT)), int(round((wy - y) * EXTENT))
+
+
+def _bin_properties(point: BinPoint) -> Dict[str, Any]:
+    # Name and last_seen are left to /api/bins/<id> (the popup); the tile is what gets drawn.
+    return {
+        "status": point.status,
+        "fill_level": point.fill_level,
+        "is_active": point.is_active,
+    }
+
+
+def render_tile(index: SpatialIndex, z: int, x: int, y: int, point_zoom: int) -> bytes:
+    """Encode tile z/x/y: a ``bins`` layer from ``point_zoom`` in, a ``clusters`` layer below it.
+
+    Cluster groups are the ones ``SpatialIndex.clusters`` makes for this
+    zoom (a quarter of a tile wide); each is drawn once, in the tile that
+    holds its centroid, with its complete count since the query reaches
+    one group beyond the tile on every side.
+    """
+    west, south, east, north = tile_bounds(z, x, y)
+    if z >= point_zoom:
+        layer = _Layer("bins")
+        pad_lon = (east - west) * BUFFER / EXTENT
+        pad_lat = (north - south) * BUFFER / EXTENT
+        points, _ = index.within((west - pad_lon, south - pad_lat, east + pad_lon, north + pad_lat))
+        for point in sorted(points, key=lambda item: item.id):
+            px, py = _tile_position(point.lon, point.lat, z, x, y)
+            layer.add_point(px, py, _bin_properties(point), feature_id=point.id)
+        return layer.encode() if layer.features else b""
+
+    layer = _Layer("clusters")
+    size = (east - west) / CLUSTER_CELLS_PER_TILE
+    bbox = (west - size, max(south - size, -90.0), east + size, min(north + size, 90.0))
+    for cluster in index.clusters(bbox, z):
+        lon, lat = cluster["longitude"], cluster["latitude"]
+        if not (west <= lon < east and south < lat <= north):
+            continue
+        properties: Dict[str, Any] = {"count": cluster["count"]}
+        for status in STATUSES:
+            properties[status] = cluster["statuses"].get(status, 0)
+        single = cluster.get("bin")
+        if single:
+            properties.update(id=single["id"], fill_level=single["fill_level"])
+        px, py = _tile_position(lon, lat, z, x, y)
+        layer.add_point(px, py, properties)
+    return layer.encode() if layer.features else b""
+
+
+# --- per-tile cache ----------------------------------------------------------
+
+
+@dataclass
+class _Tile:
+    body: bytes
+    etag: str
+
+
+class VectorTileCache:
+    """LRU cache of encoded tiles, dropped per tile as bins change.
+
+    Registered as a spatial index listener: when a bin moves or changes
+    status, fill level or activity, the tiles around its old and
+    new positions are dropped at every zoom (``tiles_around``: a bin can
+    shift a neighbouring tile's cluster centroid or sit in its buffer).
+    Last-seen updates alone keep tiles cached.
+    """
+
+    def __init__(self, max_entries: int = 4096, point_zoom: int = 14) -> None:
+        self.max_entries = max(int(max_entries), 1)
+        self.point_zoom = int(point_zoom)
+        self._lock = threading.Lock()
+        self._tiles: "OrderedDict[TileKey, _Tile]" = OrderedDict()
+        self.generation = 0
+        self._counters = {"hits": 0, "misses": 0, "not_modified": 0, "invalidated_tiles": 0, "evictions": 0}
+
+    def get(self, key: TileKey) -> Optional[_Tile]:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is None:
+                self._counters["misses"] += 1
+                return None
+            self._tiles.move_to_end(key)
+            self._counters["hits"] += 1
+            return tile
+
+    def set(self, key: TileKey, body: bytes, generation: int) -> _Tile:
+        tile = _Tile(body=body, etag=hashlib.blake2b(body, digest_size=16).hexdigest())
+        with self._lock:
+            # Bins changed while this tile was being rendered; it may be stale.
+            if generation != self.generation:
+                return tile
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_entries:
+                self._tiles.popitem(last=False)
+                self._counters["evictions"] += 1
+        return tile
+
+    def tile(self, index: SpatialIndex, z: int, x: int, y: int) -> _Tile:
+        key = (z, x, y)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+        generation = self.generation
+        return self.set(key, render_tile(index, z, x, y, self.point_zoom), generation)
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self._counters["not_modified"] += 1
+
+    def bins_changed(self, points: List[BinPoint]) -> None:
+        with self._lock:
+            self.generation += 1
+            if not self._tiles:
+                return
+            if len(points) > MAX_TRACKED_CHANGES:
+                self._counters["invalidated_tiles"] += len(self._tiles)
+                self._tiles.clear()
+                return
+            for point in points:
+                for z in range(MAX_ZOOM + 1):
+                    for key in tiles_around(point.lon, point.lat, z):
+                        if self._tiles.pop(key, None) is not None:
+                            self._counters["invalidated_tiles"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "tiles": len(self._tiles),
+                "bytes": sum(len(tile.body) for tile in self._tiles.values()),
+                "max_entries": self.max_entries,
+                "point_zoom": self.point_zoom,
+                "generation": self.generation,
+            }
+
+
+_CACHE: Optional[VectorTileCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_tile_cache() -> VectorTileCache:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                cache = VectorTileCache(
+                    max_entries=int(os.getenv("VECTOR_TILE_CACHE_MAX_ENTRIES", "4096")),
+                    point_zoom=int(os.getenv("VECTOR_TILE_POINT_ZOOM", "14")),
+                )
+                get_spatial_index().add_listener(cache.bins_changed)
+                _CACHE = cache
+    return _CACHE
@@ -2,65 +2,143 @@ from __future__ import annotations
 
 import base64
 import os
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
 import supervision as sv
-from inference_sdk import InferenceHTTPClient
-
-
-class VisualService:
-    def __init__(
-        self,
-        api_url: Optional[str] = None,
-        api_key: Optional[str] = None,
-        model_id: Optional[str] = None,
-    ) -> None:
-        self.api_url = api_url or os.getenv("ROBOFLOW_API_URL", "https://serverless.roboflow.com")
-        self.api_key = api_key or os.getenv("ROBOFLOW_API_KEY", "")
 
+from app.services.batching import MicroBatcher
+from app.services.detection_backends import (
+    DetectionBackend,
+    LocalBackend,
+    RoboflowBackend,
+    normalize_predictions,
+    resolve_backend_name,
+)
+from app.services.local_detector import DEFAULT_VISION_MODEL_DIR, LocalDetector
+from app.services.result_cache import BytesLike, get_result_cache
+from app.services.roboflow_client import get_client_pool
+
+
+@dataclass(frozen=True)
+class VisualSettings:
+    api_url: str
+    api_key: str
+    model_id: str
+    workflow_id: str
+    workflow_workspace: str
+    workflow_api_url: str
+    workflow_image_input: str
+    workflow_predictions_key: str
+    workflow_output_image_key: str
+    backend: str
+    local_model_dir: Path
+    conf_threshold: float
+    iou_threshold: float
+    batch_window_ms: float
+    batch_max_size: int
+
+    @classmethod
+    def from_env(cls) -> "VisualSettings":
         workspace = os.getenv("ROBOFLOW_WORKSPACE", "").strip()
         project = os.getenv("ROBOFLOW_PROJECT", "").strip()
         version = os.getenv("ROBOFLOW_VERSION", "").strip()
-        workflow_workspace = os.getenv("ROBOFLOW_WORKFLOW_WORKSPACE", "").strip() or workspace
-        self.workflow_id = os.getenv("ROBOFLOW_WORKFLOW_ID", "").strip()
-        self.workflow_workspace = workflow_workspace
-        self.workflow_api_url = os.getenv("ROBOFLOW_WORKFLOW_API_URL", "https://detect.roboflow.com").strip()
-        self.workflow_image_input = os.getenv("ROBOFLOW_WORKFLOW_IMAGE_INPUT", "image").strip() or "image"
-        self.workflow_predictions_key = os.getenv("ROBOFLOW_WORKFLOW_PREDICTIONS_KEY", "predictions").strip()
-        self.workflow_output_image_key = os.getenv("ROBOFLOW_WORKFLOW_OUTPUT_IMAGE_KEY", "output_image").strip()
-
-        if not model_id:
-            model_id = os.getenv("ROBOFLOW_MODEL_ID", "").strip()
 
+        model_id = os.getenv("ROBOFLOW_MODEL_ID", "").strip()
         if not model_id:
             if workspace and project and version:
                 model_id = f"{workspace}/{project}/{version}"
             elif project and version:
                 model_id = f"{project}/{version}"
 
-        self.model_id = model_id or "garbage-2mxmf"
+        return cls(
+            api_url=os.getenv("ROBOFLOW_API_URL", "https://serverless.roboflow.com"),
+            api_key=os.getenv("ROBOFLOW_API_KEY", ""),
+            model_id=model_id,
+            workflow_id=os.getenv("ROBOFLOW_WORKFLOW_ID", "").strip(),
+            workflow_workspace=os.getenv("ROBOFLOW_WORKFLOW_WORKSPACE", "").strip() or workspace,
+            workflow_api_url=os.getenv("ROBOFLOW_WORKFLOW_API_URL", "https://detect.roboflow.com").strip(),
+            workflow_image_input=os.getenv("ROBOFLOW_WORKFLOW_IMAGE_INPUT", "image").strip() or "image",
+            workflow_predictions_key=os.getenv("ROBOFLOW_WORKFLOW_PREDICTIONS_KEY", "predictions").strip(),
+            workflow_output_image_key=os.getenv("ROBOFLOW_WORKFLOW_OUTPUT_IMAGE_KEY", "output_image").strip(),
+            backend=os.getenv("VISUAL_BACKEND", "roboflow").strip().lower() or "roboflow",
+            local_model_dir=Path(os.getenv("VISION_MODEL_DIR", "").strip() or DEFAULT_VISION_MODEL_DIR),
+            conf_threshold=float(os.getenv("VISUAL_CONF_THRESHOLD", "0.4")),
+            iou_threshold=float(os.getenv("VISUAL_IOU_THRESHOLD", "0.5")),
+            batch_window_ms=float(os.getenv("VISUAL_BATCH_WINDOW_MS", "0")),
+            batch_max_size=max(int(os.getenv("VISUAL_BATCH_MAX_SIZE", "8")), 1),
+        )
+
+
+@lru_cache(maxsize=1)
+def get_visual_settings() -> VisualSettings:
+    return VisualSettings.from_env()
 
-        if not self.api_key:
+
+class VisualService:
+    def __init__(
+        self,
+        api_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        model_id: Optional[str] = None,
+    ) -> None:
+        settings = get_visual_settings()
+        self.api_url = api_url or settings.api_url
+        self.api_key = api_key or settings.api_key
+
+        self.workflow_id = settings.workflow_id
+        self.workflow_workspace = settings.workflow_workspace
+        self.workflow_api_url = settings.workflow_api_url
+        self.workflow_image_input = settings.workflow_image_input
+        self.workflow_predictions_key = settings.workflow_predictions_key
+        self.workflow_output_image_key = settings.workflow_output_image_key
+
+        self.model_id = model_id or settings.model_id or "garbage-2mxmf"
+        self.backend_name = resolve_backend_name(settings.backend, settings.local_model_dir)
+
+        if not self.api_key and (self.backend_name == "roboflow" or self.workflow_id):
             raise ValueError(
                 "ROBOFLOW_API_KEY is not set. Add it to .env or set the environment variable. "
                 "Get your key at https://app.roboflow.com/"
             )
 
-        self.client = InferenceHTTPClient(
-            api_url=self.api_url,
-            api_key=self.api_key,
-        )
+        # Clients come from a shared pool so keep-alive connections survive
+        # across requests, websocket sessions and worker threads.
+        pool = get_client_pool()
+        self.client = None
         self.workflow_client = None
+        if self.backend_name == "local":
+            self.backend: DetectionBackend = LocalBackend(
+                LocalDetector(
+                    base_dir=settings.local_model_dir,
+                    conf_threshold=settings.conf_threshold,
+                    iou_threshold=settings.iou_threshold,
+                )
+            )
+        else:
+            self.client = pool.get(self.api_url, self.api_key)
+            self.backend = RoboflowBackend(self.client, self.model_id)
         if self.workflow_id:
-            self.workflow_client = InferenceHTTPClient(
-                api_url=self.workflow_api_url,
-                api_key=self.api_key,
+            self.workflow_client = pool.get(self.workflow_api_url, self.api_key)
+
+        # Concurrent requests arriving within the window share one batched
+        # backend call; a window of 0 keeps one call per image.
+        self.batcher: Optional[MicroBatcher] = None
+        if settings.batch_window_ms > 0:
+            self.batcher = MicroBatcher(
+                self.backend.detect_batch,
+                max_batch_size=settings.batch_max_size,
+                max_wait_ms=settings.batch_window_ms,
+                name=f"visual-{self.backend_name}",
             )
 
     @staticmethod
-    def _decode_base64_image(b64_string: str) -> np.ndarray:
+    def _decode_base64_bytes(b64_string: str) -> bytes:
         if not b64_string:
             raise ValueError("Empty base64 image string")
 
@@ -69,17 +147,20 @@ class VisualService:
             b64_string = b64_string.split(",", 1)[1]
 
         try:
-            image_bytes = base64.b64decode(b64_string, validate=True)
+            return base64.b64decode(b64_string, validate=True)
         except Exception as exc:
             raise ValueError("Invalid base64 image string") from exc
 
-        return VisualService._decode_image_bytes(image_bytes)
+    @staticmethod
+    def _decode_base64_image(b64_string: str) -> np.ndarray:
+        return VisualService._decode_image_bytes(VisualService._decode_base64_bytes(b64_string))
 
     @staticmethod
-    def _decode_image_bytes(image_bytes: bytes) -> np.ndarray:
+    def _decode_image_bytes(image_bytes: BytesLike) -> np.ndarray:
         if not image_bytes:
             raise ValueError("Empty image bytes")
 
+        # frombuffer wraps the upload without copying it.
         data = np.frombuffer(image_bytes, dtype=np.uint8)
         image_bgr = cv2.imdecode(data, cv2.IMREAD_COLOR)
         if image_bgr is None:
@@ -88,93 +169,106 @@ class VisualService:
         image_rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
         return image_rgb
 
-    def detect_from_base64(self, b64_string: str) -> Dict[str, Any]:
+    @property
+    def cache_model_id(self) -> str:
         if self.workflow_id:
-            clean_b64 = self._strip_base64_header(b64_string)
-            return self._infer_workflow(clean_b64)
-        image = self._decode_base64_image(b64_string)
-        detections = self._infer_model(image)
-        annotated_image = self._annotate_image(image, detections)
-        return {"detections": detections, "annotated_image": annotated_image}
+            return f"workflow:{self.workflow_workspace}/{self.workflow_id}"
+        return self.backend.model_id
 
-    def detect_from_file_bytes(self, image_bytes: bytes) -> Dict[str, Any]:
-        if self.workflow_id:
-            b64_string = base64.b64encode(image_bytes).decode("ascii")
-            return self._infer_workflow(b64_string)
-        image = self._decode_image_bytes(image_bytes)
-        detections = self._infer_model(image)
-        annotated_image = self._annotate_image(image, detections)
-        return {"detections": detections, "annotated_image": annotated_image}
+    def detect_from_base64(self, b64_string: str, annotate: bool = True) -> Dict[str, Any]:
+        b64_string = self._strip_base64_header(b64_string)
+        image_bytes = self._decode_base64_bytes(b64_string)
+        return self._detect_cached(image_bytes, b64_string, annotate=annotate)
+
+    def detect_from_file_bytes(self, image_bytes: BytesLike, annotate: bool = True) -> Dict[str, Any]:
+        """Detect on an encoded image (raw upload body, binary frame, file).
+
+        With ``annotate=False`` no annotated image is drawn (or returned),
+        which also spares the decode when the hosted model is used.
+        """
+        return self._detect_cached(image_bytes, annotate=annotate)
 
     def detect_from_path(self, image_path: str) -> Dict[str, Any]:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image not found: {image_path}")
-        if self.workflow_id:
-            with open(image_path, "rb") as handle:
-                b64_string = base64.b64encode(handle.read()).decode("ascii")
-            return self._infer_workflow(b64_string)
         with open(image_path, "rb") as handle:
             image_bytes = handle.read()
         return self.detect_from_file_bytes(image_bytes)
 
+    def _detect_cached(
+        self, image_bytes: BytesLike, b64_string: Optional[str] = None, annotate: bool = True
+    ) -> Dict[str, Any]:
+        # Idle cameras and retried uploads resend identical frames; reuse the
+        # previous result for the same bytes and model. Results without the
+        # annotated image live in their own namespace.
+        cache = get_result_cache()
+        namespace = "visual" if annotate else "visual-boxes"
+        model_id = self.cache_model_id
+        digest = cache.digest(image_bytes)
+        cached = cache.get(namespace, model_id, digest)
+        if cached is not None:
+            return cached
+
+        result = self._detect_bytes(image_bytes, b64_string, annotate=annotate)
+        cache.set(namespace, model_id, digest, result)
+        return result
+
+    def _detect_bytes(
+        self, image_bytes: BytesLike, b64_string: Optional[str] = None, annotate: bool = True
+    ) -> Dict[str, Any]:
+        if self.workflow_id:
+            # Base64 uploads go upstream as received; binary ones are encoded
+            # once, directly into the request body.
+            result = self._infer_workflow(b64_string if b64_string is not None else image_bytes)
+            if not annotate:
+                result["annotated_image"] = None
+            return result
+        if self.backend.accepts_encoded:
+            # The hosted model gets the upload itself rather than a decoded
+            # and re-encoded copy; decoding is only needed to draw the boxes.
+            detections = self._infer_model(image_bytes)
+            if not detections or not annotate:
+                return {"detections": detections, "annotated_image": None}
+            image = self._decode_image_bytes(image_bytes)
+        else:
+            image = self._decode_image_bytes(image_bytes)
+            detections = self._infer_model(image)
+            if not annotate:
+                return {"detections": detections, "annotated_image": None}
+        annotated_image = self._annotate_image(image, detections)
+        return {"detections": detections, "annotated_image": annotated_image}
+
     @staticmethod
     def _strip_base64_header(b64_string: str) -> str:
         if "," in b64_string:
             return b64_string.split(",", 1)[1]
         return b64_string
 
-    def _infer_model(self, image_input: Any) -> List[Dict[str, Any]]:
+    def _infer_model(self, image: Union[np.ndarray, BytesLike]) -> List[Dict[str, Any]]:
         try:
-            result = self.client.infer(image_input, model_id=self.model_id)
+            if self.batcher is not None:
+                return self.batcher.run(image)
+            return self.backend.detect(image)
         except Exception as exc:
             raise RuntimeError(f"Inference failed: {exc}") from exc
 
-        predictions = result.get("predictions", [])
-        detections: List[Dict[str, Any]] = []
-
-        for pred in predictions:
-            label = pred.get("class") or pred.get("label") or "unknown"
-            confidence = float(pred.get("confidence", 0.0))
-
-            # Common Roboflow bbox format: center x/y with width/height
-            bbox = {
-                "x": float(pred.get("x", 0.0)),
-                "y": float(pred.get("y", 0.0)),
-                "width": float(pred.get("width", 0.0)),
-                "height": float(pred.get("height", 0.0)),
-            }
-
-            detections.append(
-                {
-                    "label": label,
-                    "confidence": confidence,
-                    "bbox": bbox,
-                }
-            )
-
-        return detections
+    def batch_stats(self) -> Dict[str, Any]:
+        if self.batcher is None:
+            return {"enabled": False, "backend": self.backend_name}
+        return {"enabled": True, "backend": self.backend_name, **self.batcher.stats()}
 
-    def _infer_workflow(self, b64_string: str) -> Dict[str, Any]:
+    def _infer_workflow(self, image: Union[str, BytesLike]) -> Dict[str, Any]:
         if not self.workflow_workspace:
             raise ValueError("ROBOFLOW_WORKFLOW_WORKSPACE is not set.")
         if not self.workflow_client:
             raise RuntimeError("Workflow client is not initialized.")
 
         try:
-            if hasattr(self.workflow_client, "run_workflow"):
-                result = self.workflow_client.run_workflow(
-                    workspace_name=self.workflow_workspace,
-                    workflow_id=self.workflow_id,
-                    images={self.workflow_image_input: b64_string},
-                )
-            elif hasattr(self.workflow_client, "infer_from_workflow"):
-                result = self.workflow_client.infer_from_workflow(
-                    workspace_name=self.workflow_workspace,
-                    workflow_name=self.workflow_id,
-                    images={self.workflow_image_input: b64_string},
-                )
-            else:
-                raise RuntimeError("Inference SDK does not support workflow execution.")
+            result = self.workflow_client.run_workflow(
+                workspace_name=self.workflow_workspace,
+                workflow_id=self.workflow_id,
+                images={self.workflow_image_input: image},
+            )
         except Exception as exc:
             raise RuntimeError(f"Workflow inference failed: {exc}") from exc
 
@@ -306,23 +400,17 @@ class VisualService:
 
     @staticmethod
     def _normalize_predictions(preds: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        normalized = []
-        for pred in preds:
-            if not isinstance(pred, dict):
-                continue
-            label = pred.get("class") or pred.get("label") or "unknown"
-            confidence = float(pred.get("confidence", 0.0))
-            bbox = {
-                "x": float(pred.get("x", 0.0)),
-                "y": float(pred.get("y", 0.0)),
-                "width": float(pred.get("width", 0.0)),
-                "height": float(pred.get("height", 0.0)),
-            }
-            normalized.append(
-                {
-                    "label": label,
-                    "confidence": confidence,
-                    "bbox": bbox,
-                }
-            )
-        return normalized
+        return normalize_predictions(preds)
+
+
+_VISUAL_SERVICE: Optional[VisualService] = None
+_VISUAL_SERVICE_LOCK = threading.Lock()
+
+
+def get_visual_service() -> VisualService:
+    global _VISUAL_SERVICE
+    if _VISUAL_SERVICE is None:
+        with _VISUAL_SERVICE_LOCK:
+            if _VISUAL_SERVICE is None:
+                _VISUAL_SERVICE = VisualService()
+    return _VISUAL_SERVICE
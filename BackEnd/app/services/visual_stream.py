@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional, Union
+
+from app.services.metrics import Histogram, LatencyStats
+from app.services.result_cache import BytesLike
+
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# (frame payload, payload is base64 text, annotate) -> detection result
+DetectFn = Callable[[Union[str, BytesLike], bool, bool], Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class StreamLimits:
+    """Server-side caps on what a client may negotiate."""
+
+    max_in_flight: int = 2
+    max_fps: float = 30.0
+    buffer_size: int = 1
+
+    @classmethod
+    def from_env(cls) -> "StreamLimits":
+        return cls(
+            max_in_flight=max(int(os.getenv("STREAM_MAX_IN_FLIGHT", "2")), 1),
+            max_fps=max(float(os.getenv("STREAM_MAX_FPS", "30")), 0.0),
+            buffer_size=max(int(os.getenv("STREAM_BUFFER_SIZE", "1")), 1),
+        )
+
+
+@dataclass
+class StreamConfig:
+    target_fps: float = 0.0
+    annotate: bool = True
+    max_in_flight: int = 1
+
+    @classmethod
+    def negotiate(cls, requested: Dict[str, Any], limits: StreamLimits) -> "StreamConfig":
+        """Clamp a client's ``config`` message to ``limits``.
+
+        ``target_fps`` of 0 means "as fast as the in-flight slots allow"
+        (still capped by ``limits.max_fps`` when that is set).
+        """
+        try:
+            fps = max(float(requested.get("target_fps") or 0), 0.0)
+        except (TypeError, ValueError):
+            fps = 0.0
+        if limits.max_fps:
+            fps = min(fps, limits.max_fps) if fps else limits.max_fps
+        try:
+            in_flight = int(requested.get("max_in_flight") or limits.max_in_flight)
+        except (TypeError, ValueError):
+            in_flight = limits.max_in_flight
+        return cls(
+            target_fps=fps,
+            annotate=bool(requested.get("annotate", True)),
+            max_in_flight=min(max(in_flight, 1), limits.max_in_flight),
+        )
+
+
+@dataclass
+class _Frame:
+    seq: int
+    payload: Union[str, BytesLike]
+    is_base64: bool
+    received_at: float = field(default_factory=time.perf_counter)
+
+
+class StreamMetrics:
+    """Process-wide counters for /api/stats/stream."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.sessions = 0
+        self.frames = 0
+        self.dropped = 0
+        self.inference = LatencyStats()
+        self.total_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = {"sessions": self.sessions, "frames": self.frames, "dropped": self.dropped}
+        return {**counters, "inference": self.inference.to_dict(), "total_ms": self.total_ms.to_dict()}
+
+
+class VisualStream:
+    """One websocket session of the visual stream.
+
+    The socket's receive loop only calls ``push``; frames wait in a small
+    buffer (``limits.buffer_size``, default 1) where a newer frame evicts
+    the oldest, so a slow model never lets a backlog build up. A dispatcher
+    thread starts inference on the shared executor whenever one of the
+    session's in-flight slots is free and the negotiated ``target_fps``
+    allows. Every response carries the frame's ``seq`` and its latency, so
+    the client can discard results that arrive out of order.
+    """
+
+    def __init__(
+        self,
+        detect: DetectFn,
+        send: Callable[[str], Any],
+        executor: ThreadPoolExecutor,
+        limits: Optional[StreamLimits] = None,
+        metrics: Optional[StreamMetrics] = None,
+    ) -> None:
+        self.detect = detect
+        self.limits = limits or StreamLimits.from_env()
+        self.config = StreamConfig.negotiate({}, self.limits)
+        self.metrics = metrics or StreamMetrics()
+        self._send_raw = send
+        self._executor = executor
+        self._send_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._buffer: Deque[_Frame] = deque()
+        self._in_flight = 0
+        self._next_seq = 0
+        self._last_start = 0.0
+        self.dropped = 0
+        self._closed = False
+        self._broken = False
+        self.metrics.count("sessions")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="visual-stream", daemon=True)
+        self._dispatcher.start()
+
+    def send(self, message: Dict[str, Any]) -> None:
+        if self._broken:
+            return
+        try:
+            with self._send_lock:
+                self._send_raw(json.dumps(message))
+        except Exception:
+            # The socket is gone; stop dispatching for this session.
+            self._broken = True
+            self.close(wait=0)
+
+    def configure(self, requested: Dict[str, Any]) -> StreamConfig:
+        config = StreamConfig.negotiate(requested, self.limits)
+        with self._cond:
+            self.config = config
+            self._cond.notify_all()
+        self.send({"type": "config", **asdict(config), "buffer_size": self.limits.buffer_size})
+        return config
+
+    def push(self, payload: Union[str, BytesLike], is_base64: bool = False, seq: Optional[int] = None) -> int:
+        with self._cond:
+            self._next_seq += 1
+            frame = _Frame(seq=seq if seq is not None else self._next_seq, payload=payload, is_base64=is_base64)
+            if len(self._buffer) >= self.limits.buffer_size:
+                self._buffer.popleft()
+                self.dropped += 1
+                self.metrics.count("dropped")
+            self._buffer.append(frame)
+            self._cond.notify_all()
+        self.metrics.count("frames")
+        return frame.seq
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (not self._buffer or self._in_flight >= self.config.max_in_flight):
+                    self._cond.wait()
+                if self._closed:
+                    return
+                if self.config.target_fps:
+                    wait = self._last_start + 1.0 / self.config.target_fps - time.perf_counter()
+                    if wait > 0:
+                        # Frames arriving meanwhile replace the buffered one.
+                        self._cond.wait(wait)
+                        continue
+                frame = self._buffer.popleft()
+                self._in_flight += 1
+                self._last_start = time.perf_counter()
+                annotate = self.config.annotate
+            try:
+                self._executor.submit(self._run, frame, annotate)
+            except RuntimeError:
+                self._release()
+                return
+
+    def _release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _run(self, frame: _Frame, annotate: bool) -> None:
+        started = time.perf_counter()
+        failed = False
+        try:
+            message = {"type": "result", "seq": frame.seq, **self.detect(frame.payload, frame.is_base64, annotate)}
+        except Exception as exc:
+            failed = True
+            message = {"type": "error", "seq": frame.seq, "error": str(exc)}
+        finished = time.perf_counter()
+        self.metrics.inference.record(finished - started, error=failed)
+        self.metrics.total_ms.observe((finished - frame.received_at) * 1000)
+        message["latency_ms"] = {
+            "queue": round((started - frame.received_at) * 1000, 2),
+            "inference": round((finished - started) * 1000, 2),
+            "total": round((finished - frame.received_at) * 1000, 2),
+        }
+        message["dropped"] = self.dropped
+        try:
+            self.send(message)
+        finally:
+            self._release()
+
+    def close(self, wait: float = 5.0) -> None:
+        """Stop dispatching; in-flight frames get ``wait`` seconds to be answered."""
+        with self._cond:
+            self._closed = True
+            self._buffer.clear()
+            self._cond.notify_all()
+            deadline = time.perf_counter() + wait
+            while self._in_flight > 0:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+_METRICS = StreamMetrics()
+
+
+def get_stream_executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(
+                    max_workers=max(int(os.getenv("STREAM_WORKERS", "8")), 1),
+                    thread_name_prefix="visual-stream",
+                )
+    return _EXECUTOR
+
+
+def get_stream_metrics() -> StreamMetrics:
+    return _METRICS
@@ -0,0 +1,429 @@
+from __future__ import annotations
+
+import atexit
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.services.metrics import Histogram, LatencyStats
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Outside the source tree: test clients in the verify_* / bench_* scripts start the queue too.
+# Production should point WRITE_BEHIND_DIR at a persistent volume.
+DEFAULT_WRITE_BEHIND_DIR = (
+    Path(os.getenv("XDG_STATE_HOME", "").strip() or Path.home() / ".local" / "state") / "smartbin" / "write_behind"
+)
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000)
+MAX_BACKOFF_SECONDS = 30.0
+DEAD_LETTER_FILE = "dead-letter.log"
+
+# fn(session, payload): applies one queued write inside the flush transaction; must not commit.
+# payload["write_key"] is the record's idempotency key: a handler that inserts rows stores it
+# (under a unique constraint) and does nothing when it is already there, so replays are no-ops.
+Handler = Callable[[Session, Dict[str, Any]], None]
+_HANDLERS: Dict[str, Handler] = {}
+
+
+def write_behind_op(name: str) -> Callable[[Handler], Handler]:
+    """Register the handler that applies queued ``name`` records."""
+
+    def register(fn: Handler) -> Handler:
+        _HANDLERS[name] = fn
+        return fn
+
+    return register
+
+
+class QueueFull(RuntimeError):
+    """The queue is at ``max_depth``; the write was not accepted."""
+
+
+def _is_transient(exc: Exception) -> bool:
+    # Database unreachable: keep the batch and retry later instead of dead-lettering it.
+    if isinstance(exc, (OperationalError, InterfaceError, DisconnectionError)):
+        return True
+    return isinstance(exc, DBAPIError) and exc.connection_invalidated
+
+
+@dataclass(frozen=True)
+class WriteBehindSettings:
+    enabled: bool = True
+    directory: Path = DEFAULT_WRITE_BEHIND_DIR
+    flush_size: int = 200
+    flush_interval: float = 0.5
+    max_depth: int = 10000
+    segment_bytes: int = 8 * 1024 * 1024
+    fsync: bool = False
+
+    @classmethod
+    def from_env(cls) -> "WriteBehindSettings":
+        configured = os.getenv("WRITE_BEHIND_DIR", "").strip()
+        return cls(
+            enabled=os.getenv("WRITE_BEHIND_ENABLED", "true").lower() in ("1", "true", "yes"),
+            directory=Path(configured) if configured else DEFAULT_WRITE_BEHIND_DIR,
+            flush_size=max(int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", "200")), 1),
+            flush_interval=max(float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL_MS", "500")), 0.0) / 1000,
+            max_depth=max(int(os.getenv("WRITE_BEHIND_MAX_DEPTH", "10000")), 1),
+            segment_bytes=max(int(os.getenv("WRITE_BEHIND_SEGMENT_BYTES", str(8 * 1024 * 1024))), 4096),
+            fsync=os.getenv("WRITE_BEHIND_FSYNC", "false").lower() in ("1", "true", "yes"),
+        )
+
+
+class _Segment:
+    """One append-only spill file; removed once every record in it is flushed."""
+
+    def __init__(self, path: Path, pending: int = 0, closed: bool = False) -> None:
+        self.path = path
+        self.pending = pending
+        self.closed = closed
+
+
+@dataclass
+class _Record:
+    op: str
+    payload: Dict[str, Any]
+    segment: _Segment
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+def _claim_slot(root: Path):
+    """Lock the first free ``slot-N`` directory; every worker process spills to its own."""
+    root.mkdir(parents=True, exist_ok=True)
+    for index in itertools.count():
+        slot = root / f"slot-{index}"
+        slot.mkdir(exist_ok=True)
+        handle = open(slot / "lock", "a+")
+        if fcntl is None:
+            return slot, handle
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        return slot, handle
+
+
+class WriteBehindQueue:
+    """Write-behind queue for request-path database writes.
+
+    ``submit`` appends the write to a segment file under the worker's slot
+    directory and returns at once; a background thread applies queued
+    writes in batches of up to ``flush_size`` (or after ``flush_interval``),
+    one transaction per batch. Segments are deleted once everything in them
+    is committed, so whatever is left on disk at startup - in this slot or
+    in the slot of a worker that no longer runs - is replayed in order.
+    Delivery is at-least-once: a crash between a commit and the segment
+    cleanup replays that batch. Every record carries a ``write_key``
+    (``new_write_key``) that handlers check, so a replay applies nothing
+    twice.
+
+    While the database is unreachable the batch stays queued and is retried
+    with backoff. A record that fails on its own (bad payload, constraint
+    violation) goes to ``dead-letter.log`` in the slot directory. When the
+    queue is disabled or not started, ``submit`` applies the write inline.
+    """
+
+    def __init__(self, settings: Optional[WriteBehindSettings] = None) -> None:
+        self.settings = settings or WriteBehindSettings.from_env()
+        self._cond = threading.Condition()
+        self._records: Deque[_Record] = deque()
+        self._segments: List[_Segment] = []
+        self._active: Optional[_Segment] = None
+        self._file = None
+        self._segment_ids = itertools.count()
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._slot: Optional[Path] = None
+        self._slot_lock = None
+        self._backoff = 0.0
+        self._last_error: Optional[str] = None
+        self._counters = {
+            "submitted": 0,
+            "flushed": 0,
+            "batches": 0,
+            "replayed": 0,
+            "retries": 0,
+            "dropped": 0,
+            "dead_lettered": 0,
+        }
+        self.flush_latency = LatencyStats()
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and not self._stopping
+
+    # --- lifecycle -----------------------------------------------------------
+
+    def start(self, app) -> None:
+        if not self.settings.enabled or self._thread is not None:
+            return
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._app = app
+            if self.settings.directory == DEFAULT_WRITE_BEHIND_DIR and not (app.debug or app.testing):
+                logger.warning(
+                    "WRITE_BEHIND_DIR is not set; queued writes spill to %s. Point it at a persistent volume.",
+                    self.settings.directory,
+                )
+            self._slot, self._slot_lock = _claim_slot(self.settings.directory)
+            self._adopt_orphans()
+            self._replay()
+            self._open_segment()
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Flush what the database accepts within ``timeout``; the rest stays on disk."""
+        with self._cond:
+            if self._thread is None or self._stopping:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        with self._cond:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._slot_lock is not None:
+                self._slot_lock.close()
+                self._slot_lock = None
+
+    def _adopt_orphans(self) -> None:
+        # Slots whose lock is free belong to workers that are gone; move their segments here.
+        if fcntl is None:
+            return
+        for slot in sorted(self.settings.directory.glob("slot-*")):
+            if slot == self._slot:
+                continue
+            with open(slot / "lock", "a+") as handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue
+                for path in slot.glob("segment-*.log"):
+                    os.replace(path, self._slot / path.name)
+
+    def _replay(self) -> None:
+        for path in sorted(self._slot.glob("segment-*.log")):
+            segment = _Segment(path, closed=True)
+            with open(path, "rb") as handle:
+                for line in handle:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from a crash mid-append.
+                        logger.warning("Skipping unreadable write-behind record in %s", path.name)
+                        continue
+                    self._records.append(_Record(entry["op"], entry["payload"], segment))
+                    segment.pending += 1
+            if segment.pending:
+                self._segments.append(segment)
+                self._counters["replayed"] += segment.pending
+            else:
+                path.unlink()
+        if self._counters["replayed"]:
+            logger.info("Replaying %d queued writes from %s", self._counters["replayed"], self._slot)
+
+    def _open_segment(self) -> None:
+        name = f"segment-{time.time_ns():020d}-{next(self._segment_ids):06d}.log"
+        self._active = _Segment(self._slot / name)
+        self._segments.append(self._active)
+        self._file = open(self._active.path, "ab")
+
+    # --- producer side -------------------------------------------------------
+
+    def submit(self, op: str, payload: Dict[str, Any]) -> bool:
+        """Queue ``op``; returns False if it was applied inline instead.
+
+        ``payload["write_key"]`` is filled in when the caller did not set one.
+        Raises ``QueueFull`` when ``max_depth`` writes are already waiting.
+        """
+        if op not in _HANDLERS:
+            raise KeyError(f"No write-behind handler registered for {op!r}")
+        if not payload.get("write_key"):
+            payload = {**payload, "write_key": new_write_key()}
+        if not self.running:
+            try:
+                _HANDLERS[op](db.session, payload)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            return False
+
+        line = json.dumps({"op": op, "payload": payload, "at": time.time()}, separators=(",", ":")) + "\n"
+        with self._cond:
+            if len(self._records) >= self.settings.max_depth:
+                self._counters["dropped"] += 1
+                raise QueueFull(f"Write-behind queue is full ({self.settings.max_depth} writes waiting)")
+            if self._file.tell() >= self.settings.segment_bytes:
+                self._file.close()
+                self._active.closed = True
+                self._open_segment()
+            self._file.write(line.encode("utf-8"))
+            self._file.flush()
+            if self.settings.fsync:
+                os.fsync(self._file.fileno())
+            self._active.pending += 1
+            self._records.append(_Record(op, payload, self._active))
+            self._counters["submitted"] += 1
+            # Wake the flusher to start the interval timer, or to flush a full batch.
+            if len(self._records) in (1, self.settings.flush_size):
+                self._cond.notify_all()
+        return True
+
+    # --- flusher -------------------------------------------------------------
+
+    def _next_batch(self) -> Optional[List[_Record]]:
+        with self._cond:
+            while True:
+                if self._stopping and not self._records:
+                    return None
+                if self._records:
+                    if self._stopping or len(self._records) >= self.settings.flush_size:
+                        break
+                    remaining = self._records[0].queued_at + self.settings.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+            return list(itertools.islice(self._records, self.settings.flush_size))
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if self._flush(batch):
+                self._backoff = 0.0
+                continue
+            with self._cond:
+                if self._stopping:
+                    return
+                self._counters["retries"] += 1
+                self._backoff = min(max(self._backoff * 2, self.settings.flush_interval, 0.1), MAX_BACKOFF_SECONDS)
+                self._cond.wait(self._backoff)
+
+    def _flush(self, batch: List[_Record]) -> bool:
+        """Apply ``batch``; False if the database was unreachable (nothing is dropped then)."""
+        started = time.perf_counter()
+        with self._app.app_context():
+            try:
+                for record in batch:
+                    _HANDLERS[record.op](db.session, record.payload)
+                db.session.commit()
+            except Exception as exc:
+                db.session.rollback()
+                self._last_error = f"{type(exc).__name__}: {exc}"
+                if _is_transient(exc):
+                    self.flush_latency.record(time.perf_counter() - started, error=True)
+                    return False
+                # One bad record must not hold back the rest: apply them one by one.
+                done, dead, ok = self._flush_each(batch)
+                self.flush_latency.record(time.perf_counter() - started, error=True)
+                self._complete(done, dead)
+                return ok
+            finally:
+                db.session.remove()
+        self.flush_latency.record(time.perf_counter() - started)
+        self.batch_sizes.observe(len(batch))
+        self._complete(len(batch))
+        return True
+
+    def _flush_each(self, batch: List[_Record]):
+        dead = 0
+        for index, record in enumerate(batch):
+            try:
+                _HANDLERS[record.op](db.session, record.payload)
+                db.session.commit()
+            except Exception as exc:
+                db.session.rollback()
+                if _is_transient(exc):
+                    return index, dead, False
+                self._dead_letter(record, exc)
+                dead += 1
+        return len(batch), dead, True
+
+    def _dead_letter(self, record: _Record, exc: Exception) -> None:
+        logger.error("Write-behind %s failed, moved to %s: %s", record.op, DEAD_LETTER_FILE, exc)
+        entry = {"op": record.op, "payload": record.payload, "error": f"{type(exc).__name__}: {exc}", "at": time.time()}
+        with open(self._slot / DEAD_LETTER_FILE, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+    def _complete(self, count: int, dead: int = 0) -> None:
+        with self._cond:
+            for _ in range(count):
+                record = self._records.popleft()
+                record.segment.pending -= 1
+            self._counters["flushed"] += count - dead
+            self._counters["dead_lettered"] += dead
+            if count:
+                self._counters["batches"] += 1
+            for segment in [segment for segment in self._segments if segment.pending == 0]:
+                if segment.closed:
+                    segment.path.unlink(missing_ok=True)
+                    self._segments.remove(segment)
+                elif self._file is not None and self._file.tell():
+                    # Everything in the live segment is committed: start it over.
+                    self._file.truncate(0)
+                    self._file.seek(0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            oldest = self._records[0].queued_at if self._records else None
+            state = {
+                "enabled": self.settings.enabled,
+                "running": self.running,
+                "slot": str(self._slot) if self._slot else None,
+                "depth": len(self._records),
+                "max_depth": self.settings.max_depth,
+                "oldest_age_ms": round((time.monotonic() - oldest) * 1000, 1) if oldest is not None else None,
+                "segments": len(self._segments),
+                "flush_size": self.settings.flush_size,
+                "flush_interval_ms": round(self.settings.flush_interval * 1000),
+                "backoff_seconds": round(self._backoff, 2),
+                "last_error": self._last_error,
+                **self._counters,
+            }
+        return {**state, "flush_latency": self.flush_latency.to_dict(), "batch_sizes": self.batch_sizes.to_dict()}
+
+
+def new_write_key() -> str:
+    """Idempotency key for one queued write."""
+    return uuid.uuid4().hex
+
+
+_QUEUE: Optional[WriteBehindQueue] = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_write_behind() -> WriteBehindQueue:
+    global _QUEUE
+    if _QUEUE is None:
+        with _QUEUE_LOCK:
+            if _QUEUE is None:
+                _QUEUE = WriteBehindQueue()
+    return _QUEUE
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+class ImportProfiler:
+    """Records first-time imports while the app boots, like ``-X importtime``.
+
+    ``start()`` wraps ``builtins.__import__`` on the booting thread; every
+    module that was not yet in ``sys.modules`` gets its self and cumulative
+    time recorded. ``phase()`` times named boot steps. Imports done through
+    ``importlib.import_module`` bypass the hook and are not counted.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[ImportRecord] = []
+        self.phases: Dict[str, float] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._original_import = None
+        self._thread_id: Optional[int] = None
+        self._stack: List[List[float]] = []
+
+    @property
+    def active(self) -> bool:
+        return self._original_import is not None
+
+    def start(self) -> None:
+        if self.active:
+            return
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self._thread_id = threading.get_ident()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self) -> None:
+        if not self.active:
+            return
+        builtins.__import__ = self._original_import
+        self._original_import = None
+        self.finished_at = time.perf_counter()
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original_import
+        if (
+            original is None
+            or level != 0
+            or name in sys.modules
+            or threading.get_ident() != self._thread_id
+        ):
+            return original(name, globals, locals, fromlist, level)
+
+        # [children_seconds] for the import currently in progress
+        self._stack.append([0.0])
+        started = time.perf_counter()
+        try:
+            return original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            children = self._stack.pop()[0]
+            if self._stack:
+                self._stack[-1][0] += elapsed
+            self.records.append(
+                ImportRecord(
+                    module=name,
+                    self_us=int((elapsed - children) * 1e6),
+                    cumulative_us=int(elapsed * 1e6),
+                    depth=len(self._stack),
+                )
+            )
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def report(self, limit: int = 25) -> Dict[str, Any]:
+        end = self.finished_at or time.perf_counter()
+        total = end - self.started_at if self.started_at is not None else 0.0
+        top_level = [record for record in self.records if record.depth == 0]
+        slowest = sorted(self.records, key=lambda record: record.cumulative_us, reverse=True)
+        return {
+            "total_ms": round(total * 1000, 2),
+            "imports_ms": round(sum(record.cumulative_us for record in top_level) / 1000, 2),
+            "modules_imported": len(self.records),
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in self.phases.items()},
+            "slowest_imports": [
+                {
+                    "module": record.module,
+                    "cumulative_ms": round(record.cumulative_us / 1000, 2),
+                    "self_ms": round(record.self_us / 1000, 2),
+                    "depth": record.depth,
+                }
+                for record in slowest[: max(int(limit), 0)]
+            ],
+            "heavy_modules_loaded": sorted(name for name in HEAVY_MODULES if name in sys.modules),
+        }
+
+
+# Modules that should only be loaded by workers serving the AI routes.
+HEAVY_MODULES = (
+    "cv2",
+    "supervision",
+    "inference",
+    "inference_sdk",
+    "librosa",
+    "tensorflow",
+    "onnxruntime",
+    "joblib",
+    "sklearn",
+    "google.generativeai",
+)
+
+startup_profiler = ImportProfiler()
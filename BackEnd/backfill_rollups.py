@@ -0,0 +1,40 @@
+import argparse
+from datetime import datetime, timedelta
+
+from app import create_app
+from app.extensions import db
+from app.services.rollups import rebuild_rollups
+
+
+def backfill(days: int | None) -> None:
+    start_day = None
+    end_day = None
+    if days:
+        end_day = datetime.utcnow().date()
+        start_day = end_day - timedelta(days=days - 1)
+
+    written = rebuild_rollups(db.session, start_day=start_day, end_day=end_day)
+    db.session.commit()
+    scope = f"{start_day} .. {end_day}" if days else "all days"
+    print("Rollup backfill complete:", f"rows={written}", f"range={scope}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild daily_bin_category_rollup from waste_logs and carbon_metrics."
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=None,
+        help="Only rebuild the last N days (default: rebuild everything).",
+    )
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        backfill(max(args.days, 1) if args.days else None)
+
+
+if __name__ == "__main__":
+    main()
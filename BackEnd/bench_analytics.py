@@ -0,0 +1,146 @@
+import argparse
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date, timedelta
+
+from app import create_app
+from app.db_models.models import CarbonMetric, WasteLog
+from app.extensions import db
+from app.services import genai_reports
+from app.services.rollups import CATEGORY_WEIGHTS_KG
+from seed_bulk import seed_bulk
+
+
+# Pre-aggregation implementations, kept here as the baseline to compare against.
+def legacy_waste_composition(days: int) -> dict:
+    start_dt, end_dt = genai_reports._get_date_range(days)
+    logs = (
+        WasteLog.query.filter(WasteLog.timestamp >= start_dt, WasteLog.timestamp < end_dt)
+        .order_by(WasteLog.timestamp.desc())
+        .all()
+    )
+    category_totals = defaultdict(float)
+    for log in logs:
+        category_totals[log.category] += CATEGORY_WEIGHTS_KG.get(log.category, 1.0)
+    return {category: round(weight, 2) for category, weight in category_totals.items()}
+
+
+def legacy_carbon_trend(days: int) -> tuple:
+    start_dt, end_dt = genai_reports._get_date_range(days)
+    records = (
+        db.session.query(WasteLog.timestamp, CarbonMetric.co2_reduction_value)
+        .join(CarbonMetric, CarbonMetric.log_id == WasteLog.id)
+        .filter(WasteLog.timestamp >= start_dt, WasteLog.timestamp < end_dt)
+        .all()
+    )
+    daily_map = defaultdict(float)
+    for ts, value in records:
+        if ts is None:
+            continue
+        daily_map[ts.date()] += float(value or 0)
+    weekly_map = defaultdict(float)
+    for ts, value in records:
+        if ts is None:
+            continue
+        day = ts.date()
+        weekly_map[day - timedelta(days=day.weekday())] += float(value or 0)
+    return (
+        {day: round(value, 2) for day, value in daily_map.items()},
+        {day: round(value, 2) for day, value in weekly_map.items()},
+    )
+
+
+def current_waste_composition(days: int) -> dict:
+    result = genai_reports.get_waste_composition(days)
+    return {item["label"]: item["value"] for item in result["categories"]}
+
+
+def current_carbon_trend(days: int) -> tuple:
+    result = genai_reports.get_carbon_trend(days=days, weeks=days // 7 + 2)
+    return (
+        {date.fromisoformat(item["date"]): item["value"] for item in result["daily"]},
+        {date.fromisoformat(item["date"]): item["value"] for item in result["weekly"]},
+    )
+
+
+def measure(fn, days: int, repeat: int) -> tuple:
+    """Return (result, best seconds, peak traced bytes)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        db.session.expire_all()
+        started = time.perf_counter()
+        result = fn(days)
+        best = min(best, time.perf_counter() - started)
+        db.session.rollback()
+
+    db.session.expire_all()
+    tracemalloc.start()
+    fn(days)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.rollback()
+    return result, best, peak
+
+
+def same(left, right) -> bool:
+    if isinstance(left, tuple):
+        return all(same(a, b) for a, b in zip(left, right))
+    keys = set(left) | set(right)
+    return all(abs(left.get(key, 0) - right.get(key, 0)) < 0.05 for key in keys)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark waste composition / carbon trend: Python loops vs SQL aggregation."
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Waste logs to seed (default: 1,000,000).")
+    parser.add_argument("--days", type=int, default=365, help="Days of data to seed and query (default: 365).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per variant; best is reported (default: 3).")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in DATABASE_URL.")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if not args.skip_seed:
+            db.create_all()
+            started = time.perf_counter()
+            seed_bulk(
+                days=args.days,
+                logs_per_day=max(args.rows // args.days, 1),
+                bin_count=24,
+                anomalies_ratio=0,
+                with_carbon=True,
+                seed=42,
+            )
+            print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+        print("waste_logs rows:", WasteLog.query.count())
+        print(f"{'variant':<32}{'best ms':>12}{'peak MiB':>12}")
+        # Query the whole seeded span (seed_bulk starts `days` ago).
+        window = args.days + 1
+        for name, legacy, current in (
+            ("waste_composition", legacy_waste_composition, current_waste_composition),
+            ("carbon_trend", legacy_carbon_trend, current_carbon_trend),
+        ):
+            app.config["ANALYTICS_USE_ROLLUP"] = False
+            baseline, legacy_s, legacy_peak = measure(legacy, window, args.repeat)
+            sql_result, sql_s, sql_peak = measure(current, window, args.repeat)
+            app.config["ANALYTICS_USE_ROLLUP"] = True
+            rollup_result, rollup_s, rollup_peak = measure(current, window, args.repeat)
+
+            for label, seconds, peak in (
+                (f"{name} (python loop)", legacy_s, legacy_peak),
+                (f"{name} (sql group by)", sql_s, sql_peak),
+                (f"{name} (rollup table)", rollup_s, rollup_peak),
+            ):
+                print(f"{label:<32}{seconds * 1000:>12.1f}{peak / 2**20:>12.2f}")
+            print(
+                f"  speedup sql={legacy_s / sql_s:.1f}x rollup={legacy_s / rollup_s:.1f}x",
+                f"parity sql={same(baseline, sql_result)} rollup={same(baseline, rollup_result)}",
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import math
+import random
+import statistics
+import time
+
+from sqlalchemy import insert
+
+from app import create_app
+from app.db_models.models import SmartBin
+from app.extensions import db
+from app.services.spatial_index import get_spatial_index
+from app.services.vector_tiles import get_tile_cache
+
+# Area the synthetic bins are spread over (greater Malang / Surabaya, East Java).
+REGION = (111.9, -8.4, 113.2, -7.1)
+
+# Viewport size in degrees per zoom for a ~1280 px wide map.
+VIEWPORTS = {10: 1.76, 13: 0.22, 16: 0.0275}
+
+
+def seed_bins(count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    min_lon, min_lat, max_lon, max_lat = REGION
+    # Bins bunch around a few hundred sites (campuses, markets, offices) like real deployments.
+    sites = [(rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat)) for _ in range(max(count // 100, 1))]
+    rows = []
+    for i in range(count):
+        lon, lat = rng.choice(sites)
+        rows.append(
+            {
+                "location_name": f"Bench bin {i}",
+                "latitude": lat + rng.gauss(0, 0.01),
+                "longitude": lon + rng.gauss(0, 0.01),
+                "is_active": rng.random() > 0.05,
+                "fill_level": rng.randint(0, 100),
+            }
+        )
+    db.session.execute(insert(SmartBin), rows)
+    db.session.commit()
+
+
+def timed(client, urls, sizes=None) -> list:
+    samples = []
+    for url in urls:
+        started = time.perf_counter()
+        response = client.get(url)
+        samples.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, (url, response.status_code)
+        if sizes is not None:
+            sizes.append(len(response.data))
+    return samples
+
+
+def tile_urls(zoom: int) -> list:
+    """Every tile over REGION at ``zoom``."""
+    n = 2**zoom
+
+    def tile(lon: float, lat: float) -> tuple:
+        phi = math.radians(lat)
+        return int((lon + 180) / 360 * n), int((1 - math.log(math.tan(phi) + 1 / math.cos(phi)) / math.pi) / 2 * n)
+
+    min_lon, min_lat, max_lon, max_lat = REGION
+    (x0, y0), (x1, y1) = tile(min_lon, max_lat), tile(max_lon, min_lat)
+    return [f"/api/gis/tiles/{zoom}/{x}/{y}.mvt" for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def report(label: str, samples: list) -> None:
+    ordered = sorted(samples)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    print(f"{label:<28}{statistics.median(ordered):>10.2f}{p95:>10.2f}{ordered[-1]:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark GIS map queries against the in-memory spatial index.")
+    parser.add_argument("--bins", type=int, default=50_000, help="Bins to seed (default: 50,000).")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per query kind (default: 200).")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the bins already in DATABASE_URL.")
+    args = parser.parse_args()
+
+    app = create_app()
+    rng = random.Random(7)
+    with app.app_context():
+        if not args.skip_seed:
+            db.create_all()
+            started = time.perf_counter()
+            seed_bins(args.bins, seed=42)
+            print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+        client = app.test_client()
+        index = get_spatial_index()
+        started = time.perf_counter()
+        index.refresh(db.session)
+        print(f"Index load: {(time.perf_counter() - started) * 1000:.1f} ms", index.stats())
+
+        min_lon, min_lat, max_lon, max_lat = REGION
+
+        def viewport(width: float) -> str:
+            lon = rng.uniform(min_lon, max_lon - width)
+            lat = rng.uniform(min_lat, max_lat - width / 2)
+            return f"{lon:.5f},{lat:.5f},{lon + width:.5f},{lat + width / 2:.5f}"
+
+        print(f"{'query':<28}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+        json_sizes = []
+        report("list /api/bins/ (baseline)", timed(client, ["/api/bins/"] * 3, json_sizes))
+        for zoom, width in VIEWPORTS.items():
+            urls = [f"/api/gis/clusters?bbox={viewport(width)}&zoom={zoom}" for _ in range(args.requests)]
+            report(f"clusters z{zoom}", timed(client, urls))
+        bbox_urls = [f"/api/gis/bins?bbox={viewport(VIEWPORTS[16])}" for _ in range(args.requests)]
+        report("bbox z16", timed(client, bbox_urls))
+        urls = [
+            f"/api/gis/nearest?lat={rng.uniform(min_lat, max_lat):.5f}&lon={rng.uniform(min_lon, max_lon):.5f}&k=10"
+            for _ in range(args.requests)
+        ]
+        report("nearest k=10", timed(client, urls))
+
+        # Whole region as vector tiles: first render, then served from the tile cache.
+        tile_sizes = {}
+        for zoom in (10, 13, 16):
+            urls = tile_urls(zoom)
+            sizes = []
+            if len(urls) > args.requests * 10:
+                # Too many to fetch them all: time a sample, leave the size comparison out.
+                urls = rng.sample(urls, args.requests * 10)
+            else:
+                tile_sizes[zoom] = sizes
+            report(f"tiles z{zoom} cold", timed(client, urls, sizes))
+            report(f"tiles z{zoom} cached", timed(client, urls))
+
+        # A committed edit is picked up by re-reading just that bin.
+        bin_item = db.session.get(SmartBin, rng.randint(1, args.bins))
+        bin_item.fill_level = 95
+        db.session.commit()
+        report("bbox z16 after bin update", timed(client, bbox_urls[:1]))
+        print(index.stats())
+        print(get_tile_cache().stats())
+
+        print(f"/api/bins/ JSON: {json_sizes[0] / 1024:.0f} KiB")
+        for zoom, sizes in tile_sizes.items():
+            print(
+                f"tiles z{zoom}: {len(sizes)} tiles, {sum(sizes) / 1024:.0f} KiB"
+                f" ({json_sizes[0] / max(sum(sizes), 1):.0f}x smaller)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""Bytes copied per /api/predict and /api/stream/visual request, before and after binary uploads.
+
+Each pipeline replays what one request does to its payload, from reading
+the body to the bytes handed to the HTTP client, and adds up every
+full-size buffer it materialises (strings, bytes, decoded frames). The
+"before" pipelines are the base64-only code paths, kept here as the
+baseline; the "after" ones call the current helpers. Network I/O and
+inference are left out.
+
+    python bench_upload_copies.py
+    python bench_upload_copies.py --width 1920 --height 1080 --repeat 50
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import time
+import tracemalloc
+import wave
+
+import cv2
+import numpy as np
+
+WORKFLOW_KEY = "bench-key"
+
+
+class Ledger:
+    def __init__(self) -> None:
+        self.total = 0
+
+    def add(self, value):
+        self.total += value.nbytes if isinstance(value, np.ndarray) else len(value)
+        return value
+
+    def count(self, size: int) -> None:
+        self.total += size
+
+
+class Upload:
+    def __init__(self, image: bytes, audio: bytes) -> None:
+        self.image = image
+        self.audio = audio
+        data_url = "data:image/jpeg;base64," + base64.b64encode(image).decode("ascii")
+        self.image_json = json.dumps({"image_base64": data_url}).encode()
+        self.image_frame = self.image_json.decode()
+        self.audio_json = json.dumps(
+            {"audio_base64": "data:audio/wav;base64," + base64.b64encode(audio).decode("ascii")}
+        ).encode()
+
+
+# --- before: base64 JSON only -------------------------------------------------
+
+
+def legacy_decode_base64(ledger: Ledger, b64_string: str) -> bytes:
+    # VisualService._decode_base64_bytes: split off the data URL header, then
+    # b64decode, which encodes the str to ASCII bytes first.
+    raw = ledger.add(b64_string.split(",", 1)[1])
+    return ledger.add(base64.b64decode(ledger.add(raw.encode("ascii")), validate=True))
+
+
+def legacy_workflow_body(ledger: Ledger, b64_string: str) -> None:
+    payload = {
+        "api_key": WORKFLOW_KEY,
+        "use_cache": True,
+        "inputs": {"image": {"type": "base64", "value": b64_string}},
+    }
+    # requests(json=...) dumps to str, then encodes it to UTF-8.
+    ledger.add(ledger.add(json.dumps(payload)).encode("utf-8"))
+
+
+def before_visual_workflow(ledger: Ledger, upload: Upload) -> None:
+    ledger.add(bytearray(upload.image_json))  # request.get_data()
+    b64 = ledger.add(json.loads(upload.image_json)["image_base64"])
+    legacy_decode_base64(ledger, b64)
+    stripped = ledger.add(b64.split(",", 1)[1])  # _strip_base64_header
+    legacy_workflow_body(ledger, stripped)
+
+
+def before_visual_model(ledger: Ledger, upload: Upload) -> None:
+    ledger.add(bytearray(upload.image_json))
+    b64 = ledger.add(json.loads(upload.image_json)["image_base64"])
+    image_bytes = legacy_decode_base64(ledger, b64)
+    bgr = ledger.add(cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR))
+    rgb = ledger.add(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+    # RoboflowHTTPClient._encode_image re-encoded the decoded frame; requests
+    # then encoded the str body to latin-1.
+    _, jpeg = cv2.imencode(".jpg", rgb)
+    ledger.add(jpeg)
+    body = ledger.add(ledger.add(base64.b64encode(jpeg)).decode("ascii"))
+    ledger.add(body.encode("latin-1"))
+
+
+def before_stream_workflow(ledger: Ledger, upload: Upload) -> None:
+    b64 = ledger.add(json.loads(ledger.add(upload.image_frame))["image_base64"])
+    legacy_decode_base64(ledger, b64)
+    stripped = ledger.add(b64.split(",", 1)[1])
+    legacy_workflow_body(ledger, stripped)
+
+
+def before_file_workflow(ledger: Ledger, upload: Upload) -> None:
+    ledger.add(bytearray(upload.image))  # file.read()
+    # detect_from_file_bytes base64-encoded the upload for the workflow.
+    b64 = ledger.add(ledger.add(base64.b64encode(upload.image)).decode("ascii"))
+    legacy_workflow_body(ledger, b64)
+
+
+def before_audio(ledger: Ledger, upload: Upload) -> None:
+    ledger.add(bytearray(upload.audio_json))
+    b64 = ledger.add(json.loads(upload.audio_json)["audio_base64"])
+    legacy_decode_base64(ledger, b64)
+
+
+# --- after: raw bodies and binary frames ---------------------------------------
+
+
+def after_visual_workflow(ledger: Ledger, upload: Upload, client) -> None:
+    body = ledger.add(bytearray(upload.image))  # request.get_data(cache=False)
+    image = memoryview(body)
+    # _workflow_body: one base64 encode, one join into the request body.
+    ledger.count(len(base64.b64encode(image)))
+    ledger.add(client._workflow_body({"image": image}))
+
+
+def after_visual_model(ledger: Ledger, upload: Upload, client) -> None:
+    body = ledger.add(bytearray(upload.image))
+    # The upload goes upstream as is: infer() sends the base64 bytes without
+    # a str round trip. Decoding is only needed when there are boxes to draw.
+    ledger.add(client._encode_image(memoryview(body)))
+
+
+def after_stream_workflow(ledger: Ledger, upload: Upload, client) -> None:
+    frame = ledger.add(bytearray(upload.image))  # binary websocket message
+    ledger.count(len(base64.b64encode(frame)))
+    ledger.add(client._workflow_body({"image": frame}))
+
+
+def after_json_workflow(ledger: Ledger, upload: Upload, client) -> None:
+    from app.services.visual_service import VisualService
+
+    ledger.add(bytearray(upload.image_json))
+    b64 = ledger.add(json.loads(upload.image_json)["image_base64"])
+    b64 = ledger.add(VisualService._strip_base64_header(b64))
+    ledger.count(len(b64))  # b64decode encodes the str to ASCII
+    ledger.add(VisualService._decode_base64_bytes(b64))
+    ledger.count(len(b64))  # _encode_image: str -> ASCII bytes
+    ledger.add(client._workflow_body({"image": b64}))
+
+
+def after_audio(ledger: Ledger, upload: Upload, client) -> None:
+    # request.get_data(); load_audio then wraps the bytes in a BytesIO,
+    # which shares the buffer instead of copying it.
+    ledger.add(bytearray(upload.audio))
+
+
+SCENARIOS = [
+    ("visual -> workflow (JSON / raw body)", before_visual_workflow, after_visual_workflow),
+    ("visual -> hosted model, no boxes", before_visual_model, after_visual_model),
+    ("stream -> workflow (text / binary frame)", before_stream_workflow, after_stream_workflow),
+    ("visual -> workflow, multipart file", before_file_workflow, after_visual_workflow),
+    ("visual -> workflow, JSON both", before_visual_workflow, after_json_workflow),
+    ("audio (JSON / raw body)", before_audio, after_audio),
+]
+
+
+def measure(pipeline, args, repeat: int):
+    ledger = Ledger()
+    pipeline(ledger, *args)
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pipeline(Ledger(), *args)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    pipeline(Ledger(), *args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ledger.total, best, peak
+
+
+def make_upload(width: int, height: int, quality: int, audio_seconds: float) -> Upload:
+    rng = np.random.default_rng(42)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    frame = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    frame += rng.normal(0, 12, frame.shape)
+    _, jpeg = cv2.imencode(".jpg", frame.clip(0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, quality])
+
+    samples = (rng.normal(0, 0.2, int(22050 * audio_seconds)).clip(-1, 1) * 32767).astype("<i2")
+    wav = io.BytesIO()
+    with wave.open(wav, "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(22050)
+        handle.writeframes(samples.tobytes())
+    return Upload(jpeg.tobytes(), wav.getvalue())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare bytes copied per upload, base64 vs binary.")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--quality", type=int, default=85, help="JPEG quality of the test frame.")
+    parser.add_argument("--audio-seconds", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    os.environ.setdefault("STARTUP_PROFILE", "false")
+    from app.services.roboflow_client import ClientSettings, RoboflowHTTPClient
+
+    client = RoboflowHTTPClient("http://localhost", WORKFLOW_KEY, ClientSettings())
+    upload = make_upload(args.width, args.height, args.quality, args.audio_seconds)
+    print(
+        f"image {args.width}x{args.height}: {len(upload.image) / 1024:.0f} KiB jpeg, "
+        f"{len(upload.image_json) / 1024:.0f} KiB as JSON base64; "
+        f"audio: {len(upload.audio) / 1024:.0f} KiB wav"
+    )
+    print(
+        f"{'scenario':<42}{'before KiB':>12}{'after KiB':>11}{'x upload':>16}"
+        f"{'before ms':>11}{'after ms':>10}{'peak KiB':>18}"
+    )
+    for label, before, after in SCENARIOS:
+        size = len(upload.audio) if label.startswith("audio") else len(upload.image)
+        before_bytes, before_s, before_peak = measure(before, (upload,), args.repeat)
+        after_bytes, after_s, after_peak = measure(after, (upload, client), args.repeat)
+        print(
+            f"{label:<42}{before_bytes / 1024:>12.0f}{after_bytes / 1024:>11.0f}"
+            f"{before_bytes / size:>8.1f} -> {after_bytes / size:<5.1f}"
+            f"{before_s * 1000:>11.2f}{after_s * 1000:>10.2f}"
+            f"{before_peak / 1024:>9.0f} -> {after_peak / 1024:<6.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
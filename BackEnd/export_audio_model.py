@@ -0,0 +1,156 @@
+"""
+Export the Keras audio classifier to a NumPy weight file.
+
+Reads audio_classification_model.h5 with h5py (no TensorFlow needed) and
+writes model.npz next to it: one kernel/bias pair per Dense layer, their
+activations and the label encoder classes. AudioService picks model.npz up
+automatically and serves it with app/services/numpy_runtime.py.
+
+Usage:
+    python export_audio_model.py
+    python export_audio_model.py --model-dir ml_models/audio/smartbin_audio_v1 --verify
+
+Re-run after retraining; a stale model.npz would otherwise keep serving the
+old weights.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_MODEL_DIR = BASE_DIR / "ml_models" / "audio" / "smartbin_audio_v1"
+
+# Layers that carry no weights at inference time
+PASSTHROUGH_LAYERS = {"InputLayer", "Dropout", "Flatten", "Activation"}
+
+
+def find_model(model_dir: Path) -> Path:
+    for name in ("audio_classification_model.h5", "model.h5"):
+        path = model_dir / name
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"No .h5 model in {model_dir}")
+
+
+def read_layer_config(h5: h5py.File):
+    raw = h5.attrs["model_config"]
+    if isinstance(raw, bytes):
+        raw = raw.decode("utf-8")
+    config = json.loads(raw)
+    if config.get("class_name") != "Sequential":
+        raise ValueError(f"Only Sequential models are supported, got {config.get('class_name')}")
+    layers = config["config"]
+    # Keras 2 stored the layer list directly, Keras 3 nests it under "layers"
+    return layers["layers"] if isinstance(layers, dict) else layers
+
+
+def read_dense_weights(h5: h5py.File, layer_name: str):
+    group = h5["model_weights"][layer_name]
+    found = {}
+
+    def visit(name, obj):
+        if isinstance(obj, h5py.Dataset):
+            # "kernel" (Keras 3) or "kernel:0" (Keras 2)
+            found[name.rsplit("/", 1)[-1].split(":")[0]] = obj[()]
+
+    group.visititems(visit)
+    if "kernel" not in found:
+        raise ValueError(f"No kernel found for layer {layer_name}")
+    kernel = found["kernel"].astype(np.float32)
+    bias = found.get("bias", np.zeros(kernel.shape[1])).astype(np.float32)
+    return kernel, bias
+
+
+def export(model_dir: Path, output: Path):
+    model_path = find_model(model_dir)
+    arrays = {}
+    activations = []
+
+    with h5py.File(model_path, "r") as h5:
+        for layer in read_layer_config(h5):
+            kind = layer["class_name"]
+            cfg = layer["config"]
+            if kind in PASSTHROUGH_LAYERS:
+                if kind == "Activation" and activations:
+                    activations[-1] = cfg["activation"]
+                continue
+            if kind != "Dense":
+                raise ValueError(f"Unsupported layer for NumPy export: {kind} ({cfg.get('name')})")
+            kernel, bias = read_dense_weights(h5, cfg["name"])
+            index = len(activations)
+            arrays[f"kernel_{index}"] = kernel
+            arrays[f"bias_{index}"] = bias
+            activations.append(cfg.get("activation") or "linear")
+            print(f"  {cfg['name']}: {kernel.shape[0]} -> {kernel.shape[1]} ({activations[-1]})")
+
+    encoder_path = model_dir / "label_encoder.pkl"
+    if encoder_path.exists():
+        import joblib
+
+        classes = [str(name) for name in joblib.load(encoder_path).classes_]
+        arrays["classes"] = np.array(classes)
+        print(f"  classes: {classes}")
+    else:
+        print("  label_encoder.pkl not found; AudioService will keep loading it at runtime")
+
+    arrays["activations"] = np.array(activations)
+    arrays["source"] = np.array(model_path.name)
+    np.savez(output, **arrays)
+    print(f"Wrote {output} ({output.stat().st_size / 1024:.0f} KB)")
+    return model_path
+
+
+def verify(model_path: Path, output: Path, samples: int = 256):
+    """Compare NumPy and Keras outputs on random MFCC-like vectors."""
+    try:
+        from tensorflow.keras.models import load_model
+    except ImportError:
+        print("TensorFlow not installed; skipping parity check")
+        return
+
+    # Load the runtime module by path so the Flask app (and its DB config)
+    # is not imported.
+    spec = importlib.util.spec_from_file_location(
+        "numpy_runtime", BASE_DIR / "app" / "services" / "numpy_runtime.py"
+    )
+    numpy_runtime = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(numpy_runtime)
+
+    numpy_model = numpy_runtime.NumpyDenseModel.load(output)
+    keras_model = load_model(model_path)
+    rng = np.random.default_rng(0)
+    x = (rng.standard_normal((samples, numpy_model.input_dim)) * 50).astype(np.float32)
+
+    expected = keras_model.predict(x, verbose=0)
+    actual = numpy_model.predict(x)
+    diff = float(np.abs(expected - actual).max())
+    agree = float(np.mean(expected.argmax(axis=1) == actual.argmax(axis=1)))
+    print(f"Parity: max abs diff {diff:.2e}, top-1 agreement {agree:.2%}")
+    if diff > 1e-4 or agree < 1.0:
+        raise SystemExit("NumPy export does not match the Keras model")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the audio classifier to model.npz")
+    parser.add_argument("--model-dir", default=str(DEFAULT_MODEL_DIR))
+    parser.add_argument("--output", default=None, help="Defaults to <model-dir>/model.npz")
+    parser.add_argument("--verify", action="store_true", help="Check outputs against Keras (needs TensorFlow)")
+    args = parser.parse_args()
+
+    model_dir = Path(args.model_dir)
+    output = Path(args.output) if args.output else model_dir / "model.npz"
+    print(f"Exporting {model_dir}")
+    model_path = export(model_dir, output)
+    if args.verify:
+        os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+        verify(model_path, output)
+
+
+if __name__ == "__main__":
+    main()
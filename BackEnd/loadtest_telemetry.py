@@ -0,0 +1,163 @@
+"""Sustained load test for POST /api/telemetry/events.
+
+By default the app runs in-process (Flask test client) against
+DATABASE_URL, so one process is one worker and the result is the
+per-worker rate. With --url the batches go over HTTP to a running
+server instead; the bins 1..--bins must already exist there.
+
+    DATABASE_URL=sqlite:///loadtest.db python loadtest_telemetry.py
+    python loadtest_telemetry.py --format msgpack --batch-size 2000 --seconds 30
+    python loadtest_telemetry.py --url http://localhost:5000 --concurrency 8
+
+Events are a mix of classifications (70%), fill-level readings (20%) and
+heartbeats (10%) spread over --bins bins. Target: 5,000 events/s per worker.
+"""
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TARGET_EVENTS_PER_SECOND = 5000
+CATEGORIES = ("Organic", "Plastic", "Paper", "Metal", "Residue")
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "msgpack": "application/msgpack"}
+
+
+def make_event(rng: random.Random, bins: int) -> dict:
+    bin_id = rng.randint(1, bins)
+    ts = time.time() - rng.uniform(0, 60)
+    roll = rng.random()
+    if roll < 0.7:
+        confidence = round(rng.uniform(0.5, 1.0), 3)
+        return {
+            "type": "classification",
+            "bin_id": bin_id,
+            "category": rng.choice(CATEGORIES),
+            "confidence": confidence,
+            "visual_conf": confidence,
+            "ts": ts,
+        }
+    if roll < 0.9:
+        return {"type": "fill_level", "bin_id": bin_id, "fill_level": rng.randint(0, 100), "ts": ts}
+    return {"type": "heartbeat", "bin_id": bin_id, "ts": ts}
+
+
+def encode_batch(events: list, fmt: str) -> bytes:
+    if fmt == "msgpack":
+        import msgpack
+
+        return msgpack.packb(events)
+    return "\n".join(json.dumps(event) for event in events).encode()
+
+
+def make_batches(count: int, size: int, bins: int, fmt: str, seed: int) -> list:
+    rng = random.Random(seed)
+    return [encode_batch([make_event(rng, bins) for _ in range(size)], fmt) for _ in range(count)]
+
+
+def in_process_sender(bins: int):
+    from app import create_app
+    from app.db_models.models import SmartBin
+    from app.extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        missing = bins - SmartBin.query.count()
+        if missing > 0:
+            db.session.add_all(
+                SmartBin(location_name=f"Loadtest Bin {index}", latitude=0.0, longitude=0.0, fill_level=0)
+                for index in range(missing)
+            )
+            db.session.commit()
+    client = app.test_client()
+
+    def send(body: bytes, content_type: str) -> dict:
+        response = client.post("/api/telemetry/events", data=body, content_type=content_type)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_json()
+
+    return send
+
+
+def http_sender(url: str):
+    import requests
+
+    local = threading.local()
+    endpoint = url.rstrip("/") + "/api/telemetry/events"
+
+    def send(body: bytes, content_type: str) -> dict:
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        response = local.session.post(endpoint, data=body, headers={"Content-Type": content_type}, timeout=60)
+        if response.status_code != 200:
+            raise RuntimeError(f"{response.status_code}: {response.text[:200]}")
+        return response.json()
+
+    return send
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test the telemetry ingestion endpoint.")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process test client).")
+    parser.add_argument("--format", choices=sorted(CONTENT_TYPES), default="ndjson")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Events per request (default: 1000).")
+    parser.add_argument("--seconds", type=float, default=10.0, help="How long to keep sending (default: 10).")
+    parser.add_argument("--concurrency", type=int, default=1, help="Parallel senders (default: 1).")
+    parser.add_argument("--bins", type=int, default=200, help="Bins the events are spread over (default: 200).")
+    parser.add_argument("--distinct-batches", type=int, default=20, help="Pre-encoded batches cycled through.")
+    args = parser.parse_args()
+
+    send = http_sender(args.url) if args.url else in_process_sender(args.bins)
+    content_type = CONTENT_TYPES[args.format]
+    batches = make_batches(args.distinct_batches, args.batch_size, args.bins, args.format, seed=7)
+    send(batches[0], content_type)  # warm-up
+
+    latencies = []
+    accepted = rejected = 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(offset: int) -> None:
+        nonlocal accepted, rejected
+        index = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            result = send(batches[index % len(batches)], content_type)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                accepted += result["accepted"]
+                rejected += result["rejected"]
+            index += args.concurrency
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(worker, offset) for offset in range(args.concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    rate = accepted / elapsed
+    print(
+        f"{len(latencies)} batches x {args.batch_size} {args.format} events in {elapsed:.1f}s "
+        f"({'in-process' if not args.url else args.url}, concurrency {args.concurrency})"
+    )
+    print(f"accepted {accepted}, rejected {rejected}")
+    print(
+        f"batch latency ms: mean {statistics.mean(latencies) * 1000:.1f}, "
+        f"p50 {percentile(latencies, 0.5) * 1000:.1f}, p95 {percentile(latencies, 0.95) * 1000:.1f}"
+    )
+    verdict = "meets" if rate >= TARGET_EVENTS_PER_SECOND else "below"
+    print(f"throughput: {rate:,.0f} events/s ({verdict} the {TARGET_EVENTS_PER_SECOND:,}/s per-worker target)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+
+from app import create_app
+from app.db_models.models import ArchivedPartition
+from app.extensions import db
+from app.services.archive import (
+    archivable_months,
+    archive_dir,
+    archive_old_months,
+    default_partition_rows,
+    ensure_partitions,
+    first_month_with_open_anomalies,
+    is_partitioned,
+    list_partitions,
+)
+
+
+def create(months_ahead: int) -> None:
+    connection = db.session.connection()
+    if not is_partitioned(connection):
+        print("waste_logs is not partitioned on this database; nothing to create.")
+        return
+    created = ensure_partitions(connection, months_ahead=months_ahead)
+    db.session.commit()
+    print("Partitions created:", ", ".join(created) if created else "none (already present)")
+    print_default_rows(db.session.connection())
+
+
+def print_default_rows(connection) -> None:
+    for table, rows in default_partition_rows(connection).items():
+        note = " (outside every monthly partition; `create` moves them)" if rows else ""
+        print(f"{table}_default: {rows} rows{note}")
+
+
+def archive(keep_months: int, dry_run: bool) -> None:
+    blocked = first_month_with_open_anomalies(db.session.connection(), archivable_months(db.session, keep_months))
+    months = archive_old_months(db.session, keep_months=keep_months, dry_run=dry_run)
+    label = "Would archive" if dry_run else "Archived"
+    print(f"{label} {len(months)} month(s):", ", ".join(f"{month:%Y-%m}" for month in months) or "-")
+    if blocked is not None:
+        print(f"Stopped at {blocked:%Y-%m}: it still has unverified validation items; resolve them first.")
+    if not dry_run and months:
+        print("Files under", archive_dir())
+
+
+def show() -> None:
+    connection = db.session.connection()
+    if is_partitioned(connection):
+        for table in ("waste_logs", "carbon_metrics"):
+            names = [name for _, name in list_partitions(connection, table)]
+            print(f"{table}: {len(names)} partitions", f"({names[0]} .. {names[-1]})" if names else "")
+        print_default_rows(connection)
+    else:
+        print("waste_logs is not partitioned on this database.")
+    for record in ArchivedPartition.query.order_by(ArchivedPartition.month):
+        print(
+            f"archived {record.month:%Y-%m}:",
+            f"logs={record.waste_logs_rows}",
+            f"carbon={record.carbon_metrics_rows}",
+            record.waste_logs_path,
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage monthly waste_logs / carbon_metrics partitions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = commands.add_parser("create", help="Create partitions for upcoming months.")
+    create_parser.add_argument("--months-ahead", type=int, default=3, help="Months past the current one (default: 3).")
+
+    archive_parser = commands.add_parser(
+        "archive", help="Export old months to Parquet under storage/archive/, then detach and drop them."
+    )
+    archive_parser.add_argument("--keep-months", type=int, default=12, help="Months kept in the database (default: 12).")
+    archive_parser.add_argument("--dry-run", action="store_true", help="Only list the months that would be archived.")
+
+    commands.add_parser("list", help="Show partitions and archived months.")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        if args.command == "create":
+            create(max(args.months_ahead, 0))
+        elif args.command == "archive":
+            archive(max(args.keep_months, 1), args.dry_run)
+        else:
+            show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""hot path indexes
+
+Revision ID: 4c1f2b7d8e90
+Revises: e098c6fa3609
+Create Date: 2026-10-17 13:40:05.118224
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1f2b7d8e90'
+down_revision = 'e098c6fa3609'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_waste_logs_bin_id_timestamp', 'waste_logs', ['bin_id', sa.text('timestamp DESC')], unique=False)
+    op.create_index('ix_waste_logs_timestamp', 'waste_logs', ['timestamp'], unique=False)
+    op.create_index('ix_carbon_metrics_log_id_totals', 'carbon_metrics', ['log_id', 'co2_reduction_value', 'methane_reduction'], unique=False)
+    op.create_index('ix_anomaly_data_unverified', 'anomaly_data', ['id'], unique=False,
+                    postgresql_where=sa.text('status_verified = false'),
+                    sqlite_where=sa.text('status_verified = 0'))
+    op.create_index('ix_smart_bins_fill_level', 'smart_bins', ['fill_level'], unique=False)
+    op.create_index('ix_smart_bins_is_active', 'smart_bins', ['is_active'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_smart_bins_is_active', table_name='smart_bins')
+    op.drop_index('ix_smart_bins_fill_level', table_name='smart_bins')
+    op.drop_index('ix_anomaly_data_unverified', table_name='anomaly_data')
+    op.drop_index('ix_carbon_metrics_log_id_totals', table_name='carbon_metrics')
+    op.drop_index('ix_waste_logs_timestamp', table_name='waste_logs')
+    op.drop_index('ix_waste_logs_bin_id_timestamp', table_name='waste_logs')
@@ -0,0 +1,46 @@
+"""make the waste_logs links logical on every database
+
+Revision ID: 5e2c8a4f1d36
+Revises: 8f2d5b1e7a43
+Create Date: 2026-10-17 21:12:43.905118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2c8a4f1d36'
+down_revision = '8f2d5b1e7a43'
+branch_labels = None
+depends_on = None
+
+# Names for the constraints SQLite reflects without one.
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+    'uq': 'uq_%(table_name)s_%(column_0_name)s',
+}
+
+
+def upgrade():
+    # b7e3a91c2d54 already did this on PostgreSQL (the tables are partitioned there);
+    # other databases drop the same constraints so one set of models fits both.
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+    with op.batch_alter_table('anomaly_data', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('fk_anomaly_data_waste_log_id_waste_logs', type_='foreignkey')
+    with op.batch_alter_table('carbon_metrics', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('fk_carbon_metrics_log_id_waste_logs', type_='foreignkey')
+        batch_op.drop_constraint('uq_carbon_metrics_log_id', type_='unique')
+        batch_op.create_unique_constraint('carbon_metrics_log_id_log_timestamp_key', ['log_id', 'log_timestamp'])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        return
+    with op.batch_alter_table('carbon_metrics', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('carbon_metrics_log_id_log_timestamp_key', type_='unique')
+        batch_op.create_unique_constraint('uq_carbon_metrics_log_id', ['log_id'])
+        batch_op.create_foreign_key('fk_carbon_metrics_log_id_waste_logs', 'waste_logs', ['log_id'], ['id'])
+    with op.batch_alter_table('anomaly_data', naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.create_foreign_key('fk_anomaly_data_waste_log_id_waste_logs', 'waste_logs', ['waste_log_id'], ['id'])
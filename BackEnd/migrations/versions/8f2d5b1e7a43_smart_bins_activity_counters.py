@@ -0,0 +1,36 @@
+"""denormalize logs_today onto smart_bins and backfill last_seen_at
+
+Revision ID: 8f2d5b1e7a43
+Revises: d41a6c3e9f27
+Create Date: 2026-10-17 19:04:38.527310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8f2d5b1e7a43'
+down_revision = 'd41a6c3e9f27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('smart_bins', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('logs_today', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('logs_today_date', sa.Date(), nullable=True))
+
+    # One index probe per bin (ix_waste_logs_bin_id_timestamp). logs_today starts
+    # at 0; `python reconcile_bins.py` fills it in.
+    op.execute("""
+        UPDATE smart_bins
+           SET last_seen_at = (SELECT max(timestamp) FROM waste_logs WHERE waste_logs.bin_id = smart_bins.id)
+         WHERE last_seen_at IS NULL
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('smart_bins', schema=None) as batch_op:
+        batch_op.drop_column('logs_today_date')
+        batch_op.drop_column('logs_today')
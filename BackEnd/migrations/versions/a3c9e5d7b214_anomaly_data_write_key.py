@@ -0,0 +1,28 @@
+"""idempotency key for write-behind inserts into anomaly_data
+
+Revision ID: a3c9e5d7b214
+Revises: 5e2c8a4f1d36
+Create Date: 2026-10-17 23:41:09.264517
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c9e5d7b214'
+down_revision = '5e2c8a4f1d36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('anomaly_data', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('write_key', sa.String(length=32), nullable=True))
+        batch_op.create_index('ix_anomaly_data_write_key', ['write_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('anomaly_data', schema=None) as batch_op:
+        batch_op.drop_index('ix_anomaly_data_write_key')
+        batch_op.drop_column('write_key')
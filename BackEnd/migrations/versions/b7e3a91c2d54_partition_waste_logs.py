@@ -0,0 +1,212 @@
+"""partition waste_logs and carbon_metrics by month
+
+Revision ID: b7e3a91c2d54
+Revises: 4c1f2b7d8e90
+Create Date: 2026-10-17 15:02:47.660931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3a91c2d54'
+down_revision = '4c1f2b7d8e90'
+branch_labels = None
+depends_on = None
+
+# Partitions created up front past the current month; manage_partitions.py adds later ones.
+MONTHS_AHEAD = 3
+
+WASTE_LOG_COLUMNS = 'id, bin_id, category, confidence_score, timestamp, visual_conf, audio_conf, image_path'
+CARBON_COLUMNS = 'id, log_id, co2_reduction_value, methane_reduction, log_timestamp'
+
+
+def _create_monthly_partitions(table):
+    # One partition per month from the oldest log to MONTHS_AHEAD past now, plus a default.
+    op.execute(f"""
+        DO $$
+        DECLARE
+            month date;
+            last_month date := (date_trunc('month', now() AT TIME ZONE 'utc') + interval '{MONTHS_AHEAD} months')::date;
+        BEGIN
+            SELECT COALESCE(date_trunc('month', min(timestamp)), date_trunc('month', now() AT TIME ZONE 'utc'))::date
+              INTO month FROM waste_logs_unpartitioned;
+            WHILE month <= last_month LOOP
+                EXECUTE 'CREATE TABLE ' || quote_ident('{table}_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'))
+                    || ' PARTITION OF {table} FOR VALUES FROM (' || quote_literal(month::timestamp)
+                    || ') TO (' || quote_literal((month + interval '1 month')::timestamp) || ')';
+                month := (month + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """)
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+
+def _upgrade_postgresql():
+    # Foreign keys cannot point at a partitioned table's id alone (its keys must
+    # include the partition column), so the links to waste_logs become logical.
+    op.drop_constraint('anomaly_data_waste_log_id_fkey', 'anomaly_data', type_='foreignkey')
+    op.drop_constraint('carbon_metrics_log_id_fkey', 'carbon_metrics', type_='foreignkey')
+
+    op.execute('ALTER SEQUENCE waste_logs_id_seq OWNED BY NONE')
+    op.execute('ALTER SEQUENCE carbon_metrics_id_seq OWNED BY NONE')
+    op.drop_index('ix_waste_logs_bin_id_timestamp', table_name='waste_logs')
+    op.drop_index('ix_waste_logs_timestamp', table_name='waste_logs')
+    op.drop_index('ix_carbon_metrics_log_id_totals', table_name='carbon_metrics')
+    op.execute('ALTER TABLE waste_logs RENAME CONSTRAINT waste_logs_pkey TO waste_logs_unpartitioned_pkey')
+    op.execute('ALTER TABLE waste_logs RENAME CONSTRAINT waste_logs_bin_id_fkey TO waste_logs_unpartitioned_bin_id_fkey')
+    op.execute('ALTER TABLE waste_logs RENAME TO waste_logs_unpartitioned')
+    op.execute('ALTER TABLE carbon_metrics RENAME CONSTRAINT carbon_metrics_pkey TO carbon_metrics_unpartitioned_pkey')
+    op.execute('ALTER TABLE carbon_metrics RENAME CONSTRAINT carbon_metrics_log_id_key TO carbon_metrics_unpartitioned_log_id_key')
+    op.execute('ALTER TABLE carbon_metrics RENAME TO carbon_metrics_unpartitioned')
+
+    op.execute("""
+        CREATE TABLE waste_logs (
+            id INTEGER NOT NULL DEFAULT nextval('waste_logs_id_seq'),
+            bin_id INTEGER NOT NULL REFERENCES smart_bins (id),
+            category VARCHAR(50) NOT NULL,
+            confidence_score DOUBLE PRECISION NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            visual_conf DOUBLE PRECISION,
+            audio_conf DOUBLE PRECISION,
+            image_path VARCHAR(255),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    op.execute("""
+        CREATE TABLE carbon_metrics (
+            id INTEGER NOT NULL DEFAULT nextval('carbon_metrics_id_seq'),
+            log_id INTEGER,
+            co2_reduction_value DOUBLE PRECISION NOT NULL,
+            methane_reduction DOUBLE PRECISION NOT NULL,
+            log_timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            PRIMARY KEY (id, log_timestamp),
+            UNIQUE (log_id, log_timestamp)
+        ) PARTITION BY RANGE (log_timestamp)
+    """)
+    op.execute('ALTER SEQUENCE waste_logs_id_seq OWNED BY waste_logs.id')
+    op.execute('ALTER SEQUENCE carbon_metrics_id_seq OWNED BY carbon_metrics.id')
+
+    _create_monthly_partitions('waste_logs')
+    _create_monthly_partitions('carbon_metrics')
+
+    op.execute(f"""
+        INSERT INTO waste_logs ({WASTE_LOG_COLUMNS})
+        SELECT id, bin_id, category, confidence_score, COALESCE(timestamp, now() AT TIME ZONE 'utc'),
+               visual_conf, audio_conf, image_path
+        FROM waste_logs_unpartitioned
+    """)
+    op.execute(f"""
+        INSERT INTO carbon_metrics ({CARBON_COLUMNS})
+        SELECT c.id, c.log_id, c.co2_reduction_value, c.methane_reduction,
+               COALESCE(w.timestamp, now() AT TIME ZONE 'utc')
+        FROM carbon_metrics_unpartitioned c
+        LEFT JOIN waste_logs w ON w.id = c.log_id
+    """)
+    op.execute('DROP TABLE carbon_metrics_unpartitioned')
+    op.execute('DROP TABLE waste_logs_unpartitioned')
+
+    op.create_index('ix_waste_logs_bin_id_timestamp', 'waste_logs', ['bin_id', sa.text('timestamp DESC')], unique=False)
+    op.create_index('ix_waste_logs_timestamp', 'waste_logs', ['timestamp'], unique=False)
+    op.create_index('ix_carbon_metrics_log_id_totals', 'carbon_metrics', ['log_id', 'co2_reduction_value', 'methane_reduction'], unique=False)
+
+
+def _downgrade_postgresql():
+    op.execute('ALTER SEQUENCE waste_logs_id_seq OWNED BY NONE')
+    op.execute('ALTER SEQUENCE carbon_metrics_id_seq OWNED BY NONE')
+    op.execute('ALTER TABLE waste_logs RENAME CONSTRAINT waste_logs_pkey TO waste_logs_partitioned_pkey')
+    op.execute('ALTER TABLE waste_logs RENAME TO waste_logs_partitioned')
+    op.execute('ALTER TABLE carbon_metrics RENAME CONSTRAINT carbon_metrics_pkey TO carbon_metrics_partitioned_pkey')
+    op.execute('ALTER TABLE carbon_metrics RENAME TO carbon_metrics_partitioned')
+    op.execute('ALTER INDEX ix_waste_logs_bin_id_timestamp RENAME TO ix_waste_logs_partitioned_bin_id_timestamp')
+    op.execute('ALTER INDEX ix_waste_logs_timestamp RENAME TO ix_waste_logs_partitioned_timestamp')
+    op.execute('ALTER INDEX ix_carbon_metrics_log_id_totals RENAME TO ix_carbon_metrics_partitioned_log_id_totals')
+
+    op.execute("""
+        CREATE TABLE waste_logs (
+            id INTEGER NOT NULL DEFAULT nextval('waste_logs_id_seq') PRIMARY KEY,
+            bin_id INTEGER NOT NULL REFERENCES smart_bins (id),
+            category VARCHAR(50) NOT NULL,
+            confidence_score DOUBLE PRECISION NOT NULL,
+            timestamp TIMESTAMP WITHOUT TIME ZONE,
+            visual_conf DOUBLE PRECISION,
+            audio_conf DOUBLE PRECISION,
+            image_path VARCHAR(255)
+        )
+    """)
+    op.execute("""
+        CREATE TABLE carbon_metrics (
+            id INTEGER NOT NULL DEFAULT nextval('carbon_metrics_id_seq') PRIMARY KEY,
+            log_id INTEGER UNIQUE REFERENCES waste_logs (id),
+            co2_reduction_value DOUBLE PRECISION NOT NULL,
+            methane_reduction DOUBLE PRECISION NOT NULL
+        )
+    """)
+    op.execute('ALTER SEQUENCE waste_logs_id_seq OWNED BY waste_logs.id')
+    op.execute('ALTER SEQUENCE carbon_metrics_id_seq OWNED BY carbon_metrics.id')
+
+    op.execute(f'INSERT INTO waste_logs ({WASTE_LOG_COLUMNS}) SELECT {WASTE_LOG_COLUMNS} FROM waste_logs_partitioned')
+    # Carbon rows whose log was archived have nothing left to reference.
+    op.execute("""
+        INSERT INTO carbon_metrics (id, log_id, co2_reduction_value, methane_reduction)
+        SELECT c.id, c.log_id, c.co2_reduction_value, c.methane_reduction
+        FROM carbon_metrics_partitioned c
+        WHERE c.log_id IS NULL OR EXISTS (SELECT 1 FROM waste_logs w WHERE w.id = c.log_id)
+    """)
+    op.execute('DROP TABLE carbon_metrics_partitioned')
+    op.execute('DROP TABLE waste_logs_partitioned')
+
+    op.execute("""
+        UPDATE anomaly_data SET waste_log_id = NULL
+        WHERE waste_log_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM waste_logs w WHERE w.id = anomaly_data.waste_log_id)
+    """)
+    op.create_foreign_key('anomaly_data_waste_log_id_fkey', 'anomaly_data', 'waste_logs', ['waste_log_id'], ['id'])
+
+    op.create_index('ix_waste_logs_bin_id_timestamp', 'waste_logs', ['bin_id', sa.text('timestamp DESC')], unique=False)
+    op.create_index('ix_waste_logs_timestamp', 'waste_logs', ['timestamp'], unique=False)
+    op.create_index('ix_carbon_metrics_log_id_totals', 'carbon_metrics', ['log_id', 'co2_reduction_value', 'methane_reduction'], unique=False)
+
+
+def upgrade():
+    op.create_table('archived_partitions',
+    sa.Column('month', sa.Date(), nullable=False),
+    sa.Column('waste_logs_rows', sa.Integer(), nullable=False),
+    sa.Column('carbon_metrics_rows', sa.Integer(), nullable=False),
+    sa.Column('waste_logs_path', sa.String(length=255), nullable=False),
+    sa.Column('carbon_metrics_path', sa.String(length=255), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('month')
+    )
+
+    if op.get_bind().dialect.name == 'postgresql':
+        _upgrade_postgresql()
+        return
+
+    # Other databases keep plain tables; they only gain the new column and NOT NULL key.
+    op.execute("UPDATE waste_logs SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL")
+    with op.batch_alter_table('waste_logs') as batch_op:
+        batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=False)
+    with op.batch_alter_table('carbon_metrics') as batch_op:
+        batch_op.add_column(sa.Column('log_timestamp', sa.DateTime(), nullable=True))
+    op.execute("""
+        UPDATE carbon_metrics SET log_timestamp = COALESCE(
+            (SELECT w.timestamp FROM waste_logs w WHERE w.id = carbon_metrics.log_id),
+            CURRENT_TIMESTAMP
+        )
+    """)
+    with op.batch_alter_table('carbon_metrics') as batch_op:
+        batch_op.alter_column('log_timestamp', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        _downgrade_postgresql()
+    else:
+        with op.batch_alter_table('carbon_metrics') as batch_op:
+            batch_op.drop_column('log_timestamp')
+        with op.batch_alter_table('waste_logs') as batch_op:
+            batch_op.alter_column('timestamp', existing_type=sa.DateTime(), nullable=True)
+
+    op.drop_table('archived_partitions')
@@ -0,0 +1,27 @@
+"""add smart_bins.last_seen_at for telemetry
+
+Revision ID: d41a6c3e9f27
+Revises: b7e3a91c2d54
+Create Date: 2026-10-17 18:21:05.114072
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41a6c3e9f27'
+down_revision = 'b7e3a91c2d54'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable, no default: adding it is a catalog-only change on PostgreSQL.
+    with op.batch_alter_table('smart_bins', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('smart_bins', schema=None) as batch_op:
+        batch_op.drop_column('last_seen_at')
@@ -0,0 +1,71 @@
+"""daily bin category rollup
+
+Revision ID: e098c6fa3609
+Revises: 9653f23751e6
+Create Date: 2026-10-17 09:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e098c6fa3609'
+down_revision = '9653f23751e6'
+branch_labels = None
+depends_on = None
+
+
+# Same weights as app.services.rollups.CATEGORY_WEIGHTS_KG at the time of this migration
+CATEGORY_WEIGHTS_KG = {
+    'Organic': 3.5,
+    'Plastic': 2.1,
+    'Paper': 1.8,
+    'Metal': 1.4,
+    'Residue': 1.1,
+}
+
+
+def upgrade():
+    op.create_table('daily_bin_category_rollup',
+    sa.Column('bin_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(length=50), nullable=False),
+    sa.Column('log_count', sa.Integer(), nullable=False),
+    sa.Column('weight_kg', sa.Float(), nullable=False),
+    sa.Column('co2_kg', sa.Float(), nullable=False),
+    sa.Column('methane_kg', sa.Float(), nullable=False),
+    sa.Column('confidence_sum', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['bin_id'], ['smart_bins.id'], ),
+    sa.PrimaryKeyConstraint('bin_id', 'day', 'category')
+    )
+    op.create_index('ix_daily_rollup_day', 'daily_bin_category_rollup', ['day'], unique=False)
+
+    # Backfill from existing logs so the rollup is complete as soon as it exists.
+    bind = op.get_bind()
+    day_expr = 'date(w.timestamp)' if bind.dialect.name == 'sqlite' else 'CAST(w.timestamp AS DATE)'
+    weight_cases = ' '.join(
+        f"WHEN '{category}' THEN {weight}" for category, weight in CATEGORY_WEIGHTS_KG.items()
+    )
+    op.execute(f"""
+        INSERT INTO daily_bin_category_rollup
+            (bin_id, day, category, log_count, weight_kg, co2_kg, methane_kg, confidence_sum)
+        SELECT
+            w.bin_id,
+            {day_expr},
+            w.category,
+            COUNT(w.id),
+            SUM(CASE w.category {weight_cases} ELSE 1.0 END),
+            COALESCE(SUM(c.co2_reduction_value), 0),
+            COALESCE(SUM(c.methane_reduction), 0),
+            COALESCE(SUM(w.confidence_score), 0)
+        FROM waste_logs w
+        LEFT JOIN carbon_metrics c ON c.log_id = w.id
+        WHERE w.timestamp IS NOT NULL
+        GROUP BY w.bin_id, {day_expr}, w.category
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_daily_rollup_day', table_name='daily_bin_category_rollup')
+    op.drop_table('daily_bin_category_rollup')
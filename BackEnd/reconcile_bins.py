@@ -0,0 +1,35 @@
+import argparse
+
+from app import create_app
+from app.extensions import db
+from app.services.bin_activity import reconcile_bin_activity
+
+
+def reconcile(logs_only: bool) -> None:
+    updated = reconcile_bin_activity(db.session, logs_only=logs_only)
+    db.session.commit()
+    source = "waste_logs only" if logs_only else "waste_logs, keeping newer last_seen_at"
+    print("Bin activity reconciled:", f"bins={updated}", f"source={source}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Rebuild smart_bins.last_seen_at and logs_today from waste_logs."
+    )
+    parser.add_argument(
+        "--logs-only",
+        action="store_true",
+        help=(
+            "Take last_seen_at from waste_logs alone, dropping newer heartbeat / fill-level "
+            "times and the times of bins whose logs are all archived."
+        ),
+    )
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        reconcile(args.logs_only)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import os
+
+# The app reads its settings at import time. Tests never touch the configured database:
+# they run on in-memory SQLite (PostgreSQL-only tests use TEST_POSTGRES_URL).
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["STARTUP_PROFILE"] = "false"
+os.environ["WRITE_BEHIND_ENABLED"] = "false"
+os.environ["ENABLE_AI_ROUTES"] = "false"
+os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+# A PostgreSQL server the tests may create databases on,
+# e.g. postgresql+psycopg2://postgres@localhost/postgres
+POSTGRES_ADMIN_URL = os.getenv("TEST_POSTGRES_URL", "").strip()
+
+
+@pytest.fixture(scope="session")
+def seeded_app():
+    """The app on a seeded in-memory database, inside an app context."""
+    from app import create_app
+    from app.extensions import db
+    from seed_bulk import seed_bulk
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        db.create_all()
+        seed_bulk(days=60, logs_per_day=40, bin_count=24, anomalies_ratio=0.05, with_carbon=True, seed=7)
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope="module")
+def pg_url():
+    """URL of a freshly migrated PostgreSQL database, dropped after the module.
+
+    Skips the requesting tests when TEST_POSTGRES_URL is not set.
+    """
+    if not POSTGRES_ADMIN_URL:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    name = f"smartbin_test_{uuid.uuid4().hex[:8]}"
+    admin = create_engine(POSTGRES_ADMIN_URL, isolation_level="AUTOCOMMIT")
+    with admin.connect() as connection:
+        connection.execute(text(f"CREATE DATABASE {name}"))
+    url = make_url(POSTGRES_ADMIN_URL).set(database=name).render_as_string(hide_password=False)
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "flask", "--app", "wsgi", "db", "upgrade"],
+            cwd=BACKEND_DIR,
+            env={**os.environ, "DATABASE_URL": url},
+            check=True,
+            capture_output=True,
+        )
+        yield url
+    finally:
+        with admin.connect() as connection:
+            connection.execute(text(f"DROP DATABASE IF EXISTS {name} WITH (FORCE)"))
+        admin.dispose()
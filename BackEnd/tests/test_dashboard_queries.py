@@ -0,0 +1,34 @@
+import pytest
+
+from app.extensions import db
+from app.services.response_cache import get_response_cache
+from app.utils.query_counter import count_queries
+from verify_dashboard_queries import DASHBOARD_QUERY_BUDGET
+
+
+def _dashboard(app, use_rollup):
+    app.config["ANALYTICS_USE_ROLLUP"] = use_rollup
+    get_response_cache().invalidate()
+    db.session.remove()
+    with count_queries(db.engine) as counter:
+        response = app.test_client().get("/api/dashboard/")
+    return response, counter
+
+
+@pytest.mark.parametrize("use_rollup", [True, False], ids=["rollup", "raw"])
+def test_dashboard_stays_within_query_budget(seeded_app, use_rollup):
+    response, counter = _dashboard(seeded_app, use_rollup)
+
+    assert response.status_code == 200
+    assert counter.count <= DASHBOARD_QUERY_BUDGET, "\n".join(counter.statements)
+
+
+def test_dashboard_rollup_matches_raw(seeded_app):
+    payloads = []
+    for use_rollup in (True, False):
+        response, _ = _dashboard(seeded_app, use_rollup)
+        payload = response.get_json()
+        payload.pop("generated_at", None)
+        payloads.append(payload)
+
+    assert payloads[0] == payloads[1]
@@ -0,0 +1,85 @@
+"""Partition maintenance against a real PostgreSQL (skipped without TEST_POSTGRES_URL).
+
+TEST_POSTGRES_URL points at a server the tests may create databases on, e.g.
+postgresql+psycopg2://postgres@localhost/postgres. Each run migrates a fresh
+database and drops it afterwards.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.services.archive import (
+    archive_old_months,
+    default_partition_rows,
+    ensure_partitions,
+    list_partitions,
+)
+
+
+@pytest.fixture
+def engine(pg_url):
+    engine = create_engine(pg_url)
+    with engine.begin() as connection:
+        connection.execute(text("TRUNCATE waste_logs, carbon_metrics, anomaly_data, archived_partitions"))
+        connection.execute(
+            text(
+                "INSERT INTO smart_bins (id, location_name, latitude, longitude, is_active, fill_level, logs_today) "
+                "VALUES (1, 'Test bin', 0, 0, true, 0, 0) ON CONFLICT DO NOTHING"
+            )
+        )
+    yield engine
+    engine.dispose()
+
+
+def _add_log(connection, timestamp: str) -> None:
+    log_id = connection.execute(
+        text(
+            "INSERT INTO waste_logs (bin_id, category, confidence_score, timestamp) "
+            "VALUES (1, 'Plastic', 0.9, :ts) RETURNING id"
+        ),
+        {"ts": timestamp},
+    ).scalar()
+    connection.execute(
+        text(
+            "INSERT INTO carbon_metrics (log_id, co2_reduction_value, methane_reduction, log_timestamp) "
+            "VALUES (:log_id, 1, 1, :ts)"
+        ),
+        {"log_id": log_id, "ts": timestamp},
+    )
+
+
+def _rows_by_partition(connection, table: str):
+    return dict(connection.execute(text(f"SELECT tableoid::regclass::text, count(*) FROM {table} GROUP BY 1")).all())
+
+
+def test_ensure_partitions_moves_rows_out_of_the_default_partition(engine):
+    with engine.begin() as connection:
+        _add_log(connection, "2031-05-10 08:00:00")
+        _add_log(connection, "2031-05-20 08:00:00")
+        assert default_partition_rows(connection) == {"waste_logs": 2, "carbon_metrics": 2}
+
+        created = ensure_partitions(connection, months_ahead=0, today=date(2031, 5, 1))
+
+        assert created == ["waste_logs_y2031m05", "carbon_metrics_y2031m05"]
+        assert default_partition_rows(connection) == {"waste_logs": 0, "carbon_metrics": 0}
+        assert _rows_by_partition(connection, "waste_logs") == {"waste_logs_y2031m05": 2}
+        assert _rows_by_partition(connection, "carbon_metrics") == {"carbon_metrics_y2031m05": 2}
+
+
+def test_archive_exports_and_drops_old_rows_from_the_default_partition(engine, tmp_path):
+    pytest.importorskip("pyarrow")
+    with engine.begin() as connection:
+        _add_log(connection, "2019-03-04 10:00:00")
+
+    with Session(engine) as session:
+        months = archive_old_months(session, keep_months=12, target_dir=tmp_path)
+
+    assert months == [date(2019, 3, 1)]
+    assert (tmp_path / "waste_logs" / "2019-03.parquet").is_file()
+    assert (tmp_path / "carbon_metrics" / "2019-03.parquet").is_file()
+    with engine.connect() as connection:
+        assert default_partition_rows(connection) == {"waste_logs": 0, "carbon_metrics": 0}
+        assert date(2019, 3, 1) not in {month for month, _ in list_partitions(connection)}
+        assert connection.execute(text("SELECT count(*) FROM archived_partitions")).scalar() == 1
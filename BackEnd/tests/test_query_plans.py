@@ -0,0 +1,57 @@
+"""EXPLAIN the queries behind the read endpoints (see verify_query_plans.py).
+
+The SQLite run also pins the index each endpoint is expected to use, so a
+renamed or dropped index fails here rather than in production. The
+PostgreSQL run needs TEST_POSTGRES_URL and only checks for sequential scans:
+there the planner reports the per-partition index names.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.extensions import db
+from verify_query_plans import CHECKS, check_plans
+
+EXPECTED_INDEXES = {
+    "bins list": set(),
+    "bin detail": set(),
+    "dashboard": {"ix_waste_logs_timestamp", "ix_anomaly_data_unverified", "ix_smart_bins_is_active"},
+    "carbon trend (rollup)": {"ix_daily_rollup_day"},
+    "carbon trend (raw)": {"ix_waste_logs_timestamp"},
+    "waste composition (rollup)": {"ix_daily_rollup_day"},
+    "waste composition (raw)": {"ix_waste_logs_timestamp"},
+    "report summary (rollup)": {"ix_daily_rollup_day", "ix_smart_bins_is_active"},
+    "report summary (raw)": {"ix_waste_logs_timestamp", "ix_smart_bins_is_active"},
+}
+
+
+@pytest.fixture(scope="module")
+def plans(seeded_app):
+    return {result.label: result for result in check_plans(seeded_app, db)}
+
+
+def test_every_endpoint_is_covered():
+    assert {label for label, _, _ in CHECKS} == set(EXPECTED_INDEXES)
+
+
+@pytest.mark.parametrize("label", list(EXPECTED_INDEXES))
+def test_sqlite_plan_uses_indexes(plans, label):
+    result = plans[label]
+
+    assert result.status == 200
+    assert not result.problems, result.problems
+    missing = EXPECTED_INDEXES[label] - result.indexes
+    assert not missing, f"plan no longer uses {sorted(missing)} (used: {sorted(result.indexes)})"
+
+
+def test_postgres_plans_have_no_seq_scans(pg_url):
+    completed = subprocess.run(
+        [sys.executable, "verify_query_plans.py", "--database", pg_url, "--rows", "20000", "--days", "120"],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+    )
+
+    assert completed.returncode == 0, completed.stdout + completed.stderr
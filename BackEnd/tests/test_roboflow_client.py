@@ -0,0 +1,100 @@
+"""RoboflowHTTPClient must put the same requests on the wire as inference_sdk.
+
+Both clients talk to a local stub upstream that records every request; the
+SDK (already a dependency) is the reference for URL, headers and body.
+"""
+import base64
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.roboflow_client import ClientSettings, RoboflowHTTPClient
+
+inference_sdk = pytest.importorskip("inference_sdk")
+
+PREDICTIONS = {
+    "image": {"width": 64, "height": 48},
+    "predictions": [{"class": "Plastic", "confidence": 0.9, "x": 20, "y": 15, "width": 20, "height": 10}],
+}
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.requests.append({"path": self.path, "content_type": self.headers["Content-Type"], "body": body})
+        payload = {"outputs": [{"predictions": PREDICTIONS}]} if "/workflows/" in self.path else PREDICTIONS
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def upstream():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def recorded():
+    _Upstream.requests.clear()
+    return _Upstream.requests
+
+
+@pytest.fixture
+def image():
+    # Below the SDK's client-side downsizing limit, so it sends the image as is.
+    image = np.zeros((48, 64, 3), dtype=np.uint8)
+    image[10:20, 10:30] = 200
+    return image
+
+
+def test_run_workflow_matches_sdk(upstream, recorded, image):
+    sdk = inference_sdk.InferenceHTTPClient(api_url=upstream, api_key="KEY")
+    client = RoboflowHTTPClient(upstream, "KEY", ClientSettings())
+
+    expected = sdk.run_workflow(workspace_name="ws", workflow_id="wf", images={"image": image})
+    actual = client.run_workflow("ws", "wf", {"image": image})
+
+    sdk_request, our_request = recorded
+    assert our_request["path"] == sdk_request["path"]
+    assert our_request["content_type"] == sdk_request["content_type"]
+    assert json.loads(our_request["body"]) == json.loads(sdk_request["body"])
+    assert actual == expected
+
+
+def test_infer_matches_sdk_api_v0(upstream, recorded, image):
+    sdk = inference_sdk.InferenceHTTPClient(api_url=upstream, api_key="KEY").select_api_v0()
+    client = RoboflowHTTPClient(upstream, "KEY", ClientSettings())
+
+    expected = sdk.infer(image, model_id="garbage/3")
+    actual = client.infer(image, model_id="garbage/3")
+
+    sdk_request, our_request = recorded
+    assert our_request == sdk_request
+    assert actual == expected
+
+
+def test_encoded_upload_goes_out_unchanged(upstream, recorded, image):
+    upload = cv2.imencode(".png", image)[1].tobytes()
+    client = RoboflowHTTPClient(upstream, "KEY", ClientSettings())
+
+    client.run_workflow("ws", "wf", {"image": upload})
+
+    sent = json.loads(recorded[0]["body"])["inputs"]["image"]
+    assert sent["type"] == "base64"
+    assert base64.b64decode(sent["value"]) == upload
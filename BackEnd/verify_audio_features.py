@@ -0,0 +1,114 @@
+import io
+import os
+import sys
+import time
+import importlib.util
+
+import numpy as np
+import soundfile as sf
+import librosa
+
+
+def import_module_from_path(module_name, file_path):
+    spec = importlib.util.spec_from_file_location(module_name, file_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+features_path = os.path.join(current_dir, 'app', 'services', 'audio_features.py')
+audio_features = import_module_from_path('audio_features', features_path)
+
+# MFCC means are in the -600..+200 range; float32 rounding differs slightly
+# between librosa's per-frame DCT and our mean-then-DCT.
+TOLERANCE = 1e-2
+ROUNDS = 20
+
+
+def make_clips():
+    rng = np.random.default_rng(0)
+    clips = []
+    # (sample rate, seconds, channels) covering native-rate and resampled input
+    for i, (sr, seconds, channels) in enumerate([
+        (22050, 2.0, 1),
+        (16000, 3.0, 1),
+        (44100, 1.5, 2),
+        (48000, 0.3, 1),
+        (8000, 2.2, 1),
+    ]):
+        t = np.arange(int(sr * seconds)) / sr
+        y = 0.3 * np.sin(2 * np.pi * (300 + 100 * i) * t) + 0.05 * rng.standard_normal(t.size)
+        if channels == 2:
+            y = np.stack([y, 0.5 * y], axis=1)
+        buf = io.BytesIO()
+        sf.write(buf, y, sr, format='WAV', subtype='PCM_16')
+        clips.append(buf.getvalue())
+
+    sample = os.path.join(current_dir, 'storage', 'sample.wav')
+    if os.path.exists(sample):
+        with open(sample, 'rb') as f:
+            clips.append(f.read())
+    return clips
+
+
+def librosa_features(clip):
+    # Reference: the original AudioService.extract_features pipeline
+    y, sr = librosa.load(io.BytesIO(clip), sr=22050, mono=True)
+    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=40, hop_length=512, n_fft=2048).astype(np.float32)
+    return np.mean(mfcc.T, axis=0)
+
+
+def test_parity(extractor, clips):
+    print("--- Parity against librosa ---")
+    expected = np.stack([librosa_features(clip) for clip in clips])
+    single = np.stack([extractor.extract_features(clip) for clip in clips])
+    batch = extractor.extract_features_batch(clips)
+
+    for name, actual in (("single", single), ("batch", batch)):
+        diff = float(np.abs(expected - actual).max())
+        status = "OK" if diff <= TOLERANCE else "FAIL"
+        print(f"{name}: max abs diff {diff:.6f} (tolerance {TOLERANCE}) -> {status}")
+        assert diff <= TOLERANCE, f"{name} features drift from librosa by {diff}"
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def test_speed(extractor, clips):
+    print("\n--- Speed (per clip, CPU) ---")
+    workload = clips * ROUNDS
+    # Warm up both paths so one-off filterbank construction is not timed.
+    librosa_features(clips[0])
+    extractor.extract_features(clips[0])
+
+    # The 3x target is for the feature computation. Decoding costs about the
+    # same in both pipelines: both resample with soxr HQ.
+    dec_ref = timed(lambda: [librosa.load(io.BytesIO(clip), sr=22050, mono=True) for clip in workload])
+    dec_new = timed(lambda: [audio_features.load_audio(clip) for clip in workload])
+    print(f"decode only   : librosa {dec_ref / len(workload) * 1000:.2f} ms, "
+          f"load_audio {dec_new / len(workload) * 1000:.2f} ms ({dec_ref / dec_new:.1f}x)")
+
+    signals = [audio_features.load_audio(clip)[0] for clip in workload]
+    feat_ref = timed(lambda: [librosa.feature.mfcc(y=y, sr=22050, n_mfcc=40) for y in signals])
+    feat_new = timed(lambda: [extractor.features_from_signals([y]) for y in signals])
+    print(f"features only : librosa {feat_ref / len(workload) * 1000:.2f} ms, "
+          f"extractor {feat_new / len(workload) * 1000:.2f} ms ({feat_ref / feat_new:.1f}x)")
+
+    end_ref = timed(lambda: [librosa_features(clip) for clip in workload])
+    end_single = timed(lambda: [extractor.extract_features(clip) for clip in workload])
+    end_batch = timed(lambda: extractor.extract_features_batch(workload))
+    print(f"decode + MFCC : librosa {end_ref / len(workload) * 1000:.2f} ms, "
+          f"single {end_single / len(workload) * 1000:.2f} ms ({end_ref / end_single:.1f}x), "
+          f"batch {end_batch / len(workload) * 1000:.2f} ms ({end_ref / end_batch:.1f}x)")
+
+
+if __name__ == "__main__":
+    extractor = audio_features.MfccExtractor()
+    clips = make_clips()
+    test_parity(extractor, clips)
+    test_speed(extractor, clips)
@@ -0,0 +1,60 @@
+"""Hold GET /api/dashboard/ to its database round-trip budget.
+
+Seeds a throwaway database (in-memory SQLite unless DATABASE_URL is set)
+and fails if the dashboard issues more than DASHBOARD_QUERY_BUDGET
+statements, with and without the rollup table.
+"""
+import os
+import sys
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("STARTUP_PROFILE", "false")
+
+from app import create_app
+from app.extensions import db
+from app.services.response_cache import get_response_cache
+from app.utils.query_counter import count_queries
+from seed_bulk import seed_bulk
+
+# KPIs, category totals + alert lists, live feed with bins.
+DASHBOARD_QUERY_BUDGET = 3
+
+
+def main() -> int:
+    app = create_app()
+    failed = False
+    with app.app_context():
+        db.create_all()
+        seed_bulk(days=14, logs_per_day=40, bin_count=24, anomalies_ratio=0.05, with_carbon=True, seed=7)
+        client = app.test_client()
+
+        payloads = {}
+        for use_rollup in (True, False):
+            app.config["ANALYTICS_USE_ROLLUP"] = use_rollup
+            get_response_cache().invalidate()
+            db.session.remove()
+            with count_queries(db.engine) as counter:
+                response = client.get("/api/dashboard/")
+            payload = response.get_json()
+            payload.pop("generated_at", None)
+            payloads[use_rollup] = payload
+
+            ok = response.status_code == 200 and counter.count <= DASHBOARD_QUERY_BUDGET
+            failed = failed or not ok
+            label = "rollup" if use_rollup else "raw"
+            print(f"{label:<7} status={response.status_code} queries={counter.count} "
+                  f"budget={DASHBOARD_QUERY_BUDGET} {'OK' if ok else 'FAIL'}")
+            if not ok:
+                for statement in counter.statements:
+                    print("   ", " ".join(statement.split())[:160])
+
+        same = payloads[True] == payloads[False]
+        failed = failed or not same
+        print("rollup/raw payloads match:", same)
+        print("alerts:", [alert["type"] for alert in payloads[True]["alerts"]])
+        print("live feed:", [item["location"] for item in payloads[True]["live_feed"]])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Query-plan regression check for the bins, dashboard and analytics endpoints.
+
+Calls the endpoints against a seeded database, captures every SELECT they
+run and EXPLAINs it. Exits non-zero if any of them reads waste_logs,
+carbon_metrics or anomaly_data with a full table scan, or if the bins
+endpoints touch those tables at all (they read smart_bins' denormalized
+last_seen_at / logs_today).
+
+    python verify_query_plans.py                      # in-memory SQLite, 100k logs
+    python verify_query_plans.py --database postgresql://.../smartbin_plans
+
+An empty database is created and seeded; one that already has logs is
+used as is (useful against a staging copy). tests/test_query_plans.py runs
+the same checks under pytest.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import List, Set, Tuple
+
+BIG_TABLES = {"waste_logs", "carbon_metrics", "anomaly_data"}
+
+# (label, path, use rollup). The raw dashboard path averages every log by
+# design, so only its rollup variant is held to the no-scan rule.
+CHECKS = [
+    ("bins list", "/api/bins/", True),
+    ("bin detail", "/api/bins/1", True),
+    ("dashboard", "/api/dashboard/", True),
+    ("carbon trend (rollup)", "/api/analytics/carbon-trend?days=7", True),
+    ("carbon trend (raw)", "/api/analytics/carbon-trend?days=7", False),
+    ("waste composition (rollup)", "/api/analytics/waste-composition?days=7", True),
+    ("waste composition (raw)", "/api/analytics/waste-composition?days=7", False),
+    ("report summary (rollup)", "/api/reports/export?format=csv&days=7", True),
+    ("report summary (raw)", "/api/reports/export?format=csv&days=7", False),
+]
+
+# Endpoints that must be answered from smart_bins alone.
+LOG_FREE = {"bins list", "bin detail"}
+
+
+def sqlite_plan(connection, statement, parameters) -> Tuple[List[str], Set[str]]:
+    """Full scans of the large tables, and the indexes used, in SQLite's plan."""
+    rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    scans, indexes = [], set()
+    for row in rows:
+        detail = row[-1]
+        match = re.match(r"SCAN (\w+)", detail)
+        if match and match.group(1) in BIG_TABLES and "USING" not in detail:
+            scans.append(detail)
+        index = re.search(r"USING (?:COVERING )?INDEX (\w+)", detail)
+        if index:
+            indexes.add(index.group(1))
+    return scans, indexes
+
+
+def postgres_plan(connection, statement, parameters) -> Tuple[List[str], Set[str]]:
+    """Same for PostgreSQL (index names there are the per-partition ones)."""
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    scans, indexes = [], set()
+    stack = [plan[0]["Plan"]]
+    while stack:
+        node = stack.pop()
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in BIG_TABLES:
+            scans.append(f"Seq Scan on {node['Relation Name']}")
+        if node.get("Index Name"):
+            indexes.add(node["Index Name"])
+        stack.extend(node.get("Plans", []))
+    return scans, indexes
+
+
+@dataclass
+class PlanCheck:
+    label: str
+    status: int
+    queries: int = 0
+    problems: List[Tuple[str, str]] = field(default_factory=list)
+    indexes: Set[str] = field(default_factory=set)
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 200 and not self.problems
+
+
+def check_plans(app, db) -> List[PlanCheck]:
+    """Call every endpoint in CHECKS and EXPLAIN the SELECTs it runs."""
+    from sqlalchemy import event
+
+    explain = postgres_plan if db.engine.dialect.name == "postgresql" else sqlite_plan
+    client = app.test_client()
+    results = []
+    for label, path, use_rollup in CHECKS:
+        app.config["ANALYTICS_USE_ROLLUP"] = use_rollup
+        captured = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                captured.append((statement, parameters))
+
+        event.listen(db.engine, "before_cursor_execute", capture)
+        try:
+            status = client.get(path).status_code
+        finally:
+            event.remove(db.engine, "before_cursor_execute", capture)
+            db.session.remove()
+
+        result = PlanCheck(label, status, queries=len(captured))
+        with db.engine.connect() as connection:
+            for statement, parameters in captured:
+                scans, indexes = explain(connection, statement, parameters)
+                result.indexes |= indexes
+                for scan in scans:
+                    result.problems.append((scan, " ".join(statement.split())[:140]))
+                if label in LOG_FREE:
+                    for table in sorted(BIG_TABLES):
+                        if re.search(rf"\b{table}\b", statement):
+                            result.problems.append((f"reads {table}", " ".join(statement.split())[:140]))
+        results.append(result)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Fail on full scans of the large tables.")
+    parser.add_argument("--database", default="sqlite://", help="Database URL (default: in-memory SQLite).")
+    parser.add_argument("--rows", type=int, default=100_000, help="Logs to seed into an empty database.")
+    parser.add_argument("--days", type=int, default=365, help="Days the seeded logs span (default: 365).")
+    args = parser.parse_args()
+
+    os.environ["DATABASE_URL"] = args.database
+    os.environ.setdefault("STARTUP_PROFILE", "false")
+    os.environ["RESPONSE_CACHE_TTL_SECONDS"] = "0"
+
+    from app import create_app
+    from app.db_models.models import WasteLog
+    from app.extensions import db
+    from seed_bulk import seed_bulk
+
+    app = create_app()
+    failed = False
+    with app.app_context():
+        db.create_all()
+        if WasteLog.query.count() == 0:
+            seed_bulk(
+                days=args.days,
+                logs_per_day=max(args.rows // args.days, 1),
+                bin_count=24,
+                anomalies_ratio=0.03,
+                with_carbon=True,
+                seed=42,
+            )
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql("ANALYZE")
+
+        dialect = db.engine.dialect.name
+        for result in check_plans(app, db):
+            failed = failed or not result.ok
+            print(
+                f"{'OK  ' if result.ok else 'FAIL'} {result.label:<28} status={result.status} "
+                f"queries={result.queries} indexes={','.join(sorted(result.indexes)) or '-'}"
+            )
+            for scan, statement in result.problems:
+                print(f"       {scan}: {statement}")
+
+    print(f"dialect={dialect}", "FAILED" if failed else "all plans use indexes")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,8 @@
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 
 import DashboardHeader from "../components/DashboardHeader.jsx";
 import DashboardSidebar from "../components/DashboardSidebar.jsx";
-import { fetchValidationQueue, resolveValidationItem } from "../services/validationApi";
+import { fetchValidationQueuePage, resolveValidationItem } from "../services/validationApi";
 
 import paperWaste from "../assets/sampah-kertas.png";
 import paperWasteAlt from "../assets/sampah-kertas-2.png";
@@ -102,6 +102,9 @@ export default function AIValidation() {
   const [activeFilter, setActiveFilter] = useState("pending");
   const [isLoading, setIsLoading] = useState(false);
   const [loadError, setLoadError] = useState("");
+  const [queueTotal, setQueueTotal] = useState(initialQueue.length);
+  const [nextAfterId, setNextAfterId] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   const formatConfidence = (value) => {
     if (typeof value !== "number") return "N/A";
@@ -116,7 +119,7 @@ export default function AIValidation() {
 
     return {
       id: item.id,
-      image: item.image_url || "",
+      image: item.thumbnail_url || item.image_url || "",
       predictions,
       aiLabel: item.ai_label || "Unknown",
       binName: item.bin_name || "Smartbin Demo",
@@ -129,27 +132,61 @@ export default function AIValidation() {
     };
   };
 
-  const loadQueue = async () => {
+  // The API filters by status; "all" sends no status at all.
+  const queryStatus = activeFilter === "all" ? undefined : activeFilter;
+  const queryStatusRef = useRef(queryStatus);
+  queryStatusRef.current = queryStatus;
+
+  const loadQueue = async (status, isCurrent) => {
     setIsLoading(true);
     setLoadError("");
     try {
-      const apiItems = await fetchValidationQueue();
-      if (apiItems.length) {
-        setItems(apiItems.map(mapApiItem));
-      } else {
-        setItems([]);
-      }
+      const page = await fetchValidationQueuePage({ status });
+      if (!isCurrent()) return;
+      setItems(page.items.map(mapApiItem));
+      setQueueTotal(page.total);
+      setNextAfterId(page.nextAfterId);
     } catch (error) {
+      if (!isCurrent()) return;
       console.error("Failed to load validation queue:", error);
-      setItems(initialQueue);
+      const demoItems = status ? initialQueue.filter((item) => item.status === status) : initialQueue;
+      setItems(demoItems);
+      setQueueTotal(demoItems.length);
+      setNextAfterId(null);
+    } finally {
+      if (isCurrent()) setIsLoading(false);
+    }
+  };
+
+  const loadMore = async () => {
+    if (!nextAfterId || isLoadingMore) return;
+    setIsLoadingMore(true);
+    setLoadError("");
+    try {
+      const page = await fetchValidationQueuePage({ afterId: nextAfterId, status: queryStatus });
+      if (queryStatusRef.current !== queryStatus) return;
+      setItems((prev) => {
+        const loadedIds = new Set(prev.map((item) => item.id));
+        return [...prev, ...page.items.filter((item) => !loadedIds.has(item.id)).map(mapApiItem)];
+      });
+      setQueueTotal(page.total);
+      setNextAfterId(page.nextAfterId);
+    } catch (error) {
+      console.error("Failed to load more validation items:", error);
+      setLoadError("Gagal memuat item validasi berikutnya.");
     } finally {
-      setIsLoading(false);
+      setIsLoadingMore(false);
     }
   };
 
   useEffect(() => {
-    loadQueue();
-  }, []);
+    // Ignore a slower response for a filter the user has already left.
+    let current = true;
+    loadQueue(queryStatus, () => current);
+    return () => {
+      current = false;
+    };
+  }, [queryStatus]);
 
   const stats = useMemo(() => {
     return items.reduce(
@@ -162,11 +199,6 @@ export default function AIValidation() {
     );
   }, [items]);
 
-  const filteredItems = useMemo(() => {
-    if (activeFilter === "all") return items;
-    return items.filter((item) => item.status === activeFilter);
-  }, [items, activeFilter]);
-
   const handleConfirm = async (id) => {
     const target = items.find((item) => item.id === id);
     if (!target) return;
@@ -265,6 +297,10 @@ export default function AIValidation() {
                 <div className="grid min-w-[220px] gap-2 rounded-2xl border border-[#E2E8F0] bg-[#F8FAFC] px-4 py-3 text-xs text-[#475569]">
                   <div className="flex items-center justify-between">
                     <span>Total items</span>
+                    <span className="font-semibold text-[#1F2937]">{queueTotal}</span>
+                  </div>
+                  <div className="flex items-center justify-between">
+                    <span>Loaded</span>
                     <span className="font-semibold text-[#1F2937]">{stats.total}</span>
                   </div>
                   <div className="flex items-center justify-between">
@@ -316,7 +352,7 @@ export default function AIValidation() {
             ) : null}
 
             <section className="mt-6 grid gap-6 md:grid-cols-2 xl:grid-cols-3">
-              {filteredItems.map((item) => (
+              {items.map((item) => (
                 <article key={item.id} className="overflow-hidden rounded-3xl border border-[#E2E8F0] bg-white shadow-sm">
                   <div className="relative h-44 overflow-hidden bg-[#E9F0EA]">
                     {item.image ? (
@@ -410,7 +446,23 @@ export default function AIValidation() {
               ))}
             </section>
 
-            {filteredItems.length === 0 ? (
+            {nextAfterId ? (
+              <section className="mt-8 flex flex-col items-center gap-2 text-xs text-[#6B7280]">
+                <span>
+                  Showing {items.length} of {queueTotal} items
+                </span>
+                <button
+                  type="button"
+                  onClick={loadMore}
+                  disabled={isLoadingMore}
+                  className="rounded-full border border-[#E2E8F0] bg-white px-5 py-2 text-xs font-semibold text-[#475569] shadow-sm transition hover:border-[#C1D9C5] hover:text-[#1F2937] disabled:cursor-not-allowed disabled:text-[#94A3B8]"
+                >
+                  {isLoadingMore ? "Memuat..." : "Load more"}
+                </button>
+              </section>
+            ) : null}
+
+            {items.length === 0 ? (
               <section className="mt-10 rounded-3xl border border-[#E2E8F0] bg-white px-6 py-10 text-center text-sm text-[#6B7280] shadow-sm">
                 <h3 className="text-lg font-semibold text-[#1F2937]">No items match this filter</h3>
                 <p className="mt-2">Try selecting another status to keep validating AI results.</p>
@@ -7,6 +7,9 @@ import DashboardHeader from "../components/DashboardHeader.jsx";
 import DashboardSidebar from "../components/DashboardSidebar.jsx";
 import useDashboardData from "../hooks/useDashboardData.js";
 import { statusOptions } from "../data/smartbins.js";
+import { boundsToBbox, fetchBinClusters } from "../services/binsApi.js";
+
+const MAX_MAP_ZOOM = 22;
 
 function MapBounds({ bins }) {
   const map = useMap();
@@ -36,10 +39,45 @@ function MapSizeFix() {
   return null;
 }
 
+// Loads the bins in view from /api/gis/clusters after every pan or zoom, so the
+// map never has to hold the whole fleet.
+function ViewportClusters({ onChange }) {
+  const map = useMap();
+
+  useEffect(() => {
+    let timer = null;
+    let request = 0;
+    const load = () => {
+      clearTimeout(timer);
+      timer = setTimeout(async () => {
+        const current = ++request;
+        const zoom = Math.min(Math.max(Math.round(map.getZoom()), 0), MAX_MAP_ZOOM);
+        try {
+          const clusters = await fetchBinClusters(boundsToBbox(map.getBounds()), zoom);
+          if (current === request) onChange(clusters);
+        } catch (error) {
+          console.error("Failed to load map clusters:", error);
+        }
+      }, 150);
+    };
+
+    load();
+    map.on("moveend", load);
+    return () => {
+      clearTimeout(timer);
+      request += 1;
+      map.off("moveend", load);
+    };
+  }, [map, onChange]);
+
+  return null;
+}
+
 export default function Dashboard() {
   const { dashboard, bins, isLoading, errors } = useDashboardData();
   const [selectedLocation, setSelectedLocation] = useState("all");
   const [statusFilters, setStatusFilters] = useState(statusOptions.map((status) => status.value));
+  const [clusters, setClusters] = useState([]);
 
   const statusLookup = useMemo(() => {
     return statusOptions.reduce((acc, status) => {
@@ -61,6 +99,25 @@ export default function Dashboard() {
     });
   }, [bins, selectedLocation, statusFilters]);
 
+  // Single bins keep their own marker; groups count only the statuses that are switched on.
+  const mapMarkers = useMemo(() => {
+    const activeStatuses = statusFilters.length ? statusFilters : statusOptions.map((status) => status.value);
+    return clusters.flatMap((cluster) => {
+      if (cluster.bin) {
+        if (selectedLocation !== "all" && cluster.bin.id !== selectedLocation) return [];
+        return activeStatuses.includes(cluster.bin.status) ? [cluster] : [];
+      }
+      if (selectedLocation !== "all") return [];
+      const statuses = activeStatuses.filter((status) => cluster.statuses[status]);
+      const count = statuses.reduce((sum, status) => sum + cluster.statuses[status], 0);
+      if (!count) return [];
+      const dominant = statuses.reduce((best, status) =>
+        cluster.statuses[status] > cluster.statuses[best] ? status : best
+      );
+      return [{ ...cluster, count, statuses: statuses.map((status) => [status, cluster.statuses[status]]), dominant }];
+    });
+  }, [clusters, selectedLocation, statusFilters]);
+
   const handleResetFilters = () => {
     setSelectedLocation("all");
     setStatusFilters(statusOptions.map((status) => status.value));
@@ -124,7 +181,32 @@ export default function Dashboard() {
                   />
                   <MapSizeFix />
                   <MapBounds bins={filteredBins} />
-                  {filteredBins.map((bin) => {
+                  <ViewportClusters onChange={setClusters} />
+                  {mapMarkers.map((marker) => {
+                    if (!marker.bin) {
+                      const color = statusLookup[marker.dominant]?.color ?? "#228B22";
+                      return (
+                        <CircleMarker
+                          key={`cluster-${marker.lat},${marker.lng}`}
+                          center={[marker.lat, marker.lng]}
+                          radius={Math.min(12 + Math.log2(marker.count) * 3, 30)}
+                          pathOptions={{ color, fillColor: color, fillOpacity: 0.6 }}
+                        >
+                          <Popup>
+                            <div className="text-sm">
+                              <div className="text-base font-semibold text-[#1F2937]">{marker.count} bins</div>
+                              {marker.statuses.map(([value, count]) => (
+                                <div key={value} className="mt-1 text-xs text-[#6B7280]">
+                                  {statusLookup[value]?.label ?? value}: {count}
+                                </div>
+                              ))}
+                              <div className="mt-2 text-xs text-[#6B7280]">Zoom in to see each bin</div>
+                            </div>
+                          </Popup>
+                        </CircleMarker>
+                      );
+                    }
+                    const bin = marker.bin;
                     const status = statusLookup[bin.status];
                     return (
                       <CircleMarker
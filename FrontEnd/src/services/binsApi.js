@@ -32,6 +32,30 @@ export async function fetchBins() {
   return bins.map(normalizeBin);
 }
 
+// Leaflet bounds -> "minLon,minLat,maxLon,maxLat" for /api/gis; a view across the
+// antimeridian gives minLon > maxLon, which the API splits into two boxes.
+export function boundsToBbox(bounds) {
+  const south = Math.max(bounds.getSouth(), -90);
+  const north = Math.min(bounds.getNorth(), 90);
+  const west = bounds.getWest();
+  const east = bounds.getEast();
+  if (east - west >= 360) return [-180, south, 180, north].map((value) => value.toFixed(6)).join(",");
+  const wrap = (lng) => ((((lng + 180) % 360) + 360) % 360) - 180;
+  return [wrap(west), south, wrap(east), north].map((value) => value.toFixed(6)).join(",");
+}
+
+export async function fetchBinClusters(bbox, zoom) {
+  const payload = await fetchJson(`${API_BASE_URL}/api/gis/clusters?bbox=${bbox}&zoom=${zoom}`);
+  const clusters = Array.isArray(payload?.data) ? payload.data : [];
+  return clusters.map((cluster) => ({
+    lat: cluster.latitude,
+    lng: cluster.longitude,
+    count: cluster.count ?? 0,
+    statuses: cluster.statuses ?? {},
+    bin: cluster.bin ? normalizeBin(cluster.bin) : null,
+  }));
+}
+
 export async function fetchBinById(id) {
   const payload = await fetchJson(`${API_BASE_URL}/api/bins/${id}`);
   return normalizeBin(payload);
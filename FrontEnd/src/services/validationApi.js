@@ -8,9 +8,23 @@ async function fetchJson(url, options) {
   return response.json();
 }
 
-export async function fetchValidationQueue() {
-  const payload = await fetchJson(`${API_BASE_URL}/api/validation/queue`);
-  return Array.isArray(payload?.items) ? payload.items : [];
+export async function fetchValidationQueuePage({ afterId, limit, status } = {}) {
+  const params = new URLSearchParams();
+  if (afterId) params.set("after_id", afterId);
+  if (limit) params.set("limit", limit);
+  if (status) params.set("status", status);
+  const query = params.toString();
+  const payload = await fetchJson(`${API_BASE_URL}/api/validation/queue${query ? `?${query}` : ""}`);
+  return {
+    items: Array.isArray(payload?.items) ? payload.items : [],
+    total: payload?.total ?? 0,
+    nextAfterId: payload?.next_after_id ?? null,
+  };
+}
+
+export async function fetchValidationQueue(options) {
+  const page = await fetchValidationQueuePage(options);
+  return page.items;
 }
 
 export async function submitCrowdValidation(data) {